@@ -8,12 +8,21 @@ import logging
 from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 
 from camera import MyCameraForShuttle
+from redisDb import AsyncRedisDB
+from metrics import MetricsPublisher, LoopMonitor, Profiler
+from processSupervisor import BackoffPolicy
 from config import config
 import utils
 
 _logger = logging.getLogger(__name__)
 
 WAIT_PROCESS_END_TIMEOUT_S = 5
+# terminate 后等待子进程结束的时间，超时后 kill
+WAIT_PROCESS_TERMINATE_TIMEOUT_S = 1
+# 检查子进程的间隔
+MONITOR_INTERVAL_S = 0.5
+# 子进程检查退出请求的间隔
+SHUTDOWN_POLL_INTERVAL_S = 0.5
 
 log_file = config.LOG_FILE_SHUTTLE_CAMERAS
 
@@ -32,6 +41,12 @@ parts_info_path = config.PARTS_INFO_PATH
 
 # 子进程列表
 processes: dict[str, mp.Process] = dict()
+# 子进程启动时间
+started_t: dict[str, float] = dict()
+# 子进程重启退避：稳定运行 60 秒后重置
+respawn_backoff = BackoffPolicy(initial=1, max=30, factor=2, reset_after=60)
+# 请求所有相机子进程退出，Windows 的 terminate() 直接结束进程，相机不会关闭
+shutdown_event = mp.Event()
 
 
 class IPFilter(logging.Filter):
@@ -51,17 +66,23 @@ class DefaultIPFilter(logging.Filter):
         return True
 
 
-async def run_camera(ip: str):
+async def watch_shutdown(shutdown: mp.Event, stop_event: asyncio.Event):
+    """父进程请求退出时触发 stop_event"""
+    while not stop_event.is_set():
+        if await asyncio.to_thread(shutdown.wait, SHUTDOWN_POLL_INTERVAL_S):
+            _logger.info(f"[Main] shutdown requested by main process")
+            stop_event.set()
+
+
+async def run_camera(ip: str, shutdown: mp.Event):
     """每个相机进程的主入口（异步执行）"""
     # 创建一个事件，用于等待退出信号
     stop_event = asyncio.Event()
 
-    if not utils.is_win():
-        # 获取事件循环
-        loop = asyncio.get_running_loop()
-        # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
-        loop.add_signal_handler(signal.SIGINT, stop_event.set)
-        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
+    # 父进程通过 shutdown 请求退出
+    shutdown_watcher = asyncio.create_task(watch_shutdown(shutdown, stop_event))
 
     try:
         camera = await MyCameraForShuttle.create(
@@ -72,18 +93,30 @@ async def run_camera(ip: str):
             camera_params_path=config.CAMERA_PARAMS_PATH,
             **redis_con,
         )
-        # 监听 rabbitmq 消息
-        await camera.rabbitmq_worker()
+        # 预热相机：打开并配置参数，暂停取流，等待 open 命令
+        camera.prewarm()
+        # 监听 rabbitmq 消息，直到 stop_event
+        metrics_process = f"shuttleCamera@{ip}"
+        async with MetricsPublisher(redis=camera.redis, press_line=press_line, process=metrics_process), LoopMonitor(), \
+                Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=camera.redis, press_line=press_line):
+            worker = asyncio.create_task(camera.rabbitmq_worker())
+            stopper = asyncio.create_task(stop_event.wait())
+            await asyncio.wait((worker, stopper), return_when=asyncio.FIRST_COMPLETED)
+            stopper.cancel()
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
 
     except (KeyboardInterrupt, asyncio.CancelledError):
         _logger.warning(f"[Main] camera[{ip}] process cancelled")
     except Exception as err:
         _logger.exception(f"[Main] camera[{ip}] process error: {err}")
     finally:
+        shutdown_watcher.cancel()
+        await asyncio.gather(shutdown_watcher, return_exceptions=True)
         _logger.info(f"[Main] camera[{ip}] process ended")
 
 
-def run_camera_in_process(ip: str, log_queue: mp.Queue):
+def run_camera_in_process(ip: str, log_queue: mp.Queue, shutdown: mp.Event):
     """子进程入口"""
     # 创建logger对象
     logger = logging.getLogger()
@@ -110,13 +143,76 @@ def run_camera_in_process(ip: str, log_queue: mp.Queue):
     logging.getLogger('hikrobot_camera.hikrobot_camera').setLevel(logging.INFO)
 
     # 异步运行
-    asyncio.run(run_camera(ip))
+    utils.run_async(run_camera(ip, shutdown), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
+
+
+def start_camera_process(ip: str, log_queue: mp.Queue):
+    p = mp.Process(
+        target=run_camera_in_process,
+        kwargs={"ip": ip, "log_queue": log_queue, "shutdown": shutdown_event},
+        daemon=False,      # 去掉守护进程，使子进程执行finally
+    )
+    p.start()
+    processes[ip] = p
+    started_t[ip] = time.time()
+    _logger.info(f"[Main] camera[{ip}] run in process[{p.pid}] successfully")
+
+
+async def clear_camera_state(ip: str):
+    """子进程异常退出后，清除其心跳和 runningCamera，避免 CameraCtrl / ImageSaver 使用过期状态"""
+    redis = await AsyncRedisDB.create(
+        host=redis_con["redis_host"],
+        port=redis_con["redis_port"],
+        db=redis_con["redis_db"],
+        ping=True,
+    )
+    try:
+        await redis.remove_camera_heartbeat(ip=ip, press_line=press_line)
+        await redis.remove_running_camera(ip=ip, press_line=press_line)
+    finally:
+        await redis.aclose()
+
+
+def monitor_camera_processes(camera_ips: set, log_queue: mp.Queue):
+    """监控相机子进程，退出后按退避时间重启"""
+    # ip -> 重启时间
+    respawn_at: dict[str, float] = dict()
+    # ip -> 上一次退避时间
+    delays: dict[str, float] = dict()
+
+    while True:
+        time.sleep(MONITOR_INTERVAL_S)
+        for ip in camera_ips:
+            p = processes[ip]
+            if p.is_alive():
+                continue
+
+            if ip not in respawn_at:
+                uptime = time.time() - started_t[ip]
+                delays[ip] = respawn_backoff.next_delay(delays.get(ip), uptime)
+                respawn_at[ip] = time.time() + delays[ip]
+                _logger.warning(f"[Main] camera[{ip}] process[{p.pid}] exited, exitcode={p.exitcode}, uptime={uptime:.1f}s, respawn in {delays[ip]:.1f}s")
+                try:
+                    asyncio.run(clear_camera_state(ip))
+                except Exception as err:
+                    _logger.error(f"[Main] camera[{ip}] clear state error: {err}")
+
+            elif time.time() >= respawn_at[ip]:
+                del respawn_at[ip]
+                start_camera_process(ip, log_queue)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
 
 
 def main():
-    """主控程序：为每个相机启动独立进程"""
+    """主控程序：为每个相机启动独立进程，子进程退出后自动重启"""
     console_handler, file_handler = init_logger()
 
+    # kill / supervisor 停止 (Windows CTRL_BREAK_EVENT) 时与 Ctrl+C 一样停止所有子进程
+    signal.signal(signal.SIGBREAK if utils.is_win() else signal.SIGTERM, _raise_keyboard_interrupt)
+
     # 创建日志队列和监听器
     log_queue = mp.Queue()
     listener = QueueListener(log_queue, console_handler, file_handler)
@@ -127,24 +223,19 @@ def main():
         camera_ips = MyCameraForShuttle.load_registered_cameras(path=parts_info_path)
 
         for ip in camera_ips:
-            p = mp.Process(
-                target=run_camera_in_process,
-                kwargs={"ip": ip, "log_queue": log_queue},
-                daemon=False,      # 去掉守护进程，使子进程执行finally
-            )
-            p.start()
-            processes[ip] = p
-            _logger.info(f"[Main] camera[{ip}] run in process[{p.pid}] successfully")
-
-        # 等待所有子进程
-        for p in processes.values():
-            p.join()
+            start_camera_process(ip, log_queue)
+
+        # 监控子进程
+        monitor_camera_processes(camera_ips, log_queue)
 
     except KeyboardInterrupt:
         _logger.warning(f"[Main] cameras client for shuttle cancelled")
     except Exception as err:
         _logger.exception(f"[Main] cameras client for shuttle error: {err}")
     finally:
+        # 请求 所有相机子进程退出，子进程关闭相机后结束
+        shutdown_event.set()
+
         # 等待 所有相机子进程结束
         start_t = time.time()
         while True:
@@ -154,11 +245,15 @@ def main():
                 break
 
             if time.time() - start_t >= WAIT_PROCESS_END_TIMEOUT_S:
-                _logger.warning(f"[Main] force camera process[{",".join([f"{ip}|{p.pid}" for ip, p in alive.items()])}] terminate")
-                # 强制 子进程关闭
-                for ip, p in alive.items():
+                _logger.warning(f"[Main] camera process[{",".join([f"{ip}|{p.pid}" for ip, p in alive.items()])}] stop timeout, terminate")
+                # 超时：terminate，仍未结束时 kill
+                for p in alive.values():
+                    p.terminate()
+                for p in alive.values():
+                    p.join(WAIT_PROCESS_TERMINATE_TIMEOUT_S)
                     if p.is_alive():
-                        p.terminate()
+                        _logger.warning(f"[Main] force camera process[{p.pid}] kill")
+                        p.kill()
                 break
 
         _logger.info(f"[Main] cameras client for shuttle ended")
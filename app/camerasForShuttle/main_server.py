@@ -1,10 +1,10 @@
 import os
 import asyncio
-import signal
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
 from camera import CameraCtrlForShuttle
+from metrics import MetricsPublisher, LoopMonitor, Profiler
 from config import config
 import utils
 
@@ -14,6 +14,8 @@ log_file = config.LOG_FILE_CONTROLLER_FOR_SHUTTLE_CAMERAS
 
 press_line = config.PRESS_LINE
 
+metrics_process = "cameraCtrlForShuttle"
+
 redis_con = {
     "redis_host": config.REDIS_HOST,
     "redis_port": config.REDIS_PORT,
@@ -24,23 +26,22 @@ modbus_con = {
     "modbus_host": config.MODBUS_HOST,
     "modbus_port": config.MODBUS_PORT,
     "modbus_slave": config.MODBUS_SLAVE,
+    "modbus_mirror_interval": config.MODBUS_MIRROR_INTERVAL_SEC,
 }
 
 rabbitmq_url = config.RABBITMQ_URL
 
 parts_info_path=config.PARTS_INFO_PATH
 modbus_address_path=config.MODBUS_ADDRESS_PATH
+plc_backend=config.PLC_BACKEND
+plc_source=config.PLC_SOURCE
 
 async def main():
     # 创建一个事件，用于等待退出信号
     stop_event = asyncio.Event()
 
-    if not utils.is_win():
-        # 获取事件循环
-        loop = asyncio.get_running_loop()
-        # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
-        loop.add_signal_handler(signal.SIGINT, stop_event.set)
-        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
 
     try:
         async with await CameraCtrlForShuttle.create(
@@ -50,9 +51,13 @@ async def main():
                 rabbitmq_url=rabbitmq_url,
                 parts_info_path=parts_info_path,
                 modbus_address_path=modbus_address_path,
+                plc_backend=plc_backend,
+                plc_source=plc_source,
                 **redis_con,
                 **modbus_con,
-        ) as camera_ctrl:
+        ) as camera_ctrl, MetricsPublisher(redis=camera_ctrl.redis, press_line=press_line, process=metrics_process), \
+                LoopMonitor(executors={"cameraCtrl": camera_ctrl.executor}), \
+                Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=camera_ctrl.redis, press_line=press_line):
             # 等待所有任务运行
             tasks = [*camera_ctrl.tasks, stop_event.wait()]
             # return_exceptions=True -> CancelledError 不会向上抛出
@@ -126,5 +131,5 @@ if __name__ == "__main__":
     # 初始化 logger
     init_logger()
     # 协程运行
-    asyncio.run(main())
+    utils.run_async(main(), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
 
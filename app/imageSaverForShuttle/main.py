@@ -1,10 +1,10 @@
 import os
 import asyncio
-import signal
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
 from imageSaver import ImageSaverForShuttle
+from metrics import MetricsPublisher, LoopMonitor, Profiler
 from config import config
 import utils
 
@@ -14,6 +14,8 @@ log_file = config.LOG_FILE_IMAGE_SAVER_FOR_SHUTTLE
 
 press_line = config.PRESS_LINE
 
+metrics_process = "imageSaverForShuttle"
+
 redis_con = {
     "redis_host": config.REDIS_HOST,
     "redis_port": config.REDIS_PORT,
@@ -37,12 +39,8 @@ async def main():
     # 创建一个事件，用于等待退出信号
     stop_event = asyncio.Event()
 
-    if not utils.is_win():
-        # 获取事件循环
-        loop = asyncio.get_running_loop()
-        # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
-        loop.add_signal_handler(signal.SIGINT, stop_event.set)
-        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
 
     try:
         async with await ImageSaverForShuttle.create(
@@ -56,7 +54,9 @@ async def main():
                 image_workers_number=image_workers_number,
                 **redis_con,
                 **udp_multicast_con,
-        ) as saver:
+        ) as saver, MetricsPublisher(redis=saver.redis, press_line=press_line, process=metrics_process), \
+                LoopMonitor(executors={"imageSaver": saver.executor}), \
+                Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=saver.redis, press_line=press_line):
             # 等待所有任务运行
             tasks = [*saver.tasks, stop_event.wait()]
             # return_exceptions=True -> CancelledError 不会向上抛出
@@ -117,4 +117,4 @@ if __name__ == "__main__":
     # 初始化 logger
     init_logger()
     # 协程运行
-    asyncio.run(main())
+    utils.run_async(main(), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
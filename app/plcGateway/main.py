@@ -0,0 +1,142 @@
+import os
+import asyncio
+import logging
+from logging.handlers import TimedRotatingFileHandler
+
+from plc import PLCGateway, PLCTagTable, PLCTagSnapshot
+from redisDb import AsyncRedisDB
+from metrics import MetricsPublisher, LoopMonitor, Profiler
+from config import config
+import utils
+
+_logger = logging.getLogger(__name__)
+
+log_file = config.LOG_FILE_PLC_GATEWAY
+
+press_line = config.PRESS_LINE
+
+metrics_process = "plcGateway"
+
+plc_tags_path = config.PLC_TAGS_PATH
+
+plc_backend = config.PLC_BACKEND
+
+redis_con = {
+    "host": config.REDIS_HOST,
+    "port": config.REDIS_PORT,
+    "db": config.REDIS_DB,
+}
+
+# 间隔 60sec 记录网关统计
+LOG_GATEWAY_STATS_INTERVAL_SEC = 60
+
+
+async def log_gateway_stats(gateway: PLCGateway):
+    while True:
+        await asyncio.sleep(LOG_GATEWAY_STATS_INTERVAL_SEC)
+        stats = gateway.stats()
+        for name, group_stats in stats["groups"].items():
+            _logger.info(f"[Main] plc group[{name}] stats={group_stats}")
+        for ip, session_stats in stats["sessions"].items():
+            _logger.info(f"[Main] plc[{ip}] session stats={session_stats}")
+
+
+async def main():
+    # 创建一个事件，用于等待退出信号
+    stop_event = asyncio.Event()
+
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
+
+    redis = None
+    gateway = None
+    stats_task = None
+    metrics_publisher = None
+    loop_monitor = None
+    profiler = None
+    try:
+        redis = await AsyncRedisDB.create(**redis_con, ping=True)
+
+        async def publish(snapshot: PLCTagSnapshot):
+            await redis.add_plc_tags(press_line=press_line, plc=snapshot.plc, values=snapshot.values, t=snapshot.t)
+
+        # 加载变量表
+        targets = PLCTagTable.load(plc_tags_path)
+        gateway = PLCGateway(targets=targets, executor=None, backend=plc_backend, publisher=publish)
+        gateway.start()
+        stats_task = asyncio.create_task(log_gateway_stats(gateway))
+        metrics_publisher = MetricsPublisher(redis=redis, press_line=press_line, process=metrics_process)
+        metrics_publisher.start()
+        loop_monitor = LoopMonitor(executors={"plcGateway": gateway.executor})
+        loop_monitor.start()
+        profiler = Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=redis, press_line=press_line)
+        profiler.start()
+
+        # 等待事件触发
+        await stop_event.wait()
+
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        _logger.warning(f"[Main] plc gateway cancelled")
+    except Exception as err:
+        _logger.exception(f"[Main] plc gateway error: {err}")
+    finally:
+        if stats_task is not None:
+            stats_task.cancel()
+        if profiler is not None:
+            await profiler.close()
+        if loop_monitor is not None:
+            await loop_monitor.close()
+        if metrics_publisher is not None:
+            await metrics_publisher.close()
+        if gateway is not None:
+            await gateway.close()
+        if redis is not None:
+            await redis.aclose()
+        _logger.info(f"[Main] plc gateway ended")
+
+
+def init_logger():
+    # 创建logger对象
+    logger = logging.getLogger()
+    # 设置全局最低等级（让所有handler能接收到）
+    logger.setLevel(logging.DEBUG)
+
+    # === 控制台 Handler（只显示 WARNING 及以上） ===
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    console_handler.setFormatter(console_formatter)
+
+    # === 文件 Handler（每天切割，保留 7 天，记录 INFO 及以上）===
+    grandparent_dir = os.path.dirname(os.path.dirname(__file__))
+    log_path = os.path.join(grandparent_dir, log_file)
+    # 创建log目录
+    log_dir = os.path.dirname(log_path)
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = TimedRotatingFileHandler(
+        filename=log_path,  # 文件名（会自动生成备份，如 app.log.2025-07-10）
+        when="midnight",  # 每天午夜切割一次
+        interval=1,  # 间隔单位（这里是 1 天）
+        backupCount=7,  # 最多保留 7 个备份文件
+        encoding="utf-8",
+        utc=False  # 根据本地时间切割；如需使用 UTC，设为 True
+    )
+    file_handler.setLevel(logging.INFO)
+    file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    file_handler.setFormatter(file_formatter)
+
+    # 添加 handler 到 logger
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+
+    # 设置特定日志等级
+    logging.getLogger('snap7.client').setLevel(logging.WARNING)
+
+
+if __name__ == "__main__":
+
+    # 初始化 logger
+    init_logger()
+    # 协程运行
+    utils.run_async(main(), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
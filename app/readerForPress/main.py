@@ -1,10 +1,10 @@
 import os
 import asyncio
-import signal
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
 from press import PressInfo
+from metrics import MetricsPublisher, LoopMonitor, Profiler
 from config import config
 import utils
 
@@ -14,6 +14,16 @@ log_file = config.LOG_FILE_READER_FOR_PRESS
 
 press_line = config.PRESS_LINE
 
+metrics_process = "readerForPress"
+
+program_id_interval = config.PROGRAM_ID_POLL_INTERVAL_SEC
+
+running_status_interval = config.RUNNING_STATUS_SAMPLE_INTERVAL_SEC
+
+plc_backend = config.PLC_BACKEND
+
+plc_source = config.PLC_SOURCE
+
 redis_con = {
     "redis_host": config.REDIS_HOST,
     "redis_port": config.REDIS_PORT,
@@ -25,16 +35,22 @@ async def main():
     # 创建一个事件，用于等待退出信号
     stop_event = asyncio.Event()
 
-    if not utils.is_win():
-        # 获取事件循环
-        loop = asyncio.get_running_loop()
-        # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
-        loop.add_signal_handler(signal.SIGINT, stop_event.set)
-        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
 
     try:
         # 实例化 press_info
-        async with await PressInfo.create(press_line=press_line, executor=None,  **redis_con) as press_info:
+        async with await PressInfo.create(
+                press_line=press_line,
+                executor=None,
+                program_id_interval=program_id_interval,
+                running_status_interval=running_status_interval,
+                plc_backend=plc_backend,
+                plc_source=plc_source,
+                **redis_con
+        ) as press_info, MetricsPublisher(redis=press_info.redis, press_line=press_line, process=metrics_process), \
+                LoopMonitor(executors={"pressInfo": press_info.executor}), \
+                Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=press_info.redis, press_line=press_line):
             # 启动 定时器
             press_info.work()
             # 等待事件触发
@@ -99,5 +115,5 @@ if __name__ == "__main__":
     # 初始化 logger
     init_logger()
     # 协程运行
-    asyncio.run(main())
+    utils.run_async(main(), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
 
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+from logging.handlers import TimedRotatingFileHandler
+
+from processSupervisor import Supervisor, SupervisorSpec
+from redisDb import AsyncRedisDB
+from metrics import MetricsPublisher, Profiler
+from config import config
+import utils
+
+_logger = logging.getLogger(__name__)
+
+log_file = config.LOG_FILE_SUPERVISOR
+
+press_line = config.PRESS_LINE
+
+metrics_process = "supervisor"
+
+supervisor_path = config.SUPERVISOR_PATH
+
+redis_con = {
+    "host": config.REDIS_HOST,
+    "port": config.REDIS_PORT,
+    "db": config.REDIS_DB,
+}
+
+
+async def main():
+    # 创建一个事件，用于等待退出信号
+    stop_event = asyncio.Event()
+
+    # 注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    utils.install_stop_signals(stop_event)
+
+    redis = None
+    try:
+        spec = SupervisorSpec.load(supervisor_path)
+        redis = await AsyncRedisDB.create(**redis_con, ping=True)
+        supervisor = Supervisor(
+            spec=spec,
+            redis=redis,
+            press_line=press_line,
+            root_dir=config.ROOT_DIR,
+            stop_event=stop_event,
+        )
+        async with MetricsPublisher(redis=redis, press_line=press_line, process=metrics_process), \
+                Profiler(process=metrics_process, output_dir=config.PROFILE_DIR, redis=redis, press_line=press_line):
+            await supervisor.run()
+
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        _logger.warning(f"[Main] supervisor cancelled")
+    except Exception as err:
+        _logger.exception(f"[Main] supervisor error: {err}")
+    finally:
+        if redis is not None:
+            await redis.aclose()
+        _logger.info(f"[Main] supervisor ended")
+
+
+def init_logger():
+    # 创建logger对象
+    logger = logging.getLogger()
+    # 设置全局最低等级（让所有handler能接收到）
+    logger.setLevel(logging.DEBUG)
+
+    # === 控制台 Handler ===
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_formatter = logging.Formatter("%(asctime)s - [supervisor] - %(name)s - %(levelname)s - %(message)s")
+    console_handler.setFormatter(console_formatter)
+
+    # === 文件 Handler（每天切割，保留 7 天，记录 INFO 及以上）===
+    log_dir = os.path.dirname(log_file)
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = TimedRotatingFileHandler(
+        filename=log_file,  # 文件名（会自动生成备份，如 app.log.2025-07-10）
+        when="midnight",  # 每天午夜切割一次
+        interval=1,  # 间隔单位（这里是 1 天）
+        backupCount=7,  # 最多保留 7 个备份文件
+        encoding="utf-8",
+        utc=False  # 根据本地时间切割；如需使用 UTC，设为 True
+    )
+    file_handler.setLevel(logging.INFO)
+    file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    file_handler.setFormatter(file_formatter)
+
+    # 添加 handler 到 logger
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+
+
+def run():
+    # 初始化 logger
+    init_logger()
+    # 协程运行
+    utils.run_async(main(), loop=config.EVENT_LOOP, executor_workers=config.DEFAULT_EXECUTOR_WORKERS)
+
+
+if __name__ == "__main__":
+    run()
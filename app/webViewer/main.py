@@ -8,10 +8,12 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from tortoise import Tortoise
 from config.mssql_setting import TORTOISE_ORM
-from config.config import IMAGE_SAVED_DIR_FOR_SHUTTLE
+from config.config import IMAGE_SAVED_DIR_FOR_SHUTTLE, PRESS_LINE, PROFILE_DIR, DEFAULT_EXECUTOR_WORKERS
 
-from web.routers import press_info_viewer, pictures_viewer_for_shuttle
+from web.routers import press_info_viewer, pictures_viewer_for_shuttle, metrics_viewer, profile_viewer
 from web.dependencies import get_redis, close_redis
+from metrics import MetricsPublisher, LoopMonitor, Profiler
+import utils
 
 
 async def cancel_tasks(tasks: list[asyncio.Task]):
@@ -26,8 +28,11 @@ async def cancel_tasks(tasks: list[asyncio.Task]):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # 事件循环由 uvicorn 创建，与 utils.run_async 一样显式设置默认线程池，LoopMonitor 才能读取
+    utils.set_default_executor(asyncio.get_running_loop(), DEFAULT_EXECUTOR_WORKERS)
+
     # 连接 redis
-    await get_redis()
+    redis = await get_redis()
 
     # 连接数据库连接
     await Tortoise.init(config=TORTOISE_ORM)
@@ -36,10 +41,24 @@ async def lifespan(app: FastAPI):
     tasks.append(asyncio.create_task(press_info_viewer.subscribe_program_id(press_line="5-100")))
     tasks.append(asyncio.create_task(press_info_viewer.subscribe_running_status(press_line="5-100")))
     tasks.append(asyncio.create_task(press_info_viewer.subscribe_part_counter(press_line="5-100")))
+    tasks.append(asyncio.create_task(press_info_viewer.subscribe_cycle_stats(press_line="5-100")))
     tasks.append(asyncio.create_task(press_info_viewer.get_light_enable(press_line="5-100")))
 
+    # 发布本进程指标
+    metrics_publisher = MetricsPublisher(redis=redis, press_line=PRESS_LINE, process="webViewer")
+    metrics_publisher.start()
+    # 事件循环延迟、默认线程池饱和度
+    loop_monitor = LoopMonitor()
+    loop_monitor.start()
+    # 按需剖析
+    profiler = Profiler(process="webViewer", output_dir=PROFILE_DIR, redis=redis, press_line=PRESS_LINE)
+    profiler.start()
+
     yield
 
+    await profiler.close()
+    await loop_monitor.close()
+    await metrics_publisher.close()
     await cancel_tasks(tasks)
     await close_redis()
 
@@ -67,6 +86,8 @@ app.mount("/pictures/forShuttle", StaticFiles(directory=IMAGE_SAVED_DIR_FOR_SHUT
 
 app.include_router(press_info_viewer.router, prefix=f"/{press_info_viewer.TAG}", tags=["压机实时信息", ])
 app.include_router(pictures_viewer_for_shuttle.router, prefix=f"/{pictures_viewer_for_shuttle.TAG}", tags=["穿梭小车相机图片回放", ])
+app.include_router(metrics_viewer.router, prefix=f"/{metrics_viewer.TAG}", tags=["进程指标", ])
+app.include_router(profile_viewer.router, prefix=f"/{profile_viewer.TAG}", tags=["按需剖析", ])
 
 @app.get("/", tags=["导航",])
 async def root():
@@ -75,4 +96,5 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host='0.0.0.0', port=8002)
\ No newline at end of file
+    # uvicorn loop="auto" 与 utils.run_async 一致：已安装 uvloop 时使用 uvloop
+    uvicorn.run("main:app", host='0.0.0.0', port=8002, loop="auto")
\ No newline at end of file
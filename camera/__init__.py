@@ -1,2 +1,30 @@
-from .cameraForShuttle.camera_ctrl import CameraCtrl as CameraCtrlForShuttle
-from .cameraForShuttle.my_camera import MyCamera as MyCameraForShuttle
+import typing
+import importlib
+
+# 按需导入：CameraCtrl 进程不加载相机 SDK，相机进程不加载 CameraCtrl 的 plc / modbus 依赖
+_LAZY_IMPORTS = {
+    "CameraCtrlForShuttle": (".cameraForShuttle.camera_ctrl", "CameraCtrl"),
+    "MyCameraForShuttle": (".cameraForShuttle.my_camera", "MyCamera"),
+    "CameraState": (".cameraForShuttle.camera_state", "CameraState"),
+    "SimulatedHikrobotCamera": (".simulator", "SimulatedHikrobotCamera"),
+    "SimulationParams": (".simulator", "SimulationParams"),
+}
+
+if typing.TYPE_CHECKING:
+    from .cameraForShuttle.camera_ctrl import CameraCtrl as CameraCtrlForShuttle
+    from .cameraForShuttle.my_camera import MyCamera as MyCameraForShuttle
+    from .cameraForShuttle.camera_state import CameraState
+    from .simulator import SimulatedHikrobotCamera, SimulationParams
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_IMPORTS])
@@ -1,16 +1,24 @@
 import asyncio
+import time
 import yaml
 import os
 import typing
 import json
+import itertools
+from enum import StrEnum
 from concurrent.futures import ThreadPoolExecutor
 import logging
 
 from press import Shuttle, PartCounter
-from plc import PressTailReader
-from redisDb import AsyncRedisDB
+from plc import PressTailReader, PressTailSnapshot, PLCSessionManager, PLCBackend, PLCSource, PLCTagSubscriber
+from redisDb import AsyncRedisDB, PartTrace, PartTraceStage
 from rabbitmq import RabbitmqCameraProducer
-from modbus import CameraCtrlModbusClient, ModbusAddress
+from .trigger_timing import TriggerTimingModel
+from .plc_capture import PlcClock, PLC_TRIGGER_SOURCE, SOFTWARE_TRIGGER_SOURCE
+# 不从 my_camera 导入，CameraCtrl 进程不加载相机 SDK
+from .camera_state import CameraState
+import metrics
+from modbus import CameraCtrlModbusClient, ModbusAddress, ModbusSession, ModbusMirror, ModbusChange, ModbusChangeType
 
 _logger = logging.getLogger(__name__)
 
@@ -18,13 +26,54 @@ _logger = logging.getLogger(__name__)
 # 软触发延时时间
 DEFAULT_TRIGGER_DELAY_SEC = 0.5
 LIGHT_DISABLE_AFTER_PRESS_STOP_S = 600
+# 间隔 60sec 记录 modbus 会话统计
+LOG_MODBUS_SESSION_STATS_INTERVAL_SEC = 60
+# 间隔 300sec 记录触发延时学习统计
+LOG_TRIGGER_TIMING_STATS_INTERVAL_SEC = 300
+# 关灯等待写入的时间
+LIGHT_OFF_TIMEOUT_S = 3
+# modbus 镜像常驻轮询间隔，None 表示只在 capture_mode 为 plc 时轮询
+MODBUS_MIRROR_INTERVAL_SEC = None
+# capture_mode 为 plc 时 modbus 镜像的轮询间隔
+PLC_CAPTURE_MIRROR_INTERVAL_SEC = 0.1
 
 MAX_WORKERS = 50
 
 CAMERA_LOCATION = "shuttle"
 
+# 时间戳寄存器块数量，capture_count 循环使用 capture_0 ~ capture_9
+CAPTURE_TIMESTAMP_NUMBER = 10
+
+# plc 网关变量表中的 plc 名称
+GATEWAY_PRESS_TAIL = "press_tail"
+# 等待 plc 网关快照的时间，超时后重新检查运行状态
+GATEWAY_SNAPSHOT_WAIT_SEC = 0.1
+# 早于该时间的快照丢弃，避免停机期间积压的快照触发拍照
+GATEWAY_SNAPSHOT_STALE_MS = 1000
+# 读取相机心跳的间隔，秒
+CAMERA_HEARTBEAT_CHECK_INTERVAL_SEC = 0.5
+# 超过该时间没有心跳视为相机进程失联，毫秒
+CAMERA_HEARTBEAT_STALE_MS = 3000
+# 需要的相机心跳正常但未取流时，重新发送 open 的最小间隔，秒
+CAMERA_REOPEN_INTERVAL_SEC = 10
+
+
+class CaptureMode(StrEnum):
+    SOFTWARE = "software"   # python 检测 shuttle 传感器后软触发
+    PLC = "plc"             # plc 根据 capture_* 寄存器定时硬触发
+
+    @classmethod
+    def create(cls, capture_mode: typing.Optional[str]):
+        try:
+            return cls(str(capture_mode).lower())
+        except ValueError:
+            return cls.SOFTWARE
+
 
 class CameraCtrl:
+    # 相机控制消息的发送端，基准测试可替换为本地实现
+    PRODUCER_CLASS = RabbitmqCameraProducer
+
     _parts = None
     _registered_cameras = None
 
@@ -62,6 +111,23 @@ class CameraCtrl:
         self.modbus_host = modbus_host
         self.modbus_port = modbus_port
         self.modbus_slave = modbus_slave
+        # modbus 常驻会话，断线自动重连，写入排队
+        self.modbus_session = ModbusSession(
+            factory=lambda: CameraCtrlModbusClient(
+                host=self.modbus_host,
+                port=self.modbus_port,
+                slave=self.modbus_slave,
+            ),
+        )
+        # modbus 寄存器镜像，变化写入 redis stream
+        # 默认只在 plc 硬触发时轮询，软触发时不占用 modbus 会话
+        modbus_mirror_interval = kwargs.pop("modbus_mirror_interval", MODBUS_MIRROR_INTERVAL_SEC)
+        self.modbus_mirror_always = modbus_mirror_interval is not None
+        self.modbus_mirror = ModbusMirror(
+            session=self.modbus_session,
+            interval=modbus_mirror_interval or PLC_CAPTURE_MIRROR_INTERVAL_SEC,
+            publisher=self.publish_modbus_changes,
+        )
 
         # 穿梭小车对象
         self.shuttle = Shuttle()
@@ -71,10 +137,40 @@ class CameraCtrl:
         # 标识是否是我们自己创建的 executor
         self._own_executor = executor is None
 
+        # plc 常驻会话，断线自动重连
+        plc_backend = kwargs.pop("plc_backend", PLCBackend.EXECUTOR)
+        self.plc_sessions = PLCSessionManager()
+        self.press_tail_session = self.plc_sessions.async_session(
+            ip=PressTailReader.PLC_IP,
+            factory=lambda: PressTailReader(executor=self.executor, backend=plc_backend),
+        )
+        # plc 变量来源，gateway 模式下订阅 plc 网关，不连接 plc
+        self.plc_source = PLCSource.create(kwargs.pop("plc_source", PLCSource.DIRECT))
+        self.plc_tags: typing.Optional[PLCTagSubscriber] = None
+        self.press_tail_queue: typing.Optional[asyncio.Queue] = None
+
         # 触发延时
         self.trigger_delay = 0
+        # 触发延时调试时的 SPM，可选
+        self.trigger_reference_spm: typing.Optional[float] = None
+        # 是否根据出帧反馈自适应调整触发延时
+        self.trigger_adaptive = True
+        # 按 program 和 SPM 分档学习触发延时
+        self.trigger_timing = TriggerTimingModel()
+        # 触发模式
+        self.capture_mode = CaptureMode.SOFTWARE
+        self.program_id: typing.Optional[int] = None
+        # plc 硬触发模式下当前零件，由 part_count 寄存器变化更新
+        self.plc_part_counter: typing.Optional[int] = None
+        # plc 时钟 -> 主机时钟
+        self.plc_clock = PlcClock()
         # light 使能
         self.light_enable = False
+        # 心跳正常的相机，取流中的相机，由 watch_camera_heartbeats 更新，用于触发决策
+        self.live_cameras: set[str] = set()
+        self.grabbing_cameras: set[str] = set()
+        # 各相机最近一次发送 open 的时间，time.monotonic()
+        self._camera_open_t: dict[str, float] = dict()
 
         # event
         self.stop_event = stop_event or asyncio.Event()
@@ -83,6 +179,14 @@ class CameraCtrl:
         # 当前循环
         self.loop = asyncio.get_running_loop()
 
+        # 指标
+        self.parts_total = metrics.counter("shuttle_parts_total", "parts detected on shuttle")
+        self.stale_snapshots_total = metrics.counter("plc_gateway_stale_snapshots_total", "gateway snapshots dropped as stale")
+        self.trigger_delay_seconds = metrics.histogram(
+            "camera_trigger_delay_seconds", "planned software trigger delay",
+            buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.5, 2.0),
+        )
+
         self.tasks = list()
 
     @classmethod
@@ -115,12 +219,23 @@ class CameraCtrl:
             )
 
         # rabbitmq
-        ctrl.rabbitmq_producer = RabbitmqCameraProducer(
+        ctrl.rabbitmq_producer = cls.PRODUCER_CLASS(
             rabbitmq_url=ctrl.rabbitmq_url,
             location=CAMERA_LOCATION
         )
         await ctrl.rabbitmq_producer.connect()
 
+        # 订阅 plc 网关
+        if ctrl.plc_source is PLCSource.GATEWAY:
+            ctrl.plc_tags = PLCTagSubscriber(redis=ctrl.redis, press_line=ctrl.press_line, plcs=(GATEWAY_PRESS_TAIL, ))
+            ctrl.press_tail_queue = ctrl.plc_tags.subscribe(GATEWAY_PRESS_TAIL)
+            ctrl.plc_tags.start()
+
+        # modbus
+        ctrl.modbus_session.start()
+        if ctrl.modbus_mirror_always:
+            ctrl.modbus_mirror.start()
+
         # 初始化 event
         ctrl.stop_event.clear()
 
@@ -129,7 +244,11 @@ class CameraCtrl:
             asyncio.create_task(ctrl.subscribe_program_id()),
             asyncio.create_task(ctrl.subscribe_running_status()),
             asyncio.create_task(ctrl.light_control()),
+            asyncio.create_task(ctrl.log_modbus_session_stats()),
+            asyncio.create_task(ctrl.plc_capture_monitor()),
+            asyncio.create_task(ctrl.learn_trigger_timing()),
             asyncio.create_task(ctrl.shuttle_detect()),
+            asyncio.create_task(ctrl.watch_camera_heartbeats()),
         ]
 
         return ctrl
@@ -148,17 +267,22 @@ class CameraCtrl:
         # if self._own_stop_event:
         self.stop_event.set()
 
-        # 关灯
-        async with CameraCtrlModbusClient(
-                host=self.modbus_host,
-                port=self.modbus_port,
-                slave=self.modbus_slave
-        ) as client:
-            await client.write(registers={"light_enable": False})
+        # 关灯，排在已有写入之后
+        try:
+            await self.modbus_session.write(registers={"light_enable": False}, timeout=LIGHT_OFF_TIMEOUT_S)
+        except Exception as err:
+            _logger.error(f"{self.identity} light off error: {err}")
+        await self.modbus_mirror.close()
+        await self.modbus_session.close()
 
         # 关闭 rabbitmq
         await self.rabbitmq_producer.close()
 
+        # 关闭 plc
+        if self.plc_tags is not None:
+            await self.plc_tags.close()
+        await self.plc_sessions.close()
+
         # 关闭 redis
         await self.redis.del_part_counter(press_line=self.press_line)
         await self.redis.set_light_disable(press_line=self.press_line, after=None)
@@ -171,65 +295,135 @@ class CameraCtrl:
 
     # #################### 监控shuttle -> 拍照, 发布 ####################
     async def shuttle_detect(self):
-        async with PressTailReader(executor=self.executor) as plc:
-            while True:
-                try:
-                    # stop_event 被置为
-                    if self.stop_event.is_set():
-                        break
-
-                    # 判断压机是否停机
-                    _, running_status = await self.redis.get_latest_running_status(press_line=self.press_line)
-                    if not running_status:
-                        await asyncio.sleep(0.1)
-                        continue
-
-                    # 判断是否有相机打开
-                    running_cameras_num = await self.redis.get_running_cameras_number(press_line=self.press_line)
-                    if not running_cameras_num:
-                        await asyncio.sleep(0.1)
-                        continue
-
-                    # 读取 shuttle 传感器
-                    s1, s2 = await plc.read_shuttle_sensors()
-                    # 判定是否有零件
-                    has_part, has_part_t = self.shuttle.check_part(s1, s2)
-                    if not has_part:
-                        continue
-
-                    # 读取 part_count
-                    part_counter = await plc.read_part_counter()
-                    # part_count 设置 bias
-                    part_counter = PartCounter.on_shuttle(counter=part_counter)
-                    # 发布 part_count
-                    await self.redis.set_part_counter(part_counter=part_counter, press_line=self.press_line)
-
-                    # 软触发
-                    await self.delay_2_TriggerSoftware(value=has_part_t)
-
-                    _logger.info(f"{self.identity} shuttle has part[counter={part_counter},interval={self.shuttle.interval}]")
-
-                except Exception as err:
-                    _logger.exception(f"{self.identity} shuttle_detect() error: {err}")
-
-            _logger.info(f"{self.identity} shuttle_detect() ended")
-
-    async def delay_2_TriggerSoftware(self, value):
+        while True:
+            try:
+                # stop_event 被置为
+                if self.stop_event.is_set():
+                    break
+
+                # 判断压机是否停机
+                _, running_status = await self.redis.get_latest_running_status(press_line=self.press_line)
+                if not running_status:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                # plc 硬触发模式，不需要检测 shuttle 传感器
+                if self.capture_mode is CaptureMode.PLC:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                # 判断是否有相机在取流
+                if not self.grabbing_cameras:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                # 一次扫描读取 shuttle 传感器 和 part_count
+                snapshot = await self.read_press_tail_snapshot()
+                if snapshot is None:
+                    continue
+                # 判定是否有零件
+                has_part, has_part_t = self.shuttle.check_part(snapshot.shuttle_s1, snapshot.shuttle_s2, t=snapshot.t)
+                if not has_part:
+                    continue
+
+                # part_count 设置 bias
+                part_counter = PartCounter.on_shuttle(counter=snapshot.part_counter)
+                # 发布 part_count
+                await self.redis.set_part_counter(part_counter=part_counter, press_line=self.press_line)
+                self.parts_total.inc()
+
+                # 按当前冲次 (最近节拍中位数) 计算触发延时
+                cycle_stats = self.shuttle.stats()
+                trigger_delay = self.trigger_timing.plan(
+                    program_id=self.program_id,
+                    has_part_t=has_part_t,
+                    spm=self.shuttle.recent_spm(),
+                    trigger_delay=self.trigger_delay,
+                    reference_spm=self.trigger_reference_spm,
+                    adaptive=self.trigger_adaptive,
+                )
+                # 软触发
+                self.trigger_delay_seconds.observe(trigger_delay)
+                scheduled_t = time.time() * 1000
+                await self.delay_2_TriggerSoftware(value=has_part_t, delay=trigger_delay, part_counter=part_counter)
+                # 链路时间戳
+                await self.redis.add_part_trace(
+                    press_line=self.press_line,
+                    program_id=self.program_id,
+                    part_counter=part_counter,
+                    stages={
+                        PartTrace.field(PartTraceStage.EDGE): has_part_t,
+                        PartTrace.field(PartTraceStage.SCHEDULED): scheduled_t,
+                    },
+                )
+
+                # 发布节拍统计
+                await self.redis.set_shuttle_cycle_stats(stats=cycle_stats.to_dict(), press_line=self.press_line)
+
+                _logger.info(f"{self.identity} shuttle has part[counter={part_counter},interval={self.shuttle.interval},debounce={self.shuttle.debounce_ms}ms,delay={trigger_delay:.3f}s]")
+
+            except Exception as err:
+                _logger.exception(f"{self.identity} shuttle_detect() error: {err}")
+                # 会话断线重连由 press_tail_session 处理，避免空转
+                await asyncio.sleep(0.1)
+
+        _logger.info(f"{self.identity} shuttle_detect() ended")
+
+    async def read_press_tail_snapshot(self) -> typing.Optional[PressTailSnapshot]:
+        """
+        direct 模式直接读取 plc
+        gateway 模式等待 plc 网关发布的变化，没有变化或快照过期时返回 None
+        """
+        if self.plc_tags is None:
+            return await self.press_tail_session.read(lambda plc: plc.read_snapshot())
+
+        try:
+            tags = await asyncio.wait_for(self.press_tail_queue.get(), timeout=GATEWAY_SNAPSHOT_WAIT_SEC)
+        except asyncio.TimeoutError:
+            return None
+        if int(time.time() * 1000) - tags.t > GATEWAY_SNAPSHOT_STALE_MS:
+            self.stale_snapshots_total.inc()
+            return None
+
+        s1, s2 = tags.values["shuttle_sensors"]
+        return PressTailSnapshot(shuttle_s1=s1, shuttle_s2=s2, part_counter=tags.values["part_counter"], t=tags.t)
+
+    async def delay_2_TriggerSoftware(self, value, delay: typing.Optional[float] = None, part_counter: typing.Optional[int] = None):
+        """
+        :param value: has_part_t
+        :param delay: 发送延时，秒，默认 self.trigger_delay
+        :param part_counter: 可选，记录各相机的触发发送时间
+        """
         cmds = (("set", "TriggerSoftware", value),)
         # 转为 json 字符串
         data = json.dumps(cmds)
 
-        # 获取运行的相机ip
-        camera_ips = await self.redis.get_running_cameras(press_line=self.press_line)
+        # 心跳正常且在取流的相机
+        camera_ips = sorted(self.grabbing_cameras)
 
         # todo 使用延时触发相机，可能需要优化
         for ip in camera_ips:
-            trigger_delay = self.trigger_delay
+            trigger_delay = self.trigger_delay if delay is None else delay
             # 延时发送消息
-            self.loop.call_later(trigger_delay, self._sync_publish_rabbitmq_2_task, ip, data)
-
-    def _sync_publish_rabbitmq_2_task(self, ip, data):
-        asyncio.create_task(self.rabbitmq_producer.publish(ip, data))
+            self.loop.call_later(trigger_delay, self._sync_publish_rabbitmq_2_task, ip, data, part_counter)
+
+    def _sync_publish_rabbitmq_2_task(self, ip, data, part_counter: typing.Optional[int] = None):
+        asyncio.create_task(self._publish_trigger(ip, data, part_counter))
+
+    async def _publish_trigger(self, ip, data, part_counter: typing.Optional[int] = None):
+        await self.rabbitmq_producer.publish(ip, data)
+        metrics.counter("camera_triggers_sent_total", "TriggerSoftware commands sent", camera=ip).inc()
+        if part_counter is None:
+            return
+        try:
+            await self.redis.add_part_trace(
+                press_line=self.press_line,
+                program_id=self.program_id,
+                part_counter=part_counter,
+                stages={PartTrace.field(PartTraceStage.SENT, ip): time.time() * 1000},
+            )
+        except Exception as err:
+            _logger.warning(f"{self.identity} add part trace error: {err}")
 
     # #################### 监控program id -> 打开/关闭相机 ####################
     async def subscribe_program_id(self):
@@ -252,13 +446,17 @@ class CameraCtrl:
                 part_info = self._parts.get(program_id, dict())
                 # 获取 触发延时
                 self.trigger_delay = part_info.get("trigger_delay", DEFAULT_TRIGGER_DELAY_SEC)
+                self.trigger_reference_spm = part_info.get("trigger_reference_spm")
+                self.trigger_adaptive = part_info.get("trigger_adaptive", True)
                 # 改变 shuttle detect_type，默认 BOTH
                 self.shuttle.set_detect_type(part_info.get("shuttle_sensor_type", 0))
                 # 获取 camera_ips
                 required_camera_ips = set(part_info.get("cameras", list()))
+                self.program_id = program_id
 
-                # 获取运行中的相机
-                running_camera_ips = set(await self.redis.get_running_cameras(press_line=self.press_line))
+                # 获取取流中的相机
+                await self.refresh_camera_heartbeats()
+                running_camera_ips = set(self.grabbing_cameras)
                 # 要关闭的相机
                 to_close_camera_ips = (running_camera_ips - required_camera_ips) & self._registered_cameras
                 # 要打开的相机
@@ -270,6 +468,14 @@ class CameraCtrl:
                 # 打开相机
                 if to_open_camera_ips:
                     await self.rabbitmq_producer.publish(camera_ip=list(to_open_camera_ips), data=json.dumps((("open",),)))
+                    self._camera_open_t.update({ip: time.monotonic() for ip in to_open_camera_ips})
+
+                # 设置触发模式
+                await self.apply_capture_mode(
+                    program_id=program_id,
+                    part_info=part_info,
+                    camera_ips=required_camera_ips & self._registered_cameras,
+                )
 
                 # todo 确认相机关闭
                 # await asyncio.sleep(10)
@@ -280,11 +486,231 @@ class CameraCtrl:
 
         _logger.info(f"{self.identity} subscribe_program_id() ended")
 
+    # #################### plc 硬触发 ####################
+    async def apply_capture_mode(self, program_id: int, part_info: dict, camera_ips: set):
+        """
+        按 parts_info.yaml 设置触发模式
+            plc 模式：写入 capture_* 寄存器，由 plc 定时触发，相机切换为硬触发，启动 modbus 镜像
+            software 模式：关闭 plc 触发，相机切换为软触发，未配置常驻时停止 modbus 镜像
+        """
+        capture_mode = CaptureMode.create(part_info.get("capture_mode"))
+
+        if capture_mode is CaptureMode.PLC:
+            plc_capture = part_info.get("plc_capture", dict())
+            registers = {
+                "part_id": program_id,
+                "capture_distance": plc_capture.get("distance", 0),
+                "capture_enable_method": plc_capture.get("enable_method", 0),
+                "capture_enable_interval": plc_capture.get("enable_interval", 0),
+                "capture_enable_once": plc_capture.get("enable_once", 0),
+            }
+            trigger_source = PLC_TRIGGER_SOURCE
+        else:
+            registers = {
+                "part_id": program_id,
+                "capture_enable_method": 0,
+            }
+            trigger_source = SOFTWARE_TRIGGER_SOURCE
+
+        # 写入排队，断线重连期间不会丢弃
+        self.modbus_session.submit(registers=registers)
+        # 相机触发源
+        if camera_ips:
+            await self.rabbitmq_producer.publish(
+                camera_ip=list(camera_ips),
+                data=json.dumps((("set", "TriggerSource", trigger_source),)),
+            )
+
+        if capture_mode is not self.capture_mode:
+            _logger.info(f"{self.identity} capture mode {self.capture_mode} -> {capture_mode}")
+        self.capture_mode = capture_mode
+
+        # modbus 镜像
+        if capture_mode is CaptureMode.PLC and not self.modbus_mirror.running:
+            self.modbus_mirror.start()
+        elif capture_mode is not CaptureMode.PLC and not self.modbus_mirror_always and self.modbus_mirror.running:
+            await self.modbus_mirror.close()
+            # 镜像停止期间 part_count 的变化无法跟踪，重新启动后由快照初始化
+            self.plc_part_counter = None
+
+    async def plc_capture_monitor(self):
+        """
+        plc 硬触发模式下，根据 modbus 寄存器变化记录零件和触发
+            part_count 变化 -> 当前零件
+            part_on 时间戳变化 -> 新零件，发布 part_counter，通知相机 has_part_t (主机时钟)
+            capture_count 变化 -> plc 已触发，记录 capture_count、capture 时间戳 (plc 时钟和主机时钟) 和所属零件
+            相机按帧时间匹配触发记录，将帧对应到零件 (MyCamera._output_frame)
+        """
+        queue = self.modbus_mirror.subscribe()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+
+                # 同一次轮询的变化一起处理：寄存器事件先于时间戳事件发出，capture_count 可能排在 part_on 之前
+                changes = [change]
+                while not queue.empty():
+                    changes.append(queue.get_nowait())
+                for _, batch in itertools.groupby(changes, key=lambda c: c.t):
+                    batch = list(batch)
+                    try:
+                        await self._on_plc_changes(batch)
+                    except Exception as err:
+                        _logger.exception(f"{self.identity} handle plc capture changes[{batch}] error: {err}")
+        finally:
+            self.modbus_mirror.unsubscribe(queue)
+
+        _logger.info(f"{self.identity} plc_capture_monitor() ended")
+
+    async def _on_plc_changes(self, changes: list[ModbusChange]):
+        """处理一次轮询的变化：零件计数 -> 新零件 -> 触发"""
+        by_name = {change.name: change for change in changes}
+        # plc 时间戳都用于估计时钟差
+        for change in changes:
+            if change.type is ModbusChangeType.TIMESTAMP and change.new:
+                self.plc_clock.observe(plc_t=change.new, host_t=change.t)
+
+        part_count = by_name.get("part_count")
+        if part_count is not None and part_count.type is ModbusChangeType.REGISTER and part_count.new is not None:
+            # part_count 设置 bias
+            self.plc_part_counter = PartCounter.on_shuttle(counter=part_count.new)
+        elif self.plc_part_counter is None:
+            # 启动后 part_count 还没有变化，使用镜像快照
+            self.plc_part_counter = PartCounter.on_shuttle(counter=self.modbus_mirror.registers.get("part_count", 0))
+
+        if self.capture_mode is not CaptureMode.PLC:
+            return
+
+        part_on = by_name.get("part_on")
+        if part_on is not None and part_on.type is ModbusChangeType.TIMESTAMP and part_on.new:
+            await self._on_plc_part(has_part_t=part_on.new)
+
+        capture_count = by_name.get("capture_count")
+        if capture_count is not None and capture_count.type is ModbusChangeType.REGISTER and capture_count.new:
+            await self._on_plc_capture(old=capture_count.old, new=capture_count.new)
+
+    async def _on_plc_part(self, has_part_t: int):
+        part_counter = self.plc_part_counter
+        # 换算为主机时钟，与 frame_t、链路时间戳一致
+        host_has_part_t = self.plc_clock.to_host(has_part_t)
+        # 发布 part_count，image saver 据此等待该零件的帧
+        await self.redis.set_part_counter(part_counter=part_counter, press_line=self.press_line)
+        # 通知相机 has_part_t
+        camera_ips = sorted(self.grabbing_cameras)
+        if camera_ips:
+            await self.rabbitmq_producer.publish(camera_ip=camera_ips, data=json.dumps((("part", host_has_part_t),)))
+        _logger.info(f"{self.identity} plc part[counter={part_counter},has_part_t={has_part_t},host_t={host_has_part_t}]")
+
+    async def _on_plc_capture(self, old: typing.Optional[int], new: int):
+        # 两次轮询之间可能有多次触发，capture_count 从 1 开始，循环使用 capture_0 ~ capture_9
+        first = new if old is None or not 0 < new - old <= CAPTURE_TIMESTAMP_NUMBER else old + 1
+        for capture_count in range(first, new + 1):
+            prefix = f"capture_{(capture_count - 1) % CAPTURE_TIMESTAMP_NUMBER}"
+            capture_t = self.modbus_mirror.timestamps.get(prefix)
+            capture_host_t = self.plc_clock.to_host(capture_t)
+            await self.redis.add_plc_capture(
+                press_line=self.press_line,
+                program_id=self.program_id,
+                part_counter=self.plc_part_counter,
+                capture_count=capture_count,
+                capture_t=capture_t,
+                capture_host_t=capture_host_t,
+            )
+            _logger.debug(f"{self.identity} plc capture[count={capture_count},t={capture_t},host_t={capture_host_t},part={self.plc_part_counter}]")
+
+    # #################### 出帧反馈 -> 学习触发延时 ####################
+    async def learn_trigger_timing(self):
+        """image saver 保存 ShuttleImage 后发布各相机的 frame_t，与 has_part_t 比较学习触发延时"""
+        log_t = time.monotonic()
+        async for timestamp, data in self.redis.get_frame_offsets(
+                press_line=self.press_line,
+                block=1000,             # 阻塞1秒等待新消息
+                include_last=False,
+        ):
+            # stop_event 被置为
+            if self.stop_event.is_set():
+                break
+
+            try:
+                if data is not None:
+                    self.trigger_timing.observe(has_part_t=data["has_part_t"], frame_ts=data["frame_ts"])
+            except Exception as err:
+                _logger.exception(f"{self.identity} learn trigger timing error: {err}")
+
+            if time.monotonic() - log_t >= LOG_TRIGGER_TIMING_STATS_INTERVAL_SEC:
+                log_t = time.monotonic()
+                _logger.info(f"{self.identity} trigger timing stats={self.trigger_timing.stats()}")
+
+        _logger.info(f"{self.identity} learn_trigger_timing() ended")
+
+    # #################### 相机心跳 -> 触发决策, 重新打开相机 ####################
+    async def refresh_camera_heartbeats(self):
+        """读取相机心跳，更新 live_cameras / grabbing_cameras"""
+        heartbeats = await self.redis.get_camera_heartbeats(press_line=self.press_line)
+        now = int(time.time() * 1000)
+        live = {
+            ip: heartbeat for ip, heartbeat in heartbeats.items()
+            if ip in self._registered_cameras and now - heartbeat["t"] <= CAMERA_HEARTBEAT_STALE_MS
+        }
+        grabbing = {ip for ip, heartbeat in live.items() if heartbeat["state"] == CameraState.GRABBING}
+
+        lost = self.live_cameras - set(live)
+        recovered = set(live) - self.live_cameras
+        if lost:
+            _logger.warning(f"{self.identity} camera heartbeat lost: {sorted(lost)}")
+        if recovered:
+            _logger.info(f"{self.identity} camera heartbeat recovered: {sorted(recovered)}")
+        for ip in self._registered_cameras:
+            metrics.gauge("camera_heartbeat_live", "camera process heartbeat is fresh", camera=ip).set(int(ip in live))
+
+        self.live_cameras = set(live)
+        self.grabbing_cameras = grabbing
+
+    async def watch_camera_heartbeats(self):
+        """
+        定时读取相机心跳
+        当前零件需要的相机心跳正常但未取流时（例如相机进程重启后处于 standby），重新设置触发源并发送 open
+        """
+        while not self.stop_event.is_set():
+            try:
+                await self.refresh_camera_heartbeats()
+
+                if self.program_id is not None:
+                    required_camera_ips = set(self._parts.get(self.program_id, dict()).get("cameras", list())) & self._registered_cameras
+                    now = time.monotonic()
+                    to_open_camera_ips = [
+                        ip for ip in sorted((required_camera_ips & self.live_cameras) - self.grabbing_cameras)
+                        if now - self._camera_open_t.get(ip, 0) >= CAMERA_REOPEN_INTERVAL_SEC
+                    ]
+                    if to_open_camera_ips:
+                        trigger_source = PLC_TRIGGER_SOURCE if self.capture_mode is CaptureMode.PLC else SOFTWARE_TRIGGER_SOURCE
+                        await self.rabbitmq_producer.publish(
+                            camera_ip=to_open_camera_ips,
+                            data=json.dumps((("set", "TriggerSource", trigger_source), ("open",))),
+                        )
+                        self._camera_open_t.update({ip: now for ip in to_open_camera_ips})
+                        _logger.warning(f"{self.identity} reopen cameras not grabbing: {to_open_camera_ips}")
+
+            except Exception as err:
+                _logger.exception(f"{self.identity} watch camera heartbeats error: {err}")
+
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), timeout=CAMERA_HEARTBEAT_CHECK_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+        _logger.info(f"{self.identity} watch_camera_heartbeats() ended")
+
     # #################### 监控running status -> 开灯, 延时关灯 ####################
     async def subscribe_running_status(self):
         # todo 延时3秒，再接受redis消息，防止错过灯信号，需要优化
         await asyncio.sleep(3)
 
+        # 上一次处理的 running_status，STANDBY <-> STOPPED 时 running_status 不变，不重复处理
+        pre_running_status: typing.Optional[bool] = None
+
         # 使用异步生成器获取运行状态
         async for timestamp, running_status in self.redis.get_running_status(
                 press_line=self.press_line,
@@ -296,11 +722,12 @@ class CameraCtrl:
                 break
 
             try:
-                if running_status is None:
+                if running_status is None or running_status == pre_running_status:
                     continue
+                pre_running_status = running_status
 
-                # 没有相机运行，则关灯
-                if await self.redis.get_running_cameras_number(press_line=self.press_line) <= 0:
+                # 没有相机取流，则关灯
+                if not self.grabbing_cameras:
                     if await self.redis.get_light_enable(press_line=self.press_line):
                         await self.redis.set_light_disable(press_line=self.press_line)
                     continue
@@ -331,12 +758,8 @@ class CameraCtrl:
                     self.light_enable = light_enable
                     _logger.info(f"{self.identity} light enable={self.light_enable}")
 
-                    async with CameraCtrlModbusClient(
-                            host=self.modbus_host,
-                            port=self.modbus_port,
-                            slave=self.modbus_slave
-                    ) as client:
-                        await client.write(registers={"light_enable": self.light_enable})
+                    # 写入排队，断线重连期间不会丢弃
+                    self.modbus_session.submit(registers={"light_enable": self.light_enable})
 
                 await asyncio.sleep(1)
 
@@ -345,6 +768,18 @@ class CameraCtrl:
 
         _logger.info(f"{self.identity} light_control() ended")
 
+    async def publish_modbus_changes(self, changes: list[ModbusChange]):
+        await self.redis.add_modbus_changes(changes=[change.to_dict() for change in changes], press_line=self.press_line)
+
+    async def log_modbus_session_stats(self):
+        while not self.stop_event.is_set():
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), timeout=LOG_MODBUS_SESSION_STATS_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            if self.modbus_session.stats is not None:
+                _logger.info(f"{self.identity} modbus session stats={self.modbus_session.stats.to_dict()}")
+
     @classmethod
     def load_cameras_and_parts(cls, path: typing.Optional[str] = None) -> tuple[set, dict]:
         """
@@ -0,0 +1,10 @@
+from enum import StrEnum
+
+
+class CameraState(StrEnum):
+    CLOSED = "CLOSED"           # 相机未打开
+    STANDBY = "STANDBY"         # 相机已打开并完成参数配置，暂停取流
+    GRABBING = "GRABBING"       # 相机取流中
+
+    def is_opened(self) -> bool:
+        return self is not CameraState.CLOSED
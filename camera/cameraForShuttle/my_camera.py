@@ -5,12 +5,16 @@ import time
 import typing
 import json
 import logging
-from threading import Event, Thread
+from threading import Event, Thread, Lock
 from concurrent.futures import ThreadPoolExecutor
 
 from hikrobot_camera import HikrobotCamera
-from redisDb import AsyncRedisDB
+from redisDb import AsyncRedisDB, PartTrace, PartTraceStage
 from rabbitmq import RabbitmqCameraConsumer
+from ..simulator import SimulatedHikrobotCamera, SimulationParams
+from .camera_state import CameraState
+from .plc_capture import match_capture, SOFTWARE_TRIGGER_SOURCE
+import metrics
 
 
 _logger = logging.getLogger(__name__)
@@ -19,9 +23,18 @@ _logger = logging.getLogger(__name__)
 CAMERA_LOCATION = "shuttle"
 BLOCK_TIMEOUT_S = 1
 WAIT_CAMERA_CLOSE_TIMEOUT_S = 5
+# 心跳发布间隔，秒，CameraCtrl 按 CAMERA_HEARTBEAT_STALE_MS 判断失联
+CAMERA_HEARTBEAT_INTERVAL_SEC = 1
+# plc 硬触发：等待 CameraCtrl 记录触发的时间 (modbus 镜像轮询 + redis)，秒
+PLC_CAPTURE_WAIT_SEC = 1
+PLC_CAPTURE_POLL_SEC = 0.05
+# 匹配帧时读取的最近触发记录数量
+PLC_CAPTURE_LOOKUP_COUNT = 50
 
 
 class MyCamera(HikrobotCamera):
+    # 相机控制消息的接收端，基准测试可替换为本地实现
+    CONSUMER_CLASS = RabbitmqCameraConsumer
 
     def __init__(
             self,
@@ -57,6 +70,35 @@ class MyCamera(HikrobotCamera):
 
         # 穿梭小车有零件的时间
         self.shuttle_has_part_t = None
+        # 触发源为 plc 硬触发，帧按 shuttle:plcCapture 对应到零件
+        self.plc_trigger = False
+
+        # 相机状态机 CLOSED -> STANDBY <-> GRABBING
+        self.camera_state = CameraState.CLOSED
+        self._state_lock = Lock()
+        # 是否需要取流
+        self.grab_request = Event()
+        # 唤醒 camera_worker, 用于及时响应 open/close
+        self.wake_event = Event()
+        # camera_worker 线程
+        self.worker_thread: typing.Optional[Thread] = None
+        # 心跳任务
+        self.heartbeat_task: typing.Optional[asyncio.Task] = None
+
+        # 接收 open 命令的时间, 用于统计 open -> GRABBING 的耗时
+        self._open_t: typing.Optional[float] = None
+        # 进入 GRABBING 的时间, 用于统计 GRABBING -> 第一帧 的触发等待
+        self._grabbing_t: typing.Optional[float] = None
+        # 收到软触发的时间，毫秒时间戳，用于零件链路追踪
+        self._trigger_received_t: typing.Optional[float] = None
+
+        # 指标
+        self.frames_total = metrics.counter("camera_frames_total", "frames from SDK callback", camera=ip)
+        self.triggers_total = metrics.counter("camera_triggers_received_total", "TriggerSoftware commands received", camera=ip)
+        self.output_frame_seconds = metrics.histogram("camera_output_frame_seconds", "write frame to redis", camera=ip)
+        self.output_frame_errors_total = metrics.counter("camera_output_frame_errors_total", "write frame to redis errors", camera=ip)
+        self.first_frame_wait_seconds = metrics.histogram("camera_first_frame_wait_seconds", "grabbing to first frame", camera=ip)
+        self.plc_capture_unmatched_total = metrics.counter("camera_plc_capture_unmatched_total", "plc triggered frames without capture record", camera=ip)
 
     @classmethod
     async def create(
@@ -69,6 +111,13 @@ class MyCamera(HikrobotCamera):
             camera_params_path: str,
             **kwargs
     ) -> typing.Self:
+        # camera_params.yml 中 simulation.enable 的相机使用模拟相机
+        simulation = SimulationParams.load(ip=ip, camera_params_path=camera_params_path)
+        if simulation is not None:
+            cls = cls.simulated()
+            kwargs["simulation"] = simulation
+            _logger.warning(f"[{cls.__name__}][{ip}] using simulated camera")
+
         # 创建相机实例
         camera = cls(
             stop_event=stop_event,
@@ -89,7 +138,7 @@ class MyCamera(HikrobotCamera):
         )
 
         # rabbitmq
-        camera.rabbitmq_consumer = RabbitmqCameraConsumer(
+        camera.rabbitmq_consumer = cls.CONSUMER_CLASS(
             rabbitmq_url=camera.rabbitmq_url,
             camera_ip=camera.ip,
             location=CAMERA_LOCATION
@@ -99,8 +148,20 @@ class MyCamera(HikrobotCamera):
         # 初始化 event
         camera.stop_event.clear()
 
+        # 心跳
+        camera.heartbeat_task = asyncio.create_task(camera.heartbeat_worker())
+
         return camera
 
+    @classmethod
+    def simulated(cls) -> type:
+        """使用模拟相机的子类，MRO: cls -> SimulatedHikrobotCamera -> HikrobotCamera"""
+        if issubclass(cls, SimulatedHikrobotCamera):
+            return cls
+        if cls.__dict__.get("_simulated_class") is None:
+            cls._simulated_class = type(f"Simulated{cls.__name__}", (cls, SimulatedHikrobotCamera), dict())
+        return cls._simulated_class
+
     # #################### 相机运行 ####################
     def get_one_frame_callback(self, pData, pFrameInfo, pUser):
         # 帧信息
@@ -115,16 +176,70 @@ class MyCamera(HikrobotCamera):
 
         # frame
         image_data = super().get_one_frame_callback(pData, pFrameInfo, pUser)
-        # 将图片数据放入队列
-        asyncio.run_coroutine_threadsafe(self._output_frame(image_data), self.loop)
+        frame_callback_t = time.time() * 1000
+        self.frames_total.inc()
+        # GRABBING -> 第一帧 触发等待
+        self._measure_first_frame_wait()
+        # 一次软触发只对应一帧
+        received_t, self._trigger_received_t = self._trigger_received_t, None
+        # 将图片数据放入队列，帧信息在回调线程读取，下一帧会覆盖 stFrameInfo
+        asyncio.run_coroutine_threadsafe(
+            self._output_frame(
+                image_data, received_t, frame_callback_t,
+                frame_num=self.stFrameInfo.nFrameNum,
+                frame_t=self.stFrameInfo.nHostTimeStamp,
+            ),
+            self.loop
+        )
         return image_data
 
-    async def _output_frame(self, image_data):
+    def _measure_open_latency(self):
+        """统计 open 命令 -> GRABBING 的耗时，并发布到 redis"""
+        open_t = self._open_t
+        if open_t is None:
+            return
+        self._open_t = None
+        latency_ms = (time.perf_counter() - open_t) * 1000
+        _logger.info(f"{self.identity} open to grabbing latency={latency_ms:.1f}ms")
+        asyncio.run_coroutine_threadsafe(
+            self.redis.set_camera_open_latency(ip=self.ip, press_line=self.press_line, latency_ms=latency_ms),
+            self.loop
+        )
+
+    def _measure_first_frame_wait(self):
+        """统计 GRABBING -> 第一帧 的耗时，并发布到 redis，取决于下一次触发，不计入 open 耗时"""
+        grabbing_t = self._grabbing_t
+        if grabbing_t is None:
+            return
+        self._grabbing_t = None
+        wait_s = time.perf_counter() - grabbing_t
+        self.first_frame_wait_seconds.observe(wait_s)
+        _logger.info(f"{self.identity} grabbing to first frame wait={wait_s * 1000:.1f}ms")
+        asyncio.run_coroutine_threadsafe(
+            self.redis.set_camera_first_frame_wait(ip=self.ip, press_line=self.press_line, wait_ms=wait_s * 1000),
+            self.loop
+        )
+
+    async def _output_frame(
+            self,
+            image_data,
+            received_t: typing.Optional[float] = None,
+            frame_callback_t: typing.Optional[float] = None,
+            frame_num: typing.Optional[int] = None,
+            frame_t: typing.Optional[int] = None,
+    ):
+        start_t = time.perf_counter()
         try:
-            # todo 判断 program_id, part_counter 是否有效
-            # 从 redis 获取数据
-            program_id_t, program_id = await self.redis.get_latest_program_id(press_line=self.press_line)
-            part_counter_t, part_counter = await self.redis.get_latest_part_counter(press_line=self.press_line)
+            # plc 硬触发：按帧时间匹配触发记录，使用触发时的零件
+            # plc 触发可能早于 part_counter 发布，不能使用 redis 中最新的 part_counter
+            capture = await self._match_plc_capture(frame_t) if self.plc_trigger else None
+            if capture is not None:
+                program_id, part_counter = capture["program_id"], capture["part_counter"]
+            else:
+                # todo 判断 program_id, part_counter 是否有效
+                # 从 redis 获取数据
+                program_id_t, program_id = await self.redis.get_latest_program_id(press_line=self.press_line)
+                part_counter_t, part_counter = await self.redis.get_latest_part_counter(press_line=self.press_line)
             # 放入 redis
             await self.redis.set_shuttle_frame(
                 press_line=self.press_line,
@@ -133,22 +248,58 @@ class MyCamera(HikrobotCamera):
                 camera_ip=self.ip,
                 camera_user_id=self.DeviceUserID,
                 matrix=image_data,
-                frame_num=self.stFrameInfo.nFrameNum,
-                frame_t=self.stFrameInfo.nHostTimeStamp,
+                frame_num=frame_num,
+                frame_t=frame_t,
                 has_part_t=self.shuttle_has_part_t,
+                capture_count=capture["capture_count"] if capture is not None else None,
             )
+            # 链路时间戳
+            stages = {
+                PartTrace.field(PartTraceStage.RECEIVED, self.ip): received_t,
+                PartTrace.field(PartTraceStage.FRAME, self.ip): frame_callback_t,
+                PartTrace.field(PartTraceStage.REDIS_SET, self.ip): time.time() * 1000,
+            }
+            await self.redis.add_part_trace(
+                press_line=self.press_line,
+                program_id=program_id,
+                part_counter=part_counter,
+                stages={k: v for k, v in stages.items() if v is not None},
+            )
+            self.output_frame_seconds.observe(time.perf_counter() - start_t)
         except Exception as err:
+            self.output_frame_errors_total.inc()
             _logger.exception(f"{self.identity} output framer to redis error: {err}")
 
+    async def _match_plc_capture(self, frame_t: typing.Optional[int]) -> typing.Optional[dict]:
+        """
+        帧对应的 plc 触发记录
+            CameraCtrl 通过 modbus 镜像轮询发现触发，记录晚于出帧，等待最多 PLC_CAPTURE_WAIT_SEC
+        :return: 没有匹配的记录时返回 None，使用最新的 part_counter
+        """
+        deadline = time.monotonic() + PLC_CAPTURE_WAIT_SEC
+        while True:
+            captures = await self.redis.get_plc_captures(press_line=self.press_line, count=PLC_CAPTURE_LOOKUP_COUNT)
+            capture = match_capture(captures, frame_t)
+            if capture is not None and capture["part_counter"] is not None:
+                return capture
+            if time.monotonic() >= deadline:
+                self.plc_capture_unmatched_total.inc()
+                _logger.warning(f"{self.identity} frame[t={frame_t}] has no plc capture record, use latest part counter")
+                return None
+            await asyncio.sleep(PLC_CAPTURE_POLL_SEC)
+
     def camera_worker(self):
-        """相机工作，需要在子线程中进行"""
+        """
+        相机工作，需要在子线程中进行
+        打开相机并配置参数后进入 STANDBY（暂停取流），由 grab_request 控制 STANDBY <-> GRABBING 切换
+        """
         try:
-            # 阻塞函数
-            block_func = self.get_one_frame if not self.grab_method.is_passive() else lambda x=BLOCK_TIMEOUT_S: time.sleep(x)
             # 复位 stop_event
             self.stop_event.clear()
-            # 打开相机, 并取流
+            # 打开相机, 配置参数
             with self:
+                # 进入 standby, 暂停取流
+                self._pause_grabbing()
                 while True:
                     # stop_event 被置为
                     if self.stop_event.is_set():
@@ -157,26 +308,82 @@ class MyCamera(HikrobotCamera):
                     if not self.is_device_connected():
                         raise ConnectionAbortedError(f"lose connection")
 
-                    # 主动取流方式，在循环中调用 get_one_frame()
-                    # self.get_one_frame()
-                    # 被动取流方式, 等待即可
-                    # time.sleep(1)
-                    block_func()
+                    # 状态切换
+                    if self.grab_request.is_set() and self.camera_state is CameraState.STANDBY:
+                        self._resume_grabbing()
+                    elif not self.grab_request.is_set() and self.camera_state is CameraState.GRABBING:
+                        self._pause_grabbing()
+
+                    if self.camera_state is CameraState.GRABBING and not self.grab_method.is_passive():
+                        # 主动取流方式，在循环中调用 get_one_frame()
+                        self.get_one_frame()
+                    else:
+                        # 被动取流方式 或 standby, 等待唤醒即可
+                        self.wake_event.wait(BLOCK_TIMEOUT_S)
+                        self.wake_event.clear()
 
         # except KeyboardInterrupt:
         #     _logger.warning(f"{self.identity} camera_worker() cancelled")
         except Exception as err:
             _logger.exception(f"{self.identity} camera_worker() error: {err}")
         finally:
+            self._set_state(CameraState.CLOSED)
             _logger.info(f"{self.identity} camera_worker() ended")
 
+    def _set_state(self, state: CameraState):
+        with self._state_lock:
+            if self.camera_state is not state:
+                _logger.info(f"{self.identity} state {self.camera_state} -> {state}")
+                self.camera_state = state
+                # 状态变化立即发布心跳
+                if self.redis is not None:
+                    asyncio.run_coroutine_threadsafe(self.publish_heartbeat(), self.loop)
+
+    def _resume_grabbing(self):
+        """STANDBY -> GRABBING"""
+        self.start_grabbing()
+        self._set_state(CameraState.GRABBING)
+        # open -> GRABBING 耗时
+        self._measure_open_latency()
+        self._grabbing_t = time.perf_counter()
+        asyncio.run_coroutine_threadsafe(self.redis.add_running_camera(ip=self.ip, press_line=self.press_line), self.loop)
+
+    def _pause_grabbing(self):
+        """GRABBING -> STANDBY, 相机保持打开和参数配置"""
+        if self.camera_state is CameraState.GRABBING:
+            self.stop_grabbing()
+        self._set_state(CameraState.STANDBY)
+        asyncio.run_coroutine_threadsafe(self.redis.remove_running_camera(ip=self.ip, press_line=self.press_line), self.loop)
+
+    def prewarm(self):
+        """预热相机：在子线程中打开相机并配置参数，暂停取流"""
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            return
+        self.worker_thread = Thread(target=self.camera_worker, daemon=True)
+        self.worker_thread.start()
+
+    def request_grabbing(self):
+        """开始取流，如果相机未预热，则先打开相机"""
+        self._open_t = time.perf_counter()
+        self.grab_request.set()
+        self.wake_event.set()
+        if not self.camera_state.is_opened():
+            self.prewarm()
+
+    def request_standby(self):
+        """暂停取流，相机回到 standby"""
+        self._open_t = None
+        self._grabbing_t = None
+        self.grab_request.clear()
+        self.wake_event.set()
+
     def __enter__(self) -> typing.Self:
         """
         Camera initialization : open, setup, and start grabbing frames from the device.
         :return:
         """
         super().__enter__()
-        asyncio.run_coroutine_threadsafe(self.redis.add_running_camera(ip=self.ip, press_line=self.press_line), self.loop)
+        self._set_state(CameraState.GRABBING)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -188,6 +395,7 @@ class MyCamera(HikrobotCamera):
         :return:
         """
         super().__exit__(exc_type, exc_value, traceback)
+        self._set_state(CameraState.CLOSED)
         asyncio.run_coroutine_threadsafe(self.redis.remove_running_camera(ip=self.ip, press_line=self.press_line), self.loop)
         # 返回 False 以便异常继续抛出
         return False
@@ -201,6 +409,7 @@ class MyCamera(HikrobotCamera):
                     关闭相机: ["close",]
                     设置参数: ["set", 参数节点 "TriggerSoftware", 设置值]
                     获取参数: ["get", 参数节点 "Width"]
+                    plc 硬触发的零件: ["part", has_part_t]
         :return: 响应
                 ["get", 参数节点 "Width", 参数值]
                 ["get", 参数节点 "Width", "error", 错误信息]
@@ -208,24 +417,31 @@ class MyCamera(HikrobotCamera):
         response = list()
 
         try:
-            # 打开相机
+            # 打开相机 -> 开始取流
             if cmd[0] == "open":
-                # 在子线程中打开相机
-                t = Thread(target=self.camera_worker, daemon=True)
-                t.start()
+                self.request_grabbing()
 
-            # 关闭相机
+            # 关闭相机 -> 暂停取流，相机保持 standby
             elif cmd[0] == "close":
-                self.stop_event.set()
+                self.request_standby()
 
             # 设置参数
             elif cmd[0] == "set":
                 # 特殊情况：
                 # 1. 软触发，获取 shuttle_has_part_t
                 if cmd[1] == "TriggerSoftware":
+                    self._trigger_received_t = time.time() * 1000
+                    self.triggers_total.inc()
                     self.shuttle_has_part_t = cmd[2]
+                # 2. 触发源，plc 硬触发时帧按触发记录对应到零件
+                elif cmd[1] == "TriggerSource":
+                    self.plc_trigger = cmd[2] != SOFTWARE_TRIGGER_SOURCE
                 self.setitem(key=cmd[1], value=cmd[2])
 
+            # plc 硬触发模式，只更新 shuttle_has_part_t，不触发
+            elif cmd[0] == "part":
+                self.shuttle_has_part_t = cmd[1]
+
             # 获取参数
             elif cmd[0] == "get":
                 value = self.getitem(key=cmd[1])
@@ -285,17 +501,45 @@ class MyCamera(HikrobotCamera):
             await self.cleanup()
             _logger.info(f"{self.identity} rabbitmq_worker() ended")
 
+    # #################### 心跳 ####################
+    def heartbeat(self) -> dict:
+        return {
+            "t": int(time.time() * 1000),
+            "pid": os.getpid(),
+            "state": str(self.camera_state),
+            "worker_alive": self.worker_thread is not None and self.worker_thread.is_alive(),
+            "frames": int(self.frames_total.value),
+        }
+
+    async def publish_heartbeat(self):
+        try:
+            await self.redis.set_camera_heartbeat(ip=self.ip, press_line=self.press_line, heartbeat=self.heartbeat())
+        except Exception as err:
+            _logger.warning(f"{self.identity} publish heartbeat error: {err}")
+
+    async def heartbeat_worker(self):
+        """定时发布心跳，CameraCtrl 根据心跳判断相机进程是否存活、是否在取流"""
+        while True:
+            await self.publish_heartbeat()
+            await asyncio.sleep(CAMERA_HEARTBEAT_INTERVAL_SEC)
+
     async def cleanup(self):
         # 关闭 event
         # if self._own_stop_event:
         self.stop_event.set()
+        self.wake_event.set()
+
+        # 停止心跳
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            await asyncio.gather(self.heartbeat_task, return_exceptions=True)
 
         # 等待 相机关机
         start_t = time.time()
         while True:
             await asyncio.sleep(0.5)
 
-            if not await self.redis.is_camera_running(ip=self.ip, press_line=self.press_line):
+            if not self.camera_state.is_opened() and not await self.redis.is_camera_running(ip=self.ip, press_line=self.press_line):
                 break
 
             if time.time() - start_t >= WAIT_CAMERA_CLOSE_TIMEOUT_S:
@@ -303,6 +547,8 @@ class MyCamera(HikrobotCamera):
                 _logger.warning(f"{self.identity} wait camera_worker() end timeout")
                 break
 
+        # 删除心跳
+        await self.redis.remove_camera_heartbeat(ip=self.ip, press_line=self.press_line)
         # 关闭 rabbitmq
         await self.rabbitmq_consumer.close()
         # 关闭 redis
@@ -0,0 +1,63 @@
+import typing
+import collections
+
+
+# plc 硬触发时相机的触发源
+PLC_TRIGGER_SOURCE = "Line0"
+SOFTWARE_TRIGGER_SOURCE = "Software"
+# 估计 plc 时钟差使用的最近时间戳数量
+PLC_CLOCK_WINDOW = 200
+# 帧时间与触发时间 (主机时钟) 的最大差值，毫秒，包含时钟差估计误差和相机曝光、传输延迟
+CAPTURE_MATCH_TOLERANCE_MS = 150
+
+
+class PlcClock:
+    def __init__(self, window: int = PLC_CLOCK_WINDOW):
+        """
+        plc 时钟 -> 主机时钟
+            modbus 镜像轮询时发现 plc 时间戳变化，主机时间 - plc 时间 = 时钟差 + 轮询延迟 (>= 0)
+            取最近 window 次的最小值作为时钟差，轮询延迟最小的一次最接近真实时钟差，同时跟随时钟漂移
+        :param window:
+        """
+        self.offsets: collections.deque[int] = collections.deque(maxlen=window)
+
+    def observe(self, plc_t: int, host_t: int):
+        """
+        :param plc_t: plc 时间戳，毫秒
+        :param host_t: 主机发现该时间戳的时间，毫秒
+        """
+        self.offsets.append(host_t - plc_t)
+
+    @property
+    def offset_ms(self) -> typing.Optional[int]:
+        return min(self.offsets) if self.offsets else None
+
+    def to_host(self, plc_t: typing.Optional[int]) -> typing.Optional[int]:
+        """plc 时间戳换算为主机时钟，没有样本时返回 None"""
+        offset = self.offset_ms
+        if plc_t is None or offset is None:
+            return None
+        return plc_t + offset
+
+
+def match_capture(
+        captures: typing.Iterable[dict],
+        frame_t: typing.Optional[int],
+        tolerance_ms: float = CAPTURE_MATCH_TOLERANCE_MS,
+) -> typing.Optional[dict]:
+    """
+    帧对应的 plc 触发记录
+    :param captures: AsyncRedisDB.get_plc_captures()
+    :param frame_t: 帧的主机时间戳，毫秒
+    :param tolerance_ms:
+    :return: capture_host_t 与 frame_t 最接近且不超过 tolerance_ms 的记录，没有时返回 None
+    """
+    if frame_t is None:
+        return None
+    candidates = [c for c in captures if c.get("capture_host_t") is not None]
+    if not candidates:
+        return None
+    capture = min(candidates, key=lambda c: abs(frame_t - c["capture_host_t"]))
+    if abs(frame_t - capture["capture_host_t"]) > tolerance_ms:
+        return None
+    return capture
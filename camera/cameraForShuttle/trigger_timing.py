@@ -0,0 +1,175 @@
+import typing
+import statistics
+import dataclasses
+from collections import OrderedDict
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# SPM 分档宽度
+SPM_BAND_WIDTH = 2.0
+# 指数平滑系数
+TIMING_EWMA_ALPHA = 0.2
+# 分档样本不足时，不做延时补偿
+MIN_BAND_SAMPLES = 5
+# 相对 parts_info.yaml 中 trigger_delay 的最大调整比例
+MAX_ADJUST_RATIO = 0.5
+# 等待出帧反馈的触发记录数量
+PENDING_MAX_SIZE = 1000
+
+
+def _ewma(avg: float, value: float, samples: int, alpha: float = TIMING_EWMA_ALPHA) -> float:
+    return value if samples == 0 else avg + alpha * (value - avg)
+
+
+@dataclasses.dataclass
+class TriggerTimingStats:
+    """触发 -> 出帧 的统计"""
+    samples: int = 0
+    latency_ms: float = 0.0     # 发送触发 -> 出帧
+    offset_ms: float = 0.0      # 传感器沿 -> 出帧
+    spm: float = 0.0
+
+    def observe(self, latency_ms: float, offset_ms: float, spm: typing.Optional[float]):
+        self.latency_ms = _ewma(self.latency_ms, latency_ms, self.samples)
+        self.offset_ms = _ewma(self.offset_ms, offset_ms, self.samples)
+        if spm:
+            self.spm = _ewma(self.spm, spm, self.samples) if self.spm else spm
+        self.samples += 1
+
+    def to_dict(self) -> dict:
+        return {k: (round(v, 1) if isinstance(v, float) else v) for k, v in dataclasses.asdict(self).items()}
+
+
+@dataclasses.dataclass
+class TriggerPlan:
+    program_id: int
+    band: int
+    spm: typing.Optional[float]
+    delay_ms: float
+
+
+class TriggerTimingModel:
+    def __init__(
+            self,
+            band_width: float = SPM_BAND_WIDTH,
+            max_adjust_ratio: float = MAX_ADJUST_RATIO,
+            min_band_samples: int = MIN_BAND_SAMPLES,
+    ):
+        """
+        按 program 和 SPM 分档学习软触发延时
+            shuttle 由压机曲柄驱动，零件到达拍照位置的时间与节拍成正比
+            理想出帧时刻 = (trigger_delay + 该 program 的平均触发延迟) * 参考 SPM / 当前 SPM
+            发送延时 = 理想出帧时刻 - 当前 SPM 分档的触发延迟
+            trigger_delay 是人工在参考 SPM 下调好的发送延时
+            参考 SPM 未配置时，使用该 program 统计建立时 (前 min_band_samples 个未调整的零件) 的平均 SPM 并固定，
+            不能使用持续更新的平均 SPM，否则 参考 SPM / 当前 SPM 会回到 1，调整被抵消
+        :param band_width: SPM 分档宽度
+        :param max_adjust_ratio: 相对 trigger_delay 的最大调整比例
+        :param min_band_samples: 分档样本数不足时只做节拍缩放
+        """
+        self.band_width = band_width
+        self.max_adjust_ratio = max_adjust_ratio
+        self.min_band_samples = min_band_samples
+
+        # program_id -> 统计
+        self.programs: dict[int, TriggerTimingStats] = dict()
+        # (program_id, band) -> 统计
+        self.bands: dict[tuple[int, int], TriggerTimingStats] = dict()
+        # program_id -> 统计建立时固定的参考 SPM
+        self.reference_spms: dict[int, float] = dict()
+        # has_part_t -> 触发记录，等待出帧反馈
+        self.pending: OrderedDict[int, TriggerPlan] = OrderedDict()
+
+    def band(self, spm: typing.Optional[float]) -> int:
+        """SPM 分档，未知为 -1"""
+        return -1 if not spm else int(spm // self.band_width)
+
+    def plan(
+            self,
+            program_id: typing.Optional[int],
+            has_part_t: int,
+            spm: typing.Optional[float],
+            trigger_delay: float,
+            reference_spm: typing.Optional[float] = None,
+            adaptive: bool = True,
+    ) -> float:
+        """
+        计算本次软触发的发送延时，并记录等待出帧反馈
+        :param program_id:
+        :param has_part_t: 传感器沿时间戳，毫秒，与 TriggerSoftware 的值相同
+        :param spm: 当前冲次，最近节拍的中位数
+        :param trigger_delay: parts_info.yaml 中的触发延时，秒
+        :param reference_spm: trigger_delay 调试时的 SPM，可选
+        :param adaptive: False 时只记录，不调整
+        :return: 发送延时，秒
+        """
+        base_ms = trigger_delay * 1000
+        delay_ms = base_ms
+        if adaptive and program_id is not None:
+            delay_ms = self._adjust(program_id, spm, base_ms, reference_spm)
+
+        if program_id is not None:
+            self.pending[has_part_t] = TriggerPlan(program_id=program_id, band=self.band(spm), spm=spm, delay_ms=delay_ms)
+            while len(self.pending) > PENDING_MAX_SIZE:
+                self.pending.popitem(last=False)
+
+        return delay_ms / 1000
+
+    def _adjust(self, program_id: int, spm: typing.Optional[float], base_ms: float, reference_spm: typing.Optional[float]) -> float:
+        program = self.programs.get(program_id)
+        if program is None or program.samples < self.min_band_samples:
+            return base_ms
+
+        # 理想出帧时刻，按节拍缩放
+        target_ms = base_ms + program.latency_ms
+        reference_spm = reference_spm or self.reference_spms.get(program_id)
+        if spm and reference_spm:
+            target_ms *= reference_spm / spm
+
+        # 当前分档的触发延迟
+        band = self.bands.get((program_id, self.band(spm)))
+        latency_ms = band.latency_ms if band is not None and band.samples >= self.min_band_samples else program.latency_ms
+
+        delay_ms = target_ms - latency_ms
+        low = max(0.0, base_ms * (1 - self.max_adjust_ratio))
+        high = base_ms * (1 + self.max_adjust_ratio)
+        return min(high, max(low, delay_ms))
+
+    def observe(self, has_part_t: int, frame_ts: typing.Sequence[int]) -> typing.Optional[TriggerPlan]:
+        """
+        出帧反馈，来自保存后的 ShuttleImage 记录
+        :param has_part_t:
+        :param frame_ts: 该零件各相机的 frame_t，毫秒
+        :return: 对应的触发记录，没有记录时返回 None
+        """
+        plan = self.pending.pop(has_part_t, None)
+        if plan is None or not frame_ts:
+            return None
+
+        offset_ms = statistics.median(frame_ts) - has_part_t
+        latency_ms = offset_ms - plan.delay_ms
+        program = self.programs.setdefault(plan.program_id, TriggerTimingStats())
+        program.observe(latency_ms, offset_ms, plan.spm)
+        # 统计建立前不做调整，此时的平均 SPM 即 trigger_delay 对应的 SPM
+        if plan.program_id not in self.reference_spms and program.samples >= self.min_band_samples and program.spm:
+            self.reference_spms[plan.program_id] = program.spm
+            _logger.info(f"{self.identity} program[{plan.program_id}] reference spm={program.spm:.1f}")
+        self.bands.setdefault((plan.program_id, plan.band), TriggerTimingStats()).observe(latency_ms, offset_ms, plan.spm)
+        _logger.debug(f"{self.identity} program[{plan.program_id}] band[{plan.band}] delay={plan.delay_ms:.1f}ms, offset={offset_ms:.1f}ms, latency={latency_ms:.1f}ms")
+        return plan
+
+    def stats(self) -> dict:
+        return {
+            "programs": {program_id: stats.to_dict() for program_id, stats in self.programs.items()},
+            "reference_spms": {program_id: round(spm, 1) for program_id, spm in self.reference_spms.items()},
+            "bands": {
+                f"{program_id}@{band * self.band_width:g}spm" if band >= 0 else f"{program_id}@unknown": stats.to_dict()
+                for (program_id, band), stats in self.bands.items()
+            },
+        }
+
+    @property
+    def identity(self):
+        return f"TriggerTimingModel"
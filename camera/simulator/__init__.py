@@ -0,0 +1 @@
+from .simulated_camera import SimulatedHikrobotCamera, SimulationParams, SIM_PIXEL_TYPES
@@ -0,0 +1,283 @@
+import time
+import heapq
+import random
+import types
+import typing
+import dataclasses
+import threading
+import logging
+import yaml
+import numpy as np
+
+from hikrobot_camera import HikrobotCamera
+
+_logger = logging.getLogger(__name__)
+
+
+# 像素格式 -> 通道数
+SIM_PIXEL_TYPES = {
+    "Mono8": 1,
+    "RGB8Packed": 3,
+    "BGR8Packed": 3,
+}
+# 取流方式，与 camera_params.yml custom.grab_method 一致
+SIM_GRAB_METHOD_CALLBACK = 3
+# 出帧线程空闲时的等待时间，秒
+SIM_IDLE_WAIT_S = 0.5
+
+
+@dataclasses.dataclass
+class SimulationParams:
+    """
+    camera_params.yml 中的 simulation 配置，global.simulation 为默认值，<ip>.simulation 覆盖
+        enable:             是否使用模拟相机
+        width / height:     分辨率
+        pixel_type:         Mono8 / RGB8Packed / BGR8Packed
+        exposure_delay_ms:  TriggerSoftware -> 出帧 的时间（曝光 + 传输）
+        jitter_ms:          出帧时间的随机抖动，[0, jitter_ms]
+        drop_rate:          丢帧概率，[0, 1]
+        user_id:            DeviceUserID，默认取 ip 的最后一段
+        seed:               随机数种子，用于复现
+    """
+    enable: bool = False
+    width: int = 2448
+    height: int = 2048
+    pixel_type: str = "Mono8"
+    exposure_delay_ms: float = 20
+    jitter_ms: float = 0
+    drop_rate: float = 0
+    user_id: typing.Optional[str] = None
+    seed: typing.Optional[int] = None
+
+    def __post_init__(self):
+        if self.pixel_type not in SIM_PIXEL_TYPES:
+            raise ValueError(f"unsupported simulation pixel_type[{self.pixel_type}], expected one of {list(SIM_PIXEL_TYPES)}")
+        if not 0 <= self.drop_rate <= 1:
+            raise ValueError(f"simulation drop_rate[{self.drop_rate}] must be in [0, 1]")
+
+    @property
+    def shape(self) -> tuple:
+        channels = SIM_PIXEL_TYPES[self.pixel_type]
+        return (self.height, self.width) if channels == 1 else (self.height, self.width, channels)
+
+    @classmethod
+    def load(cls, ip: str, camera_params_path: typing.Optional[str]) -> typing.Optional[typing.Self]:
+        """
+        读取 ip 的 simulation 配置
+        :return: 未启用模拟时返回 None
+        """
+        if not camera_params_path:
+            return None
+        with open(camera_params_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or dict()
+
+        params = {
+            **((config.get("global") or dict()).get("simulation") or dict()),
+            **((config.get(ip) or dict()).get("simulation") or dict()),
+        }
+        if not params.get("enable", False):
+            return None
+
+        fields = {field.name for field in dataclasses.fields(cls)}
+        unknown = set(params) - fields
+        if unknown:
+            _logger.warning(f"[SimulatedCamera][{ip}] unknown simulation params ignored: {sorted(unknown)}")
+        return cls(**{k: v for k, v in params.items() if k in fields})
+
+    @classmethod
+    def custom(cls, ip: str, camera_params_path: typing.Optional[str]) -> dict:
+        """读取 ip 的 custom 配置，global.custom 为默认值"""
+        if not camera_params_path:
+            return dict()
+        with open(camera_params_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or dict()
+        return {
+            **((config.get("global") or dict()).get("custom") or dict()),
+            **((config.get(ip) or dict()).get("custom") or dict()),
+        }
+
+
+class _GrabMethod:
+    def __init__(self, method: int):
+        self.method = method
+
+    def is_passive(self) -> bool:
+        return self.method == SIM_GRAB_METHOD_CALLBACK
+
+
+class SimulatedHikrobotCamera(HikrobotCamera):
+    def __init__(
+            self,
+            ip: str,
+            camera_params_path: typing.Optional[str] = None,
+            simulation: typing.Optional[SimulationParams] = None,
+            **kwargs
+    ):
+        """
+        模拟海康相机，与 HikrobotCamera 的 getitem / setitem / __enter__ / get_one_frame_callback 约定一致，不需要 SDK 设备
+            收到 TriggerSoftware 后，经过 exposure_delay_ms + 抖动，由出帧线程调用 self.get_one_frame_callback()
+            不调用 HikrobotCamera.__init__；与业务类组合时放在业务类之后，例如 class X(MyCamera, SimulatedHikrobotCamera)
+        :param ip:
+        :param camera_params_path: camera_params.yml，读取 native / custom / simulation 配置
+        :param simulation: 模拟参数，None 则从 camera_params_path 读取
+        """
+        self.ip = ip
+        self.camera_params_path = camera_params_path
+        self.simulation = simulation or SimulationParams.load(ip, camera_params_path) or SimulationParams(enable=True)
+
+        custom = SimulationParams.custom(ip, camera_params_path)
+        self.grab_method = _GrabMethod(custom.get("grab_method", SIM_GRAB_METHOD_CALLBACK))
+        self.get_one_frame_timeout_ms = custom.get("get_one_frame_timeout_ms", 1000)
+
+        self.DeviceUserID = self.simulation.user_id or ip.rsplit(".", 1)[-1]
+        self.stFrameInfo = types.SimpleNamespace(
+            nWidth=self.simulation.width,
+            nHeight=self.simulation.height,
+            enPixelType=self.simulation.pixel_type,
+            nFrameNum=0,
+            nHostTimeStamp=0,
+            nFrameLen=0,
+        )
+
+        # 节点参数
+        self._params: dict = {
+            "Width": self.simulation.width,
+            "Height": self.simulation.height,
+            "PixelFormat": self.simulation.pixel_type,
+        }
+
+        self._random = random.Random(self.simulation.seed)
+        # 预先生成噪声帧，每帧拷贝一次并写入帧号，与 SDK 转换缓冲区的开销相当
+        self._frame = np.random.default_rng(self.simulation.seed).integers(0, 256, size=self.simulation.shape, dtype=np.uint8)
+
+        self._opened = False
+        self._grabbing = False
+        # 待出帧的软触发 [(出帧时间 perf_counter, 序号)]
+        self._pending: list[tuple[float, int]] = list()
+        self._trigger_seq = 0
+        self._cond = threading.Condition()
+        self._emitter: typing.Optional[threading.Thread] = None
+
+        # 统计
+        self.triggers = 0
+        self.frames = 0
+        self.dropped = 0
+
+    def __enter__(self) -> typing.Self:
+        self._opened = True
+        for key, value in self._native_params().items():
+            self.setitem(key, value)
+        self.start_grabbing()
+        _logger.info(f"{self.identity} opened, {self.simulation}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_grabbing()
+        self._opened = False
+        _logger.info(f"{self.identity} closed, triggers={self.triggers} frames={self.frames} dropped={self.dropped}")
+        # 返回 False 以便异常继续抛出
+        return False
+
+    def start_grabbing(self):
+        with self._cond:
+            self._grabbing = True
+            self._pending.clear()
+        if self.grab_method.is_passive() and (self._emitter is None or not self._emitter.is_alive()):
+            self._emitter = threading.Thread(target=self._emit_worker, daemon=True)
+            self._emitter.start()
+
+    def stop_grabbing(self):
+        with self._cond:
+            self._grabbing = False
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._emitter is not None and self._emitter is not threading.current_thread():
+            self._emitter.join()
+        self._emitter = None
+
+    def is_device_connected(self) -> bool:
+        return self._opened
+
+    def setitem(self, key: str, value):
+        if key == "TriggerSoftware":
+            self._trigger()
+            return
+        if key in ("Width", "Height", "PixelFormat") and value != self._params[key]:
+            raise ValueError(f"{self.identity} {key} is fixed by simulation params: {self._params[key]}")
+        self._params[key] = value
+
+    def getitem(self, key: str):
+        if key not in self._params:
+            raise KeyError(f"{self.identity} node[{key}] not found")
+        return self._params[key]
+
+    def _native_params(self) -> dict:
+        if not self.camera_params_path:
+            return dict()
+        with open(self.camera_params_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or dict()
+        return {
+            **((config.get("global") or dict()).get("native") or dict()),
+            **((config.get(self.ip) or dict()).get("native") or dict()),
+        }
+
+    def _trigger(self):
+        """软触发，未取流时忽略，与相机行为一致"""
+        with self._cond:
+            if not self._grabbing:
+                return
+            self.triggers += 1
+            if self._random.random() < self.simulation.drop_rate:
+                self.dropped += 1
+                return
+            delay_ms = self.simulation.exposure_delay_ms + self._random.uniform(0, self.simulation.jitter_ms)
+            self._trigger_seq += 1
+            heapq.heappush(self._pending, (time.perf_counter() + delay_ms / 1000, self._trigger_seq))
+            self._cond.notify_all()
+
+    def _next_due(self, timeout: float) -> bool:
+        """等待下一个到期的软触发，到期返回 True"""
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while self._grabbing:
+                now = time.perf_counter()
+                if self._pending and self._pending[0][0] <= now:
+                    heapq.heappop(self._pending)
+                    return True
+                if now >= deadline:
+                    return False
+                wait = min(deadline, self._pending[0][0]) - now if self._pending else deadline - now
+                self._cond.wait(wait)
+        return False
+
+    def _emit_worker(self):
+        """被动取流：到期后调用 get_one_frame_callback，与 SDK 回调线程一致"""
+        while self._grabbing:
+            if self._next_due(SIM_IDLE_WAIT_S):
+                self._emit_frame()
+
+    def _emit_frame(self):
+        self.frames += 1
+        self.stFrameInfo.nFrameNum = self.frames
+        self.stFrameInfo.nHostTimeStamp = int(time.time() * 1000)
+        self.stFrameInfo.nFrameLen = self._frame.nbytes
+        try:
+            # 子类可覆盖 get_one_frame_callback，与 SDK 回调入口一致
+            self.get_one_frame_callback(None, None, None)
+        except Exception as err:
+            _logger.exception(f"{self.identity} get_one_frame_callback() error: {err}")
+
+    def get_one_frame(self):
+        """主动取流：等待一帧，超时返回"""
+        if self._next_due(self.get_one_frame_timeout_ms / 1000):
+            self._emit_frame()
+
+    def get_one_frame_callback(self, pData, pFrameInfo, pUser) -> np.ndarray:
+        frame = self._frame.copy()
+        # 帧号写入第一行，避免帧内容完全相同
+        frame.reshape(-1)[:8] = np.frombuffer(self.stFrameInfo.nFrameNum.to_bytes(8, "little"), dtype=np.uint8)
+        return frame
+
+    @property
+    def identity(self):
+        return f"SimulatedCamera[{self.ip}]"
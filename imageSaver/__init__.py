@@ -1,2 +1,25 @@
-from .imageSaverForShuttle.image_saver import ImageSaver as ImageSaverForShuttle
-from .imageSaverForShuttle.models import ShuttleImage as ImageModelForShuttle
\ No newline at end of file
+import typing
+import importlib
+
+# 按需导入：webViewer 只使用 ORM 模型，不加载 ImageSaver 的 cv2 / numpy
+_LAZY_IMPORTS = {
+    "ImageSaverForShuttle": (".imageSaverForShuttle.image_saver", "ImageSaver"),
+    "ImageModelForShuttle": (".imageSaverForShuttle.models", "ShuttleImage"),
+}
+
+if typing.TYPE_CHECKING:
+    from .imageSaverForShuttle.image_saver import ImageSaver as ImageSaverForShuttle
+    from .imageSaverForShuttle.models import ShuttleImage as ImageModelForShuttle
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_IMPORTS])
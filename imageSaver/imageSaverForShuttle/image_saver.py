@@ -3,14 +3,17 @@ import cv2
 import functools
 import asyncio
 import os
+import time
 from datetime import datetime
 import typing
 import logging
 from tortoise import Tortoise
 from concurrent.futures import ThreadPoolExecutor
 
-from redisDb import AsyncRedisDB
+from redisDb import AsyncRedisDB, PartTrace, PartTraceStage
 from udpMulticast import AsyncUdpMulticastServer
+from camera.cameraForShuttle.plc_capture import match_capture
+import metrics
 from .models import ShuttleImage
 from config.mssql_setting import TORTOISE_ORM
 import utils
@@ -20,6 +23,8 @@ _logger = logging.getLogger(__name__)
 
 
 MAX_WORKERS = 50
+# 核对帧时读取的最近 plc 触发记录数量
+PLC_CAPTURE_LOOKUP_COUNT = 100
 
 
 class ImageSaver:
@@ -34,7 +39,8 @@ class ImageSaver:
             get_image_timeout: int,
             image_overwrite: bool,
             image_format: str,
-            image_workers_number: int
+            image_workers_number: int,
+            orm_config: typing.Optional[dict] = None,
     ):
         # redis
         self.redis: typing.Optional[AsyncRedisDB] = None
@@ -72,10 +78,20 @@ class ImageSaver:
         self.image_overwrite = image_overwrite
         # 图片格式
         self.image_format = image_format
+        # 数据库配置，默认 mssql
+        self.orm_config = orm_config or TORTOISE_ORM
 
         # workers 数量
         # self.image_workers_number = image_workers_number
 
+        # 指标
+        metrics.gauge("image_saver_queue_depth", "parts waiting to be saved").set_function(self.queue.qsize)
+        self.frames_wait_seconds = metrics.histogram("shuttle_frames_wait_seconds", "get_all_shuttle_frames wait time")
+        self.part_seconds = metrics.histogram("image_saver_part_seconds", "save all images of a part")
+        self.images_total = metrics.counter("image_saver_images_total", "saved images")
+        self.errors_total = metrics.counter("image_saver_errors_total", "failed parts")
+        self.frame_mismatch_total = metrics.counter("image_saver_frame_mismatch_total", "plc triggered frames not matching the part's captures")
+
         self.tasks = list()
 
     @classmethod
@@ -90,7 +106,8 @@ class ImageSaver:
             get_image_timeout: int,
             image_overwrite: bool,
             image_format: str,
-            image_workers_number: int
+            image_workers_number: int,
+            orm_config: typing.Optional[dict] = None,
     ) -> typing.Self:
         # 创建相机实例
         saver = cls(
@@ -104,6 +121,7 @@ class ImageSaver:
             image_overwrite=image_overwrite,
             image_format=image_format,
             image_workers_number=image_workers_number,
+            orm_config=orm_config,
         )
 
         # redis
@@ -188,23 +206,33 @@ class ImageSaver:
                 program_id, part_counter = data
                 # todo 根据 program_id 进行图片分析 -> 相同 program_id, 不同零件状态
                 # 获取 frame
-                images = await self.redis.get_all_shuttle_frames(
-                    press_line=self.press_line,
-                    program_id=program_id,
-                    part_counter=part_counter,
-                    timeout_sec=self.get_image_timeout
-                )
+                start_t = time.perf_counter()
+                with self.frames_wait_seconds.time():
+                    images = await self.redis.get_all_shuttle_frames(
+                        press_line=self.press_line,
+                        program_id=program_id,
+                        part_counter=part_counter,
+                        timeout_sec=self.get_image_timeout
+                    )
+                # plc 硬触发：核对帧与该零件的触发记录
+                images = await self.check_plc_captures(program_id=program_id, part_counter=part_counter, images=images)
+                # 链路时间戳
+                stages = {PartTrace.field(PartTraceStage.FETCH): time.time() * 1000}
                 # 创建保存路径
                 saved_dir = await self.make_saved_dir(program_id=program_id, part_counter=part_counter)
 
                 # 连接数据库连接
-                await Tortoise.init(config=TORTOISE_ORM)
+                await Tortoise.init(config=self.orm_config)
                 # 保存图片，写入数据库
                 for camera_ip, (image, meta) in images.items():
                     # 定义图片名称
                     pic_name = self.define_picture_name(camera_user_id=meta.camera_user_id, pic_format=self.image_format)
+                    # 编码图片
+                    encoded = await self.encode_picture(image=image, pic_format=self.image_format)
+                    stages[PartTrace.field(PartTraceStage.ENCODED, camera_ip)] = time.time() * 1000
                     # 保存图片
-                    pic_path = await self.save_picture(image=image, saved_dir=saved_dir, picture_name=pic_name, overwrite=self.image_overwrite)
+                    pic_path = await self.write_picture(data=encoded, saved_dir=saved_dir, picture_name=pic_name, overwrite=self.image_overwrite)
+                    stages[PartTrace.field(PartTraceStage.WRITTEN, camera_ip)] = time.time() * 1000
                     # 保存 数据库
                     frame_height, frame_width = meta.frame_shape[:2]
                     await ShuttleImage.create(
@@ -220,9 +248,22 @@ class ImageSaver:
                         shuttle_has_part_t=meta.has_part_t,
                         image_path=pic_path,
                     )
+                    stages[PartTrace.field(PartTraceStage.DB_COMMITTED, camera_ip)] = time.time() * 1000
+                    self.images_total.inc()
                 # 关闭数据库连接
                 await Tortoise.close_connections()
 
+                # 发布出帧反馈，相机控制据此学习触发延时
+                if images:
+                    has_part_t = next(iter(images.values()))[1].has_part_t
+                    await self.redis.add_frame_offsets(
+                        press_line=self.press_line,
+                        program_id=program_id,
+                        part_counter=part_counter,
+                        has_part_t=has_part_t,
+                        frame_ts=[meta.frame_t for _, meta in images.values()],
+                    )
+
                 # 发送 udp multicast
                 # todo 修改 udp multicast 发送内容
                 async with AsyncUdpMulticastServer(
@@ -232,14 +273,49 @@ class ImageSaver:
                         ttl=self.udp_ttl,
                 ) as server:
                     await server.send("1")
+                stages[PartTrace.field(PartTraceStage.UDP_NOTIFIED)] = time.time() * 1000
+                self.part_seconds.observe(time.perf_counter() - start_t)
+
+                # 记录链路时间戳
+                await self.redis.add_part_trace(press_line=self.press_line, program_id=program_id, part_counter=part_counter, stages=stages)
+                await self.redis.finish_part_trace(press_line=self.press_line, program_id=program_id, part_counter=part_counter)
 
             except Exception as err:
+                self.errors_total.inc()
                 _logger.exception(f"{self.identity} save images for {data} error: {err}")
             finally:
                 self.queue.task_done()
 
         _logger.info(f"{self.identity} save_images_loop() ended")
 
+    async def check_plc_captures(self, program_id: int, part_counter: int, images: dict) -> dict:
+        """
+        plc 硬触发模式下，核对帧是否属于该零件的触发 (shuttle:plcCapture)，不匹配的帧不保存
+        软触发模式 (没有该零件的触发记录，帧也没有 capture_count) 原样返回
+        :param program_id:
+        :param part_counter:
+        :param images: get_all_shuttle_frames() 的返回值
+        :return: 核对通过的帧
+        """
+        captures = [
+            capture for capture in await self.redis.get_plc_captures(press_line=self.press_line, count=PLC_CAPTURE_LOOKUP_COUNT)
+            if capture["program_id"] == program_id and capture["part_counter"] == part_counter
+        ]
+        if not captures and all(meta.capture_count is None for _, meta in images.values()):
+            return images
+
+        checked = dict()
+        for camera_ip, (image, meta) in images.items():
+            if match_capture(captures, meta.frame_t) is None:
+                self.frame_mismatch_total.inc()
+                _logger.error(
+                    f"{self.identity} frame[camera={camera_ip},t={meta.frame_t},capture_count={meta.capture_count}] "
+                    f"does not match captures of part[{program_id},{part_counter}], not saved"
+                )
+                continue
+            checked[camera_ip] = (image, meta)
+        return checked
+
     @staticmethod
     def define_saved_dir(program_id: int, part_counter: int, saved_dir: str) -> str:
         # 获取当前时间
@@ -267,24 +343,28 @@ class ImageSaver:
         await self.loop.run_in_executor(self.executor, functools.partial(os.makedirs, saved_dir, exist_ok=True))
         return saved_dir
 
-    async def save_picture(self, image: np.ndarray, saved_dir: str, picture_name: str, overwrite: bool = False):
-        """保存 图片"""
-        # 保存路径
-        saved_pic_path = os.path.join(saved_dir, picture_name)
-        # 文件存在
-        if not overwrite and os.path.exists(saved_pic_path):
-            raise FileExistsError(f"picture[{picture_name}] exists in saved dir[{saved_dir}]")
-        # 保存
-        await self.loop.run_in_executor(
+    async def encode_picture(self, image: np.ndarray, pic_format: str) -> bytes:
+        """编码 图片"""
+        return await self.loop.run_in_executor(
             self.executor,
             functools.partial(
-                utils.save_image_by_cv,
-                path=saved_pic_path,
+                utils.encode_image_by_cv,
                 image=image,
+                file_format=pic_format,
                 png_compression=0,
                 jpg_quality=100,
             )
         )
+
+    async def write_picture(self, data: bytes, saved_dir: str, picture_name: str, overwrite: bool = False):
+        """写入 编码后的图片"""
+        # 保存路径
+        saved_pic_path = os.path.join(saved_dir, picture_name)
+        # 文件存在
+        if not overwrite and os.path.exists(saved_pic_path):
+            raise FileExistsError(f"picture[{picture_name}] exists in saved dir[{saved_dir}]")
+        # 保存
+        await self.loop.run_in_executor(self.executor, functools.partial(utils.write_bytes, path=saved_pic_path, data=data))
         return saved_pic_path
 
     @staticmethod
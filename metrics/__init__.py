@@ -0,0 +1,5 @@
+from .metrics import MetricsRegistry, MetricType, Counter, Gauge, Histogram, REGISTRY, counter, gauge, histogram
+from .metrics_publisher import MetricsPublisher
+from .prometheus import render_prometheus
+from .loop_monitor import LoopMonitor, executor_stats
+from .profiler import Profiler, StackSampler, PROFILE_KINDS
@@ -0,0 +1,205 @@
+import sys
+import time
+import typing
+import asyncio
+import threading
+import traceback
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import MetricsRegistry, REGISTRY
+import utils
+
+_logger = logging.getLogger(__name__)
+
+
+# 事件循环探测间隔，秒
+LOOP_PROBE_INTERVAL_SEC = 0.1
+# 事件循环阻塞超过该时间视为卡顿，记录阻塞处的调用栈，秒
+LOOP_STALL_THRESHOLD_SEC = 0.1
+# 同一次卡顿持续期间，调用栈最多采样的次数
+STALL_STACK_SAMPLES = 3
+# 线程池排队超过该数量时记录日志
+EXECUTOR_QUEUE_WARN = 10
+# 同类日志的最小间隔，秒
+LOG_INTERVAL_SEC = 10
+# 事件循环延迟分桶，秒
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def executor_stats(executor: ThreadPoolExecutor) -> dict:
+    """
+    线程池状态，读取 ThreadPoolExecutor 内部属性
+    :return: {"max_workers", "threads", "busy", "queue", "utilization"}
+    """
+    threads = len(executor._threads)
+    idle = executor._idle_semaphore._value
+    busy = max(0, threads - idle)
+    return {
+        "max_workers": executor._max_workers,
+        "threads": threads,
+        "busy": busy,
+        "queue": executor._work_queue.qsize(),
+        "utilization": busy / executor._max_workers,
+    }
+
+
+class LoopMonitor:
+    def __init__(
+            self,
+            executors: typing.Optional[dict[str, typing.Optional[ThreadPoolExecutor]]] = None,
+            registry: MetricsRegistry = REGISTRY,
+            interval: float = LOOP_PROBE_INTERVAL_SEC,
+            stall_threshold: float = LOOP_STALL_THRESHOLD_SEC,
+    ):
+        """
+        监控事件循环调度延迟和线程池饱和度
+            探测协程每 interval 睡眠一次，实际唤醒时间与预期的差值即调度延迟
+            看门狗线程发现探测协程超过 stall_threshold 未唤醒时，采样事件循环线程的调用栈，定位阻塞调用
+            线程池排队长度、忙线程数、利用率在快照时读取
+        :param executors: {名称: 线程池}，None 表示事件循环的默认线程池 (asyncio.to_thread / run_in_executor(None, ...))
+        :param registry:
+        :param interval:
+        :param stall_threshold:
+        """
+        self.executors = dict(executors or dict())
+        self.executors.setdefault("default", None)
+        self.registry = registry
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+
+        self.loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: typing.Optional[int] = None
+        self.task: typing.Optional[asyncio.Task] = None
+        self.watchdog: typing.Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        # 探测协程最近一次唤醒的时间，perf_counter
+        self._last_tick = 0.0
+        self._log_t: dict[str, float] = dict()
+
+        self.lag = registry.histogram("event_loop_lag_seconds", "event loop scheduling lag", buckets=LOOP_LAG_BUCKETS)
+        self.lag_max = registry.gauge("event_loop_lag_max_seconds", "max event loop lag since last snapshot")
+        self.stalls_total = registry.counter("event_loop_stalls_total", "event loop blocked longer than stall threshold")
+        self.tasks = registry.gauge("event_loop_tasks", "pending asyncio tasks")
+        self._lag_max = 0.0
+        self.lag_max.set_function(self._take_lag_max)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        # 返回 False 以便异常继续抛出
+        return False
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.tasks.set_function(lambda: len(asyncio.all_tasks(self.loop)))
+        for name, executor in self.executors.items():
+            self._register_executor(name, executor)
+
+        self._last_tick = time.perf_counter()
+        self.stop_event.clear()
+        self.task = asyncio.create_task(self.probe())
+        self.watchdog = threading.Thread(target=self.watch, name="LoopMonitorWatchdog", daemon=True)
+        self.watchdog.start()
+        _logger.info(f"{self.identity} started, interval={self.interval}s, stall threshold={self.stall_threshold}s, executors={list(self.executors)}")
+
+    async def close(self):
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.watchdog is not None:
+            await asyncio.to_thread(self.watchdog.join)
+            self.watchdog = None
+
+    def _register_executor(self, name: str, executor: typing.Optional[ThreadPoolExecutor]):
+        if executor is None:
+            # 默认线程池：utils.run_async 创建，或 asyncio 在第一次使用时创建
+            def stats():
+                default = utils.default_executor(self.loop)
+                return executor_stats(default) if default is not None else None
+        else:
+            def stats():
+                return executor_stats(executor)
+
+        def field(key: str):
+            def read():
+                value = stats()
+                return value[key] if value is not None else 0
+            return read
+
+        self.registry.gauge("executor_queue_length", "tasks waiting for a worker", executor=name).set_function(field("queue"))
+        self.registry.gauge("executor_busy_workers", "workers running a task", executor=name).set_function(field("busy"))
+        self.registry.gauge("executor_threads", "worker threads created", executor=name).set_function(field("threads"))
+        self.registry.gauge("executor_max_workers", "max worker threads", executor=name).set_function(field("max_workers"))
+        self.registry.gauge("executor_utilization", "busy workers / max workers", executor=name).set_function(field("utilization"))
+
+    def _take_lag_max(self) -> float:
+        value, self._lag_max = self._lag_max, 0.0
+        return value
+
+    async def probe(self):
+        """测量调度延迟"""
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_tick = now
+            lag = max(0.0, now - expected)
+            self.lag.observe(lag)
+            if lag > self._lag_max:
+                self._lag_max = lag
+
+    def watch(self):
+        """看门狗线程：检测事件循环卡顿，检查线程池排队"""
+        check_interval = self.stall_threshold / 2
+        stall_start: typing.Optional[float] = None
+        samples = 0
+        while not self.stop_event.wait(check_interval):
+            blocked = time.perf_counter() - self._last_tick - self.interval
+            if blocked > self.stall_threshold:
+                if stall_start is None:
+                    stall_start = self._last_tick
+                    samples = 0
+                    self.stalls_total.inc()
+                if samples < STALL_STACK_SAMPLES:
+                    samples += 1
+                    self._log_stall(blocked, samples)
+            elif stall_start is not None:
+                _logger.warning(f"{self.identity} event loop stall ended after {self._last_tick - stall_start - self.interval:.3f}s")
+                stall_start = None
+
+            self._check_executors()
+
+    def _log_stall(self, blocked: float, sample: int):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+        _logger.warning(
+            f"{self.identity} event loop blocked for {blocked:.3f}s (sample {sample}/{STALL_STACK_SAMPLES}), loop thread stack:\n{stack}"
+        )
+
+    def _check_executors(self):
+        for name, executor in self.executors.items():
+            if executor is None:
+                executor = utils.default_executor(self.loop)
+                if executor is None:
+                    continue
+            stats = executor_stats(executor)
+            if stats["queue"] >= EXECUTOR_QUEUE_WARN and self._should_log(f"executor:{name}"):
+                _logger.warning(f"{self.identity} executor[{name}] saturated: {stats}")
+
+    def _should_log(self, key: str) -> bool:
+        now = time.monotonic()
+        if now - self._log_t.get(key, -LOG_INTERVAL_SEC) < LOG_INTERVAL_SEC:
+            return False
+        self._log_t[key] = now
+        return True
+
+    @property
+    def identity(self):
+        return f"LoopMonitor"
@@ -0,0 +1,204 @@
+import os
+import time
+import typing
+import bisect
+from enum import StrEnum
+from threading import Lock
+
+
+# 直方图默认分桶，秒
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricType(StrEnum):
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+
+
+class _Metric:
+    type: MetricType
+
+    def __init__(self, name: str, help: str, labels: dict[str, str]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        # 相机 SDK 回调等在子线程中更新
+        self._lock = Lock()
+
+    def sample(self) -> dict:
+        return {
+            "name": self.name,
+            "type": str(self.type),
+            "help": self.help,
+            "labels": self.labels,
+            **self._value(),
+        }
+
+    def _value(self) -> dict:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    type = MetricType.COUNTER
+
+    def __init__(self, name: str, help: str, labels: dict[str, str]):
+        super().__init__(name, help, labels)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError(f"counter[{self.name}] can only increase")
+        with self._lock:
+            self.value += amount
+
+    def _value(self) -> dict:
+        return {"value": self.value}
+
+
+class Gauge(_Metric):
+    """当前值，可设置回调在快照时读取，例如队列长度"""
+    type = MetricType.GAUGE
+
+    def __init__(self, name: str, help: str, labels: dict[str, str]):
+        super().__init__(name, help, labels)
+        self.value = 0.0
+        self.function: typing.Optional[typing.Callable[[], float]] = None
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: typing.Optional[typing.Callable[[], float]]):
+        self.function = function
+
+    def _value(self) -> dict:
+        if self.function is not None:
+            try:
+                return {"value": float(self.function())}
+            except Exception:
+                return {"value": None}
+        return {"value": self.value}
+
+
+class Histogram(_Metric):
+    """分桶统计，格式同 prometheus，桶计数在输出时累加"""
+    type = MetricType.HISTOGRAM
+
+    def __init__(self, name: str, help: str, labels: dict[str, str], buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 最后一个为 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        """with histogram.time(): ... 统计耗时，秒"""
+        return _Timer(self)
+
+    def _value(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = 0
+        buckets = list()
+        for le, n in zip([*self.buckets, "+Inf"], counts):
+            cumulative += n
+            buckets.append([le, cumulative])
+        return {"buckets": buckets, "sum": total, "count": count}
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start_t = 0.0
+
+    def __enter__(self):
+        self.start_t = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start_t)
+        return False
+
+
+MetricT = typing.TypeVar("MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        进程内的指标注册表
+            同名同标签的指标只创建一次，各组件直接注册，无需传递实例
+        """
+        self.metrics: dict[tuple[str, tuple], _Metric] = dict()
+        self._lock = Lock()
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", buckets: typing.Sequence[float] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+    def _get_or_create(self, cls: type[MetricT], name: str, help: str, labels: dict, **kwargs) -> MetricT:
+        labels = {k: str(v) for k, v in labels.items()}
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = cls(name, help, labels, **kwargs)
+                self.metrics[key] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric[{name}] already registered as {metric.type}")
+        return metric
+
+    def snapshot(self, process: str) -> dict:
+        """
+        指标快照，发布到 redis
+        :param process: 进程名称
+        :return: {"process": str, "pid": int, "t": 毫秒时间戳, "metrics": [sample]}
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {
+            "process": process,
+            "pid": os.getpid(),
+            "t": int(time.time() * 1000),
+            "metrics": [metric.sample() for metric in metrics],
+        }
+
+
+# 进程默认注册表
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help: str = "", **labels) -> Counter:
+    return REGISTRY.counter(name, help, **labels)
+
+
+def gauge(name: str, help: str = "", **labels) -> Gauge:
+    return REGISTRY.gauge(name, help, **labels)
+
+
+def histogram(name: str, help: str = "", buckets: typing.Sequence[float] = DEFAULT_BUCKETS, **labels) -> Histogram:
+    return REGISTRY.histogram(name, help, buckets=buckets, **labels)
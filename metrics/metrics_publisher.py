@@ -0,0 +1,90 @@
+import time
+import asyncio
+import typing
+import logging
+
+from .metrics import MetricsRegistry, REGISTRY
+
+_logger = logging.getLogger(__name__)
+
+
+# 快照发布间隔，秒
+METRICS_PUBLISH_INTERVAL_SEC = 5
+# redis 往返耗时分桶，秒
+REDIS_PING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class MetricsPublisher:
+    def __init__(
+            self,
+            redis,
+            press_line: str,
+            process: str,
+            registry: MetricsRegistry = REGISTRY,
+            interval: float = METRICS_PUBLISH_INTERVAL_SEC,
+    ):
+        """
+        定时将进程的指标快照发布到 redis，由 webViewer 汇总为 /metrics
+        每次发布前 ping 一次 redis，统计往返耗时
+        :param redis: AsyncRedisDB
+        :param press_line:
+        :param process: 进程名称，作为 prometheus 的 process 标签
+        :param registry:
+        :param interval:
+        """
+        self.redis = redis
+        self.press_line = press_line
+        self.process = process
+        self.registry = registry
+        self.interval = interval
+
+        self.redis_ping = registry.histogram("redis_ping_seconds", "redis PING round trip", buckets=REDIS_PING_BUCKETS)
+        self.publish_errors = registry.counter("metrics_publish_errors_total", "metrics snapshot publish errors")
+
+        self.task: typing.Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        # 返回 False 以便异常继续抛出
+        return False
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        _logger.info(f"{self.identity} started, interval={self.interval}s")
+
+    async def close(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                self.publish_errors.inc()
+                _logger.warning(f"{self.identity} publish error: {err}")
+            await asyncio.sleep(self.interval)
+
+    async def publish(self):
+        start_t = time.perf_counter()
+        await self.redis.ping()
+        self.redis_ping.observe(time.perf_counter() - start_t)
+
+        await self.redis.set_metrics_snapshot(
+            press_line=self.press_line,
+            process=self.process,
+            snapshot=self.registry.snapshot(process=self.process),
+        )
+
+    @property
+    def identity(self):
+        return f"MetricsPublisher[{self.process}]"
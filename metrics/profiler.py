@@ -0,0 +1,309 @@
+import os
+import sys
+import json
+import time
+import signal
+import typing
+import asyncio
+import fnmatch
+import cProfile
+import pstats
+import io
+import threading
+import tracemalloc
+import collections
+import logging
+
+from .metrics import MetricsRegistry, REGISTRY
+
+_logger = logging.getLogger(__name__)
+
+
+# 剖析方式
+#   sample:      采样所有线程的调用栈，输出 folded stacks (可用 flamegraph / speedscope 打开)
+#   cprofile:    cProfile，只剖析事件循环线程，输出 .prof (pstats / snakeviz 打开)
+#   tracemalloc: 内存分配，输出开始/结束的快照差异和结束快照
+PROFILE_KINDS = ("sample", "cprofile", "tracemalloc")
+# 默认剖析时长，秒
+DEFAULT_PROFILE_DURATION_SEC = 30
+# 剖析时长上限，秒
+MAX_PROFILE_DURATION_SEC = 600
+# 调用栈采样间隔，秒
+SAMPLE_INTERVAL_SEC = 0.01
+# tracemalloc 保存的调用栈深度
+TRACEMALLOC_FRAMES = 10
+# summary 输出的条目数
+SUMMARY_TOP_N = 50
+# 读取 redis 剖析命令的阻塞时间，毫秒
+PROFILE_COMMAND_BLOCK_MS = 5000
+# 信号 -> 剖析方式，仅非 Windows
+PROFILE_SIGNALS = {
+    "SIGUSR1": "sample",
+    "SIGUSR2": "tracemalloc",
+}
+
+
+class StackSampler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SEC):
+        """
+        定时采样所有线程的调用栈，按 folded stacks 格式累计
+            线程名;file:function;file:function ... 次数
+            采样线程需要获取 GIL，短于 sys.getswitchinterval() 的 CPU 片段会被低估
+        :param interval: 采样间隔，秒
+        """
+        self.interval = interval
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="StackSampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = list()
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = SUMMARY_TOP_N) -> str:
+        """按栈顶函数 (self) 和栈内出现 (inclusive) 统计采样次数"""
+        own = collections.Counter()
+        inclusive = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames[1:]):
+                inclusive[frame] += count
+
+        total = sum(self.stacks.values()) or 1
+        lines = [f"samples={self.samples} interval={self.interval}s thread_samples={total}", "", "self:"]
+        lines += [f"{count:>8} {count / total:7.2%}  {frame}" for frame, count in own.most_common(top)]
+        lines += ["", "inclusive:"]
+        lines += [f"{count:>8} {count / total:7.2%}  {frame}" for frame, count in inclusive.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    def __init__(
+            self,
+            process: str,
+            output_dir: str,
+            redis=None,
+            press_line: typing.Optional[str] = None,
+            registry: MetricsRegistry = REGISTRY,
+    ):
+        """
+        按需剖析：收到信号或 redis 剖析命令后剖析 duration 秒，结果写入 output_dir/<时间>_<进程>_<方式>/
+            信号 (非 Windows)：SIGUSR1 -> sample，SIGUSR2 -> tracemalloc，时长 DEFAULT_PROFILE_DURATION_SEC
+            redis：AsyncRedisDB.add_profile_command()，process 支持通配符，例如 shuttleCamera@*
+            同一时间只运行一个剖析，剖析期间的命令被忽略
+        :param process: 进程名称，与 MetricsPublisher 一致
+        :param output_dir: 剖析结果根目录
+        :param redis: AsyncRedisDB，None 则只响应信号
+        :param press_line:
+        :param registry:
+        """
+        self.process = process
+        self.output_dir = output_dir
+        self.redis = redis
+        self.press_line = press_line
+
+        self.listener: typing.Optional[asyncio.Task] = None
+        self.session: typing.Optional[asyncio.Task] = None
+        self._signals: list[int] = list()
+
+        self.sessions_total = registry.counter("profile_sessions_total", "profiling sessions finished")
+        self.active = registry.gauge("profile_active", "profiling session running")
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        # 返回 False 以便异常继续抛出
+        return False
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if sys.platform != "win32":
+            for name, kind in PROFILE_SIGNALS.items():
+                signum = getattr(signal, name)
+                loop.add_signal_handler(signum, self.trigger, kind, DEFAULT_PROFILE_DURATION_SEC)
+                self._signals.append(signum)
+        if self.redis is not None and self.press_line is not None:
+            self.listener = asyncio.create_task(self.listen())
+        _logger.info(f"{self.identity} started, pid={os.getpid()}, output dir={self.output_dir}")
+
+    async def close(self):
+        if self._signals:
+            loop = asyncio.get_running_loop()
+            for signum in self._signals:
+                loop.remove_signal_handler(signum)
+            self._signals.clear()
+        for task in (self.listener, self.session):
+            if task is not None:
+                task.cancel()
+        # 剖析被取消时也会写出已采集的结果
+        await asyncio.gather(*(t for t in (self.listener, self.session) if t is not None), return_exceptions=True)
+        self.listener = None
+        self.session = None
+
+    def trigger(self, kind: str, duration: float = DEFAULT_PROFILE_DURATION_SEC) -> bool:
+        """
+        启动一次剖析
+        :return: 已有剖析在运行或参数非法时返回 False
+        """
+        if kind not in PROFILE_KINDS:
+            _logger.warning(f"{self.identity} unknown profile kind[{kind}], expected one of {PROFILE_KINDS}")
+            return False
+        if self.session is not None and not self.session.done():
+            _logger.warning(f"{self.identity} profile[{kind}] ignored, another profile is running")
+            return False
+        duration = min(max(float(duration), 1), MAX_PROFILE_DURATION_SEC)
+        self.session = asyncio.create_task(self.profile(kind, duration))
+        return True
+
+    async def listen(self):
+        """读取 redis 剖析命令"""
+        while True:
+            try:
+                async for t, command in self.redis.get_profile_command(press_line=self.press_line, block=PROFILE_COMMAND_BLOCK_MS):
+                    if command is None or not fnmatch.fnmatchcase(self.process, command["process"]):
+                        continue
+                    _logger.info(f"{self.identity} profile command received: {command}")
+                    self.trigger(command["kind"], command["duration"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                _logger.warning(f"{self.identity} read profile command error: {err}")
+                await asyncio.sleep(PROFILE_COMMAND_BLOCK_MS / 1000)
+
+    async def profile(self, kind: str, duration: float) -> str:
+        """
+        剖析 duration 秒并写出结果
+        :return: 结果目录
+        """
+        start_t = time.time()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(start_t))}_{self.process}_{kind}"
+        session_dir = os.path.join(self.output_dir, name)
+        _logger.warning(f"{self.identity} profile[{kind}] started for {duration}s -> {session_dir}")
+
+        begin, end = getattr(self, f"_{kind}")()
+        self.active.set(1)
+        state = begin()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            files = end(state)
+            self.active.set(0)
+            meta = {
+                "process": self.process,
+                "pid": os.getpid(),
+                "kind": kind,
+                "start_t": int(start_t * 1000),
+                "duration": round(time.time() - start_t, 1),
+                "files": list(files),
+            }
+            # 写文件不阻塞事件循环
+            await asyncio.to_thread(self._write, session_dir, files, meta)
+            self.sessions_total.inc()
+            _logger.warning(f"{self.identity} profile[{kind}] finished -> {session_dir}")
+        return session_dir
+
+    @staticmethod
+    def _write(session_dir: str, files: dict[str, typing.Union[str, bytes, typing.Callable[[str], None]]], meta: dict):
+        os.makedirs(session_dir, exist_ok=True)
+        for filename, content in files.items():
+            path = os.path.join(session_dir, filename)
+            if callable(content):
+                content(path)
+            elif isinstance(content, bytes):
+                with open(path, "wb") as f:
+                    f.write(content)
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+        with open(os.path.join(session_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # ------------------------------------------------------------------ #
+    # 剖析方式：返回 (begin, end)，end 返回 {文件名: 内容 或 写文件的函数}
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _sample():
+        def begin():
+            sampler = StackSampler()
+            sampler.start()
+            return sampler
+
+        def end(sampler: StackSampler):
+            sampler.stop()
+            return {"stacks.folded": sampler.folded(), "summary.txt": sampler.summary()}
+
+        return begin, end
+
+    @staticmethod
+    def _cprofile():
+        def begin():
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+
+        def end(profile: cProfile.Profile):
+            profile.disable()
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_TOP_N)
+            return {"profile.prof": profile.dump_stats, "summary.txt": stream.getvalue()}
+
+        return begin, end
+
+    @staticmethod
+    def _tracemalloc():
+        def begin():
+            # 已通过 PYTHONTRACEMALLOC 开启时，结束后不关闭
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            return started, tracemalloc.take_snapshot()
+
+        def end(state):
+            started, first = state
+            last = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started:
+                tracemalloc.stop()
+
+            lines = [f"traced current={current / 1024 ** 2:.1f}MB peak={peak / 1024 ** 2:.1f}MB", "", "diff (end - start):"]
+            lines += [str(stat) for stat in last.compare_to(first, "lineno")[:SUMMARY_TOP_N]]
+            lines += ["", "top (end):"]
+            lines += [str(stat) for stat in last.statistics("lineno")[:SUMMARY_TOP_N]]
+            return {"snapshot.tracemalloc": last.dump, "summary.txt": "\n".join(lines) + "\n"}
+
+        return begin, end
+
+    @property
+    def identity(self):
+        return f"Profiler[{self.process}]"
@@ -0,0 +1,54 @@
+import typing
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: typing.Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def render_prometheus(snapshots: typing.Iterable[dict]) -> str:
+    """
+    将各进程的指标快照合并为 prometheus 文本格式
+        每个样本加上 process 标签，同名指标的 HELP / TYPE 只输出一次
+    :param snapshots: MetricsRegistry.snapshot() 的列表
+    :return:
+    """
+    # name -> (type, help, [lines])
+    families: dict[str, tuple[str, str, list[str]]] = dict()
+
+    for snapshot in snapshots:
+        process = snapshot["process"]
+        for sample in snapshot["metrics"]:
+            name = sample["name"]
+            labels = {"process": process, **sample["labels"]}
+            _, _, lines = families.setdefault(name, (sample["type"], sample["help"], list()))
+
+            if sample["type"] == "histogram":
+                for le, count in sample["buckets"]:
+                    le = le if le == "+Inf" else _format_value(le)
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(sample['value'])}")
+
+    output = list()
+    for name, (metric_type, help, lines) in families.items():
+        if help:
+            output.append(f"# HELP {name} {_escape(help)}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
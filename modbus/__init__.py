@@ -1,2 +1,5 @@
 from .modbus_address import ModbusAddress
 from .camera_ctrl_modbus_client import CameraCtrlModbusClient
+from .modbus.modbus_session import ModbusSession, ModbusSessionStats, ModbusNotConnectedError
+from .modbus_timestamp import decode_timestamps, encode_timestamps, decode_named_timestamps, TIMESTAMP_PREFIXES
+from .modbus_mirror import ModbusMirror, ModbusChange, ModbusChangeType
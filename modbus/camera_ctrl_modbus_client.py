@@ -1,6 +1,7 @@
 import typing
 from .modbus_address import ModbusAddress
 from .modbus.async_modbus_tcp_client import MyAsyncModbusTCPClient
+from .modbus_timestamp import TIMESTAMP_PREFIXES, timestamp_names, decode_named_timestamps
 
 
 class CameraCtrlModbusClient(MyAsyncModbusTCPClient):
@@ -60,9 +61,36 @@ class CameraCtrlModbusClient(MyAsyncModbusTCPClient):
 
         return _registers
 
+    async def read_names(self, names: typing.Iterable[str]) -> dict:
+        """
+        按名称读取多个寄存器，合并为尽可能少的 read_holding_registers
+        :param names:
+        :return: {name: value}
+        """
+        registers = await self.read_many(ModbusAddress[name] for name in names)
+
+        # 将 地址 映射为 名称
+        _registers = {self.address[addr]: value for addr, value in registers.items()}
+
+        # 更新
+        self.registers.update(_registers)
+
+        return _registers
+
     async def read_all(self):
         return await self.read(addr=0, count=len(self.address))
 
+    async def read_timestamps(self, prefixes: typing.Optional[typing.Iterable[str]] = None) -> dict[str, typing.Optional[int]]:
+        """
+        读取并解码时间戳寄存器块
+        :param prefixes: 如 part_on, capture_0，默认全部
+        :return: {prefix: timestamp_ms}，未写入的为 None
+        """
+        prefixes = list(prefixes or TIMESTAMP_PREFIXES)
+        names = [name for prefix in prefixes for name in timestamp_names(prefix)]
+        registers = await self.read_names(names)
+        return decode_named_timestamps(registers, prefixes)
+
     @property
     def identity(self):
         return f"Modbus[TCPClient|CameraCtrl]"
@@ -6,6 +6,11 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# 单次 write_registers (FC16) 最多写入的寄存器数量
+MAX_WRITE_REGISTERS = 123
+# 单次 read_holding_registers (FC3) 最多读取的寄存器数量
+MAX_READ_REGISTERS = 125
+
 
 class MyAsyncModbusTCPClient(AsyncModbusTcpClient):
 
@@ -47,44 +52,85 @@ class MyAsyncModbusTCPClient(AsyncModbusTcpClient):
         # 返回 False 以便异常继续抛出
         return False
 
+    @staticmethod
+    def group_ranges(addrs: typing.Iterable[int], max_count: int, max_gap: int = 0) -> list[tuple[int, int]]:
+        """
+        将地址合并为尽可能少的连续区间
+        :param addrs: 地址
+        :param max_count: 单个区间最大寄存器数量
+        :param max_gap: 允许跨过的空洞寄存器数量，写入时必须为 0
+        :return: [(start, count), ...]
+        """
+        ranges = list()
+        for addr in sorted(set(addrs)):
+            if ranges:
+                start, count = ranges[-1]
+                end = start + count
+                if addr - end <= max_gap and addr - start < max_count:
+                    ranges[-1] = (start, addr - start + 1)
+                    continue
+            ranges.append((addr, 1))
+        return ranges
+
     async def write(self, registers: dict[int, int]):
         """
-        批量写入保持寄存器
+        批量写入保持寄存器，相邻地址合并为一次 write_registers
         :param registers:
         :return:
         """
         # 错误信息字典
         err_addr = dict()
 
-        for reg_addr, value in registers.items():
+        for start, count in self.group_ranges(registers.keys(), max_count=MAX_WRITE_REGISTERS):
+            values = [int(registers[addr]) for addr in range(start, start + count)]
             try:
-                response = await self.write_register(reg_addr, value, device_id=self.slave)
+                if count == 1:
+                    response = await self.write_register(start, values[0], device_id=self.slave)
+                else:
+                    response = await self.write_registers(start, values, device_id=self.slave)
                 if response.isError():
-                    err_addr[reg_addr] = response
+                    err_addr[(start, count)] = response
             except Exception as err:
-                err_addr[reg_addr] = err
+                err_addr[(start, count)] = err
 
         if err_addr:
-            error_details = "\n".join(f"  Addr {addr}: {err}" for addr, err in err_addr.items())
+            error_details = "\n".join(f"  Addr {start} - {start + count - 1}: {err}" for (start, count), err in err_addr.items())
             raise Exception(f"write holding registers error: \n{error_details}")
 
         _logger.debug(f"{self.identity} write {registers} successfully")
 
     async def read(self, addr: int, count: int) -> dict:
         """
-        批量读取保持寄存器
+        批量读取保持寄存器，超过单次上限时分段读取
         :param addr:
         :param count:
         :return:
         """
-        response = await self.read_holding_registers(addr, count=count, device_id=self.slave)
-        if response.isError():
-            raise Exception(f"read holding registers[{addr} - {addr + count - 1}] error: \n{response}")
+        res = dict()
+        for start in range(addr, addr + count, MAX_READ_REGISTERS):
+            _count = min(MAX_READ_REGISTERS, addr + count - start)
+            response = await self.read_holding_registers(start, count=_count, device_id=self.slave)
+            if response.isError():
+                raise Exception(f"read holding registers[{start} - {start + _count - 1}] error: \n{response}")
+            res.update({start + i: val for i, val in enumerate(response.registers)})
 
-        res = {addr + i: val for i, val in enumerate(response.registers)}
         _logger.debug(f"{self.identity} read({addr},{count})={res}")
         return res
 
+    async def read_many(self, addrs: typing.Iterable[int], max_gap: int = 8) -> dict:
+        """
+        读取多个地址，合并为尽可能少的 read_holding_registers
+        :param addrs:
+        :param max_gap: 允许一并读取的空洞寄存器数量，空洞少时多读几个寄存器比多一次通讯更快
+        :return: {addr: value}，只包含请求的地址
+        """
+        addrs = set(addrs)
+        res = dict()
+        for start, count in self.group_ranges(addrs, max_count=MAX_READ_REGISTERS, max_gap=max_gap):
+            registers = await self.read(start, count)
+            res.update({addr: val for addr, val in registers.items() if addr in addrs})
+        return res
+
     @property
     def identity(self):
         return f"Modbus[TCPClient]"
@@ -0,0 +1,278 @@
+import time
+import typing
+import asyncio
+import dataclasses
+import logging
+
+from .async_modbus_tcp_client import MyAsyncModbusTCPClient
+
+_logger = logging.getLogger(__name__)
+
+
+# 重连退避时间
+RECONNECT_BACKOFF_MIN_S = 0.5
+RECONNECT_BACKOFF_MAX_S = 30
+# 心跳间隔，空闲超过该时间读取一次寄存器
+HEARTBEAT_INTERVAL_S = 5
+# 心跳读取的寄存器
+HEARTBEAT_ADDR = 0
+# 关闭时等待队列写完的时间
+CLOSE_FLUSH_TIMEOUT_S = 3
+# 写入耗时的指数平滑系数
+LATENCY_EWMA_ALPHA = 0.1
+
+ClientT = typing.TypeVar("ClientT", bound=MyAsyncModbusTCPClient)
+
+
+class ModbusNotConnectedError(ConnectionError):
+    """断线且处于重连退避期间，不等待重连，立即失败"""
+    pass
+
+
+@dataclasses.dataclass
+class ModbusSessionStats:
+    """Modbus 会话统计"""
+    host: str
+    connect_count: int = 0          # 成功连接次数
+    connect_error_count: int = 0    # 连接失败次数
+    write_count: int = 0            # 成功写入次数
+    write_error_count: int = 0      # 写入失败次数
+    heartbeat_count: int = 0        # 成功心跳次数
+    heartbeat_error_count: int = 0  # 心跳失败次数
+    queue_size: int = 0             # 待写入数量
+    last_write_latency_ms: float = 0.0
+    avg_write_latency_ms: float = 0.0
+    max_write_latency_ms: float = 0.0
+    last_error: typing.Optional[str] = None
+
+    def on_write(self, latency_ms: float):
+        self.write_count += 1
+        self.last_write_latency_ms = latency_ms
+        self.max_write_latency_ms = max(self.max_write_latency_ms, latency_ms)
+        if self.write_count == 1:
+            self.avg_write_latency_ms = latency_ms
+        else:
+            self.avg_write_latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.avg_write_latency_ms)
+
+    def on_error(self, err: BaseException):
+        self.last_error = str(err)
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class ModbusSession(typing.Generic[ClientT]):
+    def __init__(
+            self,
+            factory: typing.Callable[[], ClientT],
+            heartbeat_interval: float = HEARTBEAT_INTERVAL_S,
+            heartbeat_addr: int = HEARTBEAT_ADDR,
+    ):
+        """
+        常驻 Modbus 会话
+            断线按退避时间自动重连
+            空闲时心跳读取，及时发现断线
+            写入排队，重连期间不丢弃（如关灯命令），按顺序合并后写入
+        :param factory: 创建 client 的工厂函数，重连时重新创建 client
+        :param heartbeat_interval: 心跳间隔，秒
+        :param heartbeat_addr: 心跳读取的寄存器地址
+        """
+        self.factory = factory
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_addr = heartbeat_addr
+
+        self.client: typing.Optional[ClientT] = None
+        self.lock = asyncio.Lock()
+        # 待写入队列 (registers, future)
+        self.queue: asyncio.Queue[tuple[dict, asyncio.Future]] = asyncio.Queue()
+
+        self.stats: typing.Optional[ModbusSessionStats] = None
+
+        # 重连退避
+        self._backoff = 0.0
+        self._next_connect_t = 0.0
+        # 最近一次通讯时间
+        self._last_io_t = 0.0
+
+        self.tasks = list()
+
+    def start(self):
+        self.tasks = [
+            asyncio.create_task(self._write_worker()),
+            asyncio.create_task(self._heartbeat_worker()),
+        ]
+        _logger.info(f"{self.identity} started")
+
+    async def close(self, flush_timeout: float = CLOSE_FLUSH_TIMEOUT_S):
+        # 尽量写完队列中的命令
+        if not self.queue.empty():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=flush_timeout)
+            except asyncio.TimeoutError:
+                _logger.warning(f"{self.identity} close with {self.queue.qsize()} writes not flushed")
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        async with self.lock:
+            self._destroy()
+        _logger.info(f"{self.identity} closed")
+
+    def submit(self, registers: dict) -> asyncio.Future:
+        """
+        写入排队，立即返回
+        :param registers: {name/addr: value}
+        :return: 写入完成的 future
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((dict(registers), future))
+        if self.stats is not None:
+            self.stats.queue_size = self.queue.qsize()
+        return future
+
+    async def write(self, registers: dict, timeout: typing.Optional[float] = None):
+        """写入排队，并等待写入完成"""
+        future = self.submit(registers)
+        await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+    async def read(self, addr: typing.Union[int, str], count: int) -> dict:
+        """读取寄存器，重连退避期间立即抛出 ModbusNotConnectedError，不在锁内等待"""
+        async with self.lock:
+            client = await self._acquire()
+            try:
+                registers = await client.read(addr, count)
+            except Exception as err:
+                self._invalidate(err)
+                raise
+            self._last_io_t = time.monotonic()
+            return registers
+
+    def _connect_wait(self) -> float:
+        """断线时距离下一次允许重连的时间，已连接时为 0"""
+        if self.client is not None and self.client.connected:
+            return 0.0
+        return max(0.0, self._next_connect_t - time.monotonic())
+
+    async def _acquire(self) -> ClientT:
+        """
+        获取已连接的 client，必要时重连
+            持有 self.lock 时调用，退避期间不等待，抛出 ModbusNotConnectedError
+            需要等待重连的调用方在获取锁之前等待 _connect_wait()
+        """
+        if self.client is not None and self.client.connected:
+            return self.client
+        self._destroy()
+
+        wait = self._connect_wait()
+        if wait > 0:
+            raise ModbusNotConnectedError(f"not connected, retry in {wait:.1f}s")
+
+        client = self.factory()
+        if self.stats is None:
+            self.stats = ModbusSessionStats(host=str(client.server_address))
+        try:
+            await client.connect()
+        except Exception as err:
+            client.close()
+            self.stats.connect_error_count += 1
+            self.stats.on_error(err)
+            self._backoff = min(RECONNECT_BACKOFF_MAX_S, max(RECONNECT_BACKOFF_MIN_S, self._backoff * 2))
+            self._next_connect_t = time.monotonic() + self._backoff
+            _logger.warning(f"{self.identity} connect error: {err}, retry in {self._backoff}s")
+            raise
+
+        self.client = client
+        self._backoff = 0.0
+        self.stats.connect_count += 1
+        _logger.info(f"{self.identity} connected, connect count={self.stats.connect_count}")
+        return client
+
+    def _invalidate(self, err: BaseException):
+        """丢弃当前连接，下一次通讯时重连"""
+        if self.stats is not None:
+            self.stats.on_error(err)
+        self._destroy()
+        self._next_connect_t = time.monotonic() + RECONNECT_BACKOFF_MIN_S
+
+    def _destroy(self):
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception as err:
+                _logger.debug(f"{self.identity} close error: {err}")
+
+    def _drain(self, registers: dict, futures: list[asyncio.Future]):
+        """取出队列中所有待写入的命令，按顺序合并，后写覆盖先写"""
+        while not self.queue.empty():
+            _registers, _future = self.queue.get_nowait()
+            registers.update(_registers)
+            futures.append(_future)
+
+    async def _write_worker(self):
+        while True:
+            # 等待新的命令
+            registers, future = await self.queue.get()
+            futures = [future]
+            self._drain(registers, futures)
+            # 写入成功前不丢弃
+            while True:
+                try:
+                    # 在锁外等待重连退避，不阻塞 read()
+                    await asyncio.sleep(self._connect_wait())
+                    async with self.lock:
+                        client = await self._acquire()
+                        start_t = time.perf_counter()
+                        try:
+                            await client.write(registers)
+                        except Exception as err:
+                            self.stats.write_error_count += 1
+                            self._invalidate(err)
+                            raise
+                        self.stats.on_write((time.perf_counter() - start_t) * 1000)
+                        self._last_io_t = time.monotonic()
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    _logger.warning(f"{self.identity} write {registers} error: {err}, retrying")
+                    # 重连期间有新的命令，合并后再写
+                    self._drain(registers, futures)
+                    await asyncio.sleep(RECONNECT_BACKOFF_MIN_S)
+
+            for future in futures:
+                if not future.done():
+                    future.set_result(registers)
+                self.queue.task_done()
+            self.stats.queue_size = self.queue.qsize()
+            _logger.debug(f"{self.identity} write {registers} successfully")
+
+    async def _heartbeat_worker(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            # 有通讯则不需要心跳
+            if time.monotonic() - self._last_io_t < self.heartbeat_interval:
+                continue
+            try:
+                # 在锁外等待重连退避，不阻塞 read()
+                await asyncio.sleep(self._connect_wait())
+                async with self.lock:
+                    client = await self._acquire()
+                    try:
+                        await client.read(self.heartbeat_addr, 1)
+                    except Exception as err:
+                        self.stats.heartbeat_error_count += 1
+                        self._invalidate(err)
+                        raise
+                    self.stats.heartbeat_count += 1
+                    self._last_io_t = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                _logger.warning(f"{self.identity} heartbeat error: {err}")
+
+    @property
+    def identity(self):
+        host = self.stats.host if self.stats is not None else None
+        return f"ModbusSession[{host}]"
@@ -0,0 +1,190 @@
+import time
+import typing
+import asyncio
+import dataclasses
+from enum import StrEnum
+import logging
+
+from .modbus_address import ModbusAddress
+from .modbus_timestamp import TIMESTAMP_PREFIXES, timestamp_names, decode_named_timestamps
+from .modbus.modbus_session import ModbusSession, ModbusNotConnectedError
+
+_logger = logging.getLogger(__name__)
+
+
+# 默认轮询间隔，秒
+MIRROR_POLL_INTERVAL_SEC = 0.1
+# 订阅队列长度，消费过慢时丢弃最旧的事件
+SUBSCRIBER_QUEUE_MAX_SIZE = 1000
+
+
+class ModbusChangeType(StrEnum):
+    REGISTER = "REGISTER"       # 单个寄存器变化
+    TIMESTAMP = "TIMESTAMP"     # 时间戳寄存器块变化，value 为毫秒时间戳
+
+
+@dataclasses.dataclass
+class ModbusChange:
+    type: ModbusChangeType
+    name: str                   # 寄存器名称，时间戳块为前缀 (part_on, capture_0 ...)
+    old: typing.Optional[int]
+    new: typing.Optional[int]
+    t: int                      # 检测到变化的时间戳，毫秒
+
+    def to_dict(self) -> dict:
+        return {
+            "type": str(self.type),
+            "name": self.name,
+            "old": "null" if self.old is None else self.old,
+            "new": "null" if self.new is None else self.new,
+            "t": self.t,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> typing.Self:
+        def _int(value):
+            return None if value in (None, "null") else int(value)
+        return cls(
+            type=ModbusChangeType(data["type"]),
+            name=data["name"],
+            old=_int(data.get("old")),
+            new=_int(data.get("new")),
+            t=int(data["t"]),
+        )
+
+
+class ModbusMirror:
+    def __init__(
+            self,
+            session: ModbusSession,
+            interval: float = MIRROR_POLL_INTERVAL_SEC,
+            publisher: typing.Optional[typing.Callable[[list[ModbusChange]], typing.Awaitable]] = None,
+    ):
+        """
+        modbus 寄存器镜像
+            后台按 interval 一次批量读取整个地址表，与上一次快照比较，产生变化事件
+            时间戳寄存器块合并为一个 TIMESTAMP 事件
+        :param session: modbus 会话
+        :param interval: 轮询间隔，秒
+        :param publisher: 可选，async publisher(changes)，例如写入 redis stream
+        """
+        self.session = session
+        self.interval = interval
+        self.publisher = publisher
+
+        self.address = ModbusAddress.load_address()
+        # 时间戳块中的寄存器，不单独产生 REGISTER 事件
+        self.timestamp_prefixes = [
+            prefix for prefix in TIMESTAMP_PREFIXES
+            if all(name in self.address for name in timestamp_names(prefix))
+        ]
+        self._timestamp_names = {name for prefix in self.timestamp_prefixes for name in timestamp_names(prefix)}
+
+        # 当前快照
+        self.registers: dict[str, int] = dict()
+        self.timestamps: dict[str, typing.Optional[int]] = dict()
+        self.snapshot_t: typing.Optional[int] = None
+
+        # 订阅者
+        self.subscribers: list[asyncio.Queue[ModbusChange]] = list()
+
+        self.poll_count = 0
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        _logger.info(f"{self.identity} started, interval={self.interval}s")
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+            _logger.info(f"{self.identity} stopped")
+        # 重新 start 后第一次快照不产生事件，不与停止前的快照比较
+        self.registers = dict()
+        self.timestamps = dict()
+        self.snapshot_t = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None
+
+    def subscribe(self, maxsize: int = SUBSCRIBER_QUEUE_MAX_SIZE) -> asyncio.Queue:
+        """订阅变化事件"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    async def run(self):
+        while True:
+            start_t = time.perf_counter()
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except ModbusNotConnectedError as err:
+                # 会话重连退避中，由会话记录连接错误
+                _logger.debug(f"{self.identity} poll skipped: {err}")
+            except Exception as err:
+                _logger.warning(f"{self.identity} poll error: {err}")
+            # 固定轮询周期
+            elapsed = time.perf_counter() - start_t
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+
+    async def poll(self) -> list[ModbusChange]:
+        """读取一次整个地址表，返回变化事件"""
+        registers = await self.session.read(0, len(self.address))
+        t = int(time.time() * 1000)
+        changes = self.diff(registers, t)
+        self.poll_count += 1
+        if changes:
+            await self.emit(changes)
+        return changes
+
+    def diff(self, registers: dict[str, int], t: int) -> list[ModbusChange]:
+        """与上一次快照比较，第一次快照不产生事件"""
+        changes = list()
+        first = self.snapshot_t is None
+
+        for name, value in registers.items():
+            if name in self._timestamp_names:
+                continue
+            old = self.registers.get(name)
+            if not first and old != value:
+                changes.append(ModbusChange(type=ModbusChangeType.REGISTER, name=name, old=old, new=value, t=t))
+
+        timestamps = decode_named_timestamps(registers, self.timestamp_prefixes)
+        for prefix, value in timestamps.items():
+            old = self.timestamps.get(prefix)
+            if not first and old != value:
+                changes.append(ModbusChange(type=ModbusChangeType.TIMESTAMP, name=prefix, old=old, new=value, t=t))
+
+        self.registers = dict(registers)
+        self.timestamps = timestamps
+        self.snapshot_t = t
+        return changes
+
+    async def emit(self, changes: list[ModbusChange]):
+        for queue in self.subscribers:
+            for change in changes:
+                if queue.full():
+                    # 丢弃最旧的事件
+                    queue.get_nowait()
+                queue.put_nowait(change)
+
+        if self.publisher is not None:
+            try:
+                await self.publisher(changes)
+            except Exception as err:
+                _logger.warning(f"{self.identity} publish error: {err}")
+
+        _logger.debug(f"{self.identity} changes={changes}")
+
+    @property
+    def identity(self):
+        return f"ModbusMirror"
@@ -0,0 +1,63 @@
+import typing
+import numpy as np
+
+
+'''
+    时间戳寄存器块，每块 4 个连续寄存器
+        {prefix}_daysSinceEpoch_high
+        {prefix}_daysSinceEpoch_low
+        {prefix}_millisecondsEpoch_high
+        {prefix}_millisecondsEpoch_low
+    timestamp_ms = days * 86400000 + milliseconds (当天毫秒数)
+'''
+TIMESTAMP_SUFFIXES = (
+    "daysSinceEpoch_high",
+    "daysSinceEpoch_low",
+    "millisecondsEpoch_high",
+    "millisecondsEpoch_low",
+)
+CAPTURE_TIMESTAMP_NUMBER = 10
+TIMESTAMP_PREFIXES = ("part_on", "part_off") + tuple(f"capture_{i}" for i in range(CAPTURE_TIMESTAMP_NUMBER))
+
+MS_PER_DAY = 86_400_000
+
+
+def timestamp_names(prefix: str) -> list[str]:
+    """时间戳块的 4 个寄存器名称"""
+    return [f"{prefix}_{suffix}" for suffix in TIMESTAMP_SUFFIXES]
+
+
+def decode_timestamps(blocks: typing.Union[np.ndarray, list]) -> np.ndarray:
+    """
+    向量化解码时间戳寄存器块
+    :param blocks: shape (n, 4)，每行 [days_high, days_low, ms_high, ms_low]
+    :return: shape (n,) int64 毫秒时间戳，未写入 (全 0) 的块为 0
+    """
+    blocks = np.asarray(blocks, dtype=np.int64).reshape(-1, 4) & 0xFFFF
+    days = (blocks[:, 0] << 16) | blocks[:, 1]
+    ms = (blocks[:, 2] << 16) | blocks[:, 3]
+    return days * MS_PER_DAY + ms
+
+
+def encode_timestamps(timestamps_ms: typing.Union[np.ndarray, list]) -> np.ndarray:
+    """
+    向量化编码时间戳，decode_timestamps 的逆运算
+    :param timestamps_ms: shape (n,) 毫秒时间戳
+    :return: shape (n, 4) 寄存器值
+    """
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64).reshape(-1)
+    days, ms = np.divmod(timestamps_ms, MS_PER_DAY)
+    return np.stack([days >> 16, days & 0xFFFF, ms >> 16, ms & 0xFFFF], axis=1)
+
+
+def decode_named_timestamps(registers: dict[str, int], prefixes: typing.Iterable[str]) -> dict[str, typing.Optional[int]]:
+    """
+    从 {名称: 值} 中解码多个时间戳
+    :param registers:
+    :param prefixes: 如 part_on, capture_0
+    :return: {prefix: timestamp_ms}，未写入的为 None
+    """
+    prefixes = list(prefixes)
+    blocks = [[registers.get(name, 0) for name in timestamp_names(prefix)] for prefix in prefixes]
+    timestamps = decode_timestamps(blocks).tolist() if blocks else list()
+    return {prefix: (ts or None) for prefix, ts in zip(prefixes, timestamps)}
@@ -1,4 +1,6 @@
-from .plc import PLCOperator, AsyncPLCOperator
+from .plc import PLCOperator, AsyncPLCOperator, PLCBackend, PLCSession, AsyncPLCSession, PLCSessionManager
 from .press_1st_reader import Press1stReader
 from .press_head_reader import PressHeadReader
-from .press_tail_reader import PressTailReader
+from .press_tail_reader import PressTailReader, PressTailSnapshot
+from .plc_tag_table import PLCTagTable, PLCTarget, PLCTagGroup
+from .plc_gateway import PLCGateway, PLCTagSubscriber, PLCTagSnapshot, PLCSource
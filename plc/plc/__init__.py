@@ -1,2 +1,6 @@
 from .plc_operator import PLCOperator
-from .async_plc_operator import AsyncPLCOperator
+from .async_plc_operator import AsyncPLCOperator, PLCBackend
+from .plc_session import PLCSession, AsyncPLCSession, PLCSessionManager, PLCSessionStats
+from .s7_scanner import S7Scanner
+from .s7_read_plan import S7ReadPlan
+from .s7_protocol import AsyncS7Transport, S7ProtocolError
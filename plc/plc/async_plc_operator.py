@@ -1,18 +1,38 @@
 import logging
 import asyncio
 import typing
+from enum import StrEnum
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 from .plc_operator import PLCOperator
+from .s7_read_plan import S7ReadPlan
+from .s7_scanner import S7Scanner
+from .s7_protocol import AsyncS7Transport
 
 _logger = logging.getLogger(__name__)
 
 
 MAX_WORKERS = 10
 
+
+class PLCBackend(StrEnum):
+    EXECUTOR = "executor"   # snap7 同步调用放入线程池
+    ASYNCIO = "asyncio"     # asyncio 原生 S7 通讯，不占用线程池
+
+    @classmethod
+    def create(cls, backend: typing.Optional[str]):
+        try:
+            return cls(str(backend).lower())
+        except ValueError:
+            return cls.EXECUTOR
+
+
 class AsyncPLCOperator(PLCOperator):
     def __init__(self, ip, executor, **kwargs):
+        # 通讯后端
+        self.backend = PLCBackend.create(kwargs.pop("backend", PLCBackend.EXECUTOR))
+
         # 执行器
         self.executor = executor or ThreadPoolExecutor(max_workers=MAX_WORKERS)
         # 标识是否是我们自己创建的 executor
@@ -20,13 +40,25 @@ class AsyncPLCOperator(PLCOperator):
 
         super().__init__(ip=ip, **kwargs)
 
+        # asyncio 后端
+        self.transport: typing.Optional[AsyncS7Transport] = None
+        if self.backend is PLCBackend.ASYNCIO:
+            self.transport = AsyncS7Transport(ip=self.ip, port=self.port, rack=self.rack, slot=self.slot)
+
         self.loop = asyncio.get_running_loop()
 
     async def connect(self):
+        if self.transport is not None:
+            await self.transport.connect()
+            return
         func = partial(super().connect)
         await self.loop.run_in_executor(self.executor, func)
 
     async def disconnect(self):
+        if self.transport is not None:
+            await self.transport.close()
+            self.client.destroy()
+            return
         func = partial(super().disconnect)
         await self.loop.run_in_executor(self.executor, func)
 
@@ -35,6 +67,8 @@ class AsyncPLCOperator(PLCOperator):
             self.executor.shutdown()
 
     async def is_connected(self) -> bool:
+        if self.transport is not None:
+            return self.transport.connected
         func = partial(super().is_connected)
         return await self.loop.run_in_executor(self.executor, func)
 
@@ -76,5 +110,53 @@ class AsyncPLCOperator(PLCOperator):
                CT      -> 0x1C
                TM      -> 0x1D
         '''
+        if self.transport is not None:
+            if not var_dict:
+                if self.plan is None:
+                    self.plan = self.compile(self.multi_vars)
+                plan = self.plan
+            else:
+                plan = self.compile(var_dict)
+            return await self.read_plan(plan)
+
         func = partial(super().read_multi_vars, var_dict)
         return await self.loop.run_in_executor(self.executor, func)
+
+    async def scan(self) -> dict:
+        """扫描 multi_vars 中的所有变量"""
+        if self.transport is not None:
+            if self.scanner is None:
+                self.scanner = self.create_scanner(self.multi_vars)
+            return await self.scanner.ascan(self.read_plan)
+
+        func = partial(super().scan)
+        return await self.loop.run_in_executor(self.executor, func)
+
+    def create_scanner(self, var_dict: dict) -> S7Scanner:
+        """按协商的 pdu 长度为 var_dict 创建扫描引擎，需已连接"""
+        pdu_length = self.transport.pdu_length if self.transport is not None else self.get_pdu_length()
+        return S7Scanner(var_dict, pdu_length=pdu_length)
+
+    async def read_plan(self, plan: S7ReadPlan, as_array: bool = False) -> dict:
+        """按预编译的读取计划读取"""
+        if self.transport is not None:
+            await self.transport.read_plan(plan)
+            return plan.decode(as_array=as_array)
+
+        func = partial(super().read_plan, plan, as_array)
+        return await self.loop.run_in_executor(self.executor, func)
+
+    async def read_area(self, area, db_number: int, start: int, size: int) -> bytearray:
+        """
+        读取一段区域
+        :param area: snap7.type.Area
+        :param db_number:
+        :param start:
+        :param size:
+        :return:
+        """
+        if self.transport is not None:
+            return await self.transport.read_area(int(area), db_number, start, size)
+
+        func = partial(self.client.read_area, area, db_number, start, size)
+        return await self.loop.run_in_executor(self.executor, func)
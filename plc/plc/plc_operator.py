@@ -1,13 +1,17 @@
 import typing
 import snap7
-import ctypes
+import functools
 import logging
 
-from .s7_result_map import parse_s7_result
-from .s7_operation_map import PLC_AREA_MAP, PLC_WORDLEN_MAP, PLC_DATATYPE_MAP, PLC_PARSER_MAP, get_model_name, PLCModel
+from .s7_operation_map import get_model_name, PLCModel
+from .s7_read_plan import S7ReadPlan
+from .s7_scanner import S7Scanner, DEFAULT_PDU_LENGTH
 
 _logger = logging.getLogger(__name__)
 
+# ISO-on-TCP 端口
+S7_TCP_PORT = 102
+
 
 class PLCOperator:
     def __init__(self, ip, **kwargs):
@@ -16,8 +20,10 @@ class PLCOperator:
         :param ip:
         :param rack:
         :param slot:
+        :param port: tcp 端口，默认 102，连接模拟器时可修改
         """
         self.ip = ip
+        self.port = kwargs.get("port", S7_TCP_PORT)
         if "model" in kwargs.keys():
             self.model = PLCModel(kwargs["model"])
             self.model_name = self.model.value
@@ -47,10 +53,14 @@ class PLCOperator:
         }
         '''
         self.multi_vars = dict()
+        # multi_vars 的读取计划，第一次 read_multi_vars() 时创建
+        self.plan: typing.Optional[S7ReadPlan] = None
+        # 扫描引擎，第一次 scan() 时根据 multi_vars 和 pdu 长度创建
+        self.scanner: typing.Optional[S7Scanner] = None
 
     def connect(self):
-        self.client.connect(address=self.ip, rack=self.rack, slot=self.slot)
-        _logger.debug(f"{self.identity} connect to {self.ip} successfully")
+        self.client.connect(address=self.ip, rack=self.rack, slot=self.slot, tcp_port=self.port)
+        _logger.debug(f"{self.identity} connect to {self.ip}:{self.port} successfully")
 
     def disconnect(self):
         # 断开客户端连接
@@ -101,82 +111,56 @@ class PLCOperator:
         '''
 
         if not var_dict:
-            var_dict = self.multi_vars
-
-        items = list()
-        buffers = list()
-
-        # --- 构造 S7DataItem 列表 ---
-        for cfg in var_dict.values():
-
-            datatype = cfg['datatype']
-            wordlen = PLC_DATATYPE_MAP[datatype]["type"]
-            size = PLC_DATATYPE_MAP[datatype]["size"]
-            type_amount = PLC_DATATYPE_MAP[datatype]['amount']      # 一个变量的单位数量（比如 LREAL 占两个 REAL）
-            value_amount = cfg.get('amount', 1)                     # 用户希望读取的变量数量（比如 LREAL[4]）
-            amount = type_amount * value_amount
-
-            item = snap7.type.S7DataItem()
-            item.Area = PLC_AREA_MAP[cfg['area']]
-            item.WordLen = wordlen
-            item.DBNumber = cfg.get('db_number', 0)
-            item.Start = cfg['start']
-            item.Amount = amount
-
-            # create the buffer
-            buffer = ctypes.create_string_buffer(amount * size)
-            buffers.append(buffer)
-            # cast the pointer to the buffer to the required type
-            p_buffer = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_uint8))
-            item.pData = p_buffer
-
-            items.append(item)
-
-        # --- 转为 ctypes 数组并调用 snap7 ---
-        array_items = snap7.type.S7DataItem * len(items)
-        c_items = array_items(*items)
-        # 调用 read_multi_vars
-        result, c_items = self.client.read_multi_vars(c_items)
-
-        values = dict()
-        for (name, cfg), item in zip(var_dict.items(), c_items):
-            _logger.debug(f"{self.identity} item[{name}]={item}")
-            if item.Result != 0:
-                _logger.error(f"{self.identity} item[{name}] error: {parse_s7_result(item.Result)}")
-                values[name] = None
-            else:
-                datatype = cfg['datatype']
-                # wordlen = PLC_DATATYPE_MAP[datatype]["type"]
-                size = PLC_DATATYPE_MAP[datatype]['size']
-                type_amount = PLC_DATATYPE_MAP[datatype]['amount']
-                value_amount = cfg.get('amount', 1)
-                buf = bytearray(ctypes.string_at(item.pData, size * type_amount * value_amount))
-                parser = PLC_PARSER_MAP[datatype]
-                if value_amount == 1:
-                    byte_index = 0
-                    bit_index = cfg.get('bit', 0) if datatype == 'BOOL' else None
-                    value = parser(buf, byte_index, bit_index)
-                    values[name] = value
-                else:
-                    array = list()
-                    for i in range(value_amount):
-                        if datatype == "BOOL":
-                            bit = cfg.get('bit', 0) + i
-                            bit_index = bit % 8
-                            byte_index = bit // 8
-                            val = parser(buf, byte_index, bit_index)
-                        else:
-                            byte_index = i * size * type_amount
-                            val = parser(buf, byte_index, None)
-                        array.append(val)
-                    values[name] = array
+            # multi_vars 的读取计划缓存复用
+            if self.plan is None:
+                self.plan = self.compile(self.multi_vars)
+            plan = self.plan
+        else:
+            plan = self.compile(var_dict)
 
+        values = self.read_plan(plan)
         _logger.debug(f"{self.identity} read_multi_vars()={values}")
 
         return values
 
+    @staticmethod
+    def compile(var_dict: dict) -> S7ReadPlan:
+        """预编译读取计划，S7DataItem 数组和缓冲区可重复使用"""
+        return S7ReadPlan(var_dict)
+
+    def read_plan(self, plan: S7ReadPlan, as_array: bool = False) -> dict:
+        """
+        按预编译的读取计划读取
+        :param plan:
+        :param as_array: 数组变量是否返回 numpy 数组
+        :return: {name: value}
+        """
+        result, _ = self.client.read_multi_vars(plan.items)
+        return plan.decode(as_array=as_array)
+
     def set_multi_vars(self, multi_vars: dict):
         self.multi_vars = multi_vars
+        self.plan = None
+        self.scanner = None
+
+    def get_pdu_length(self) -> int:
+        """与 plc 协商的 pdu 长度"""
+        try:
+            return self.client.get_pdu_length()
+        except Exception as err:
+            _logger.warning(f"{self.identity} get pdu length error: {err}, use default[{DEFAULT_PDU_LENGTH}]")
+            return DEFAULT_PDU_LENGTH
+
+    def scan(self) -> dict:
+        """
+        扫描 multi_vars 中的所有变量，按 pdu 长度合并为尽可能少的 read_multi_vars 请求
+        :return: {name: value}
+        """
+        if self.scanner is None:
+            self.scanner = S7Scanner(self.multi_vars, pdu_length=self.get_pdu_length())
+        values = self.scanner.scan(functools.partial(PLCOperator.read_plan, self))
+        _logger.debug(f"{self.identity} scan()={values}")
+        return values
 
     @property
     def identity(self):
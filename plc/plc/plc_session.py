@@ -0,0 +1,314 @@
+import time
+import typing
+import asyncio
+import dataclasses
+import logging
+from threading import Lock
+
+from .plc_operator import PLCOperator
+from .async_plc_operator import AsyncPLCOperator
+import metrics
+
+_logger = logging.getLogger(__name__)
+
+
+# 重连退避时间
+RECONNECT_BACKOFF_MIN_S = 0.5
+RECONNECT_BACKOFF_MAX_S = 30
+# 连接仍显示正常，但连续读取失败次数达到该值，判定为半开连接
+HALF_OPEN_ERROR_THRESHOLD = 3
+# 读取耗时的指数平滑系数
+LATENCY_EWMA_ALPHA = 0.1
+
+OperatorT = typing.TypeVar("OperatorT", bound=PLCOperator)
+ResultT = typing.TypeVar("ResultT")
+
+
+@dataclasses.dataclass
+class PLCSessionStats:
+    """PLC 会话统计"""
+    ip: str
+    connect_count: int = 0          # 成功连接次数
+    connect_error_count: int = 0    # 连接失败次数
+    read_count: int = 0             # 成功读取次数
+    read_error_count: int = 0       # 读取失败次数
+    consecutive_errors: int = 0     # 连续失败次数
+    half_open_count: int = 0        # 检测到的半开连接次数
+    last_read_latency_ms: float = 0.0
+    avg_read_latency_ms: float = 0.0
+    max_read_latency_ms: float = 0.0
+    last_error: typing.Optional[str] = None
+
+    def on_read(self, latency_ms: float):
+        self.read_count += 1
+        self.consecutive_errors = 0
+        self.last_read_latency_ms = latency_ms
+        self.max_read_latency_ms = max(self.max_read_latency_ms, latency_ms)
+        if self.read_count == 1:
+            self.avg_read_latency_ms = latency_ms
+        else:
+            self.avg_read_latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.avg_read_latency_ms)
+
+    def on_read_error(self, err: BaseException):
+        self.read_error_count += 1
+        self.consecutive_errors += 1
+        self.last_error = str(err)
+
+    def on_connect(self):
+        self.connect_count += 1
+
+    def on_connect_error(self, err: BaseException):
+        self.connect_error_count += 1
+        self.last_error = str(err)
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class _SessionBase(typing.Generic[OperatorT]):
+    def __init__(self, ip: str, factory: typing.Callable[[], OperatorT]):
+        """
+        :param ip: plc ip
+        :param factory: 创建 operator 的工厂函数，重连时会重新创建 operator（disconnect 会销毁 snap7 client）
+        """
+        self.ip = ip
+        self.factory = factory
+        self.operator: typing.Optional[OperatorT] = None
+        self.stats = PLCSessionStats(ip=ip)
+        # 指标
+        self.read_seconds = metrics.histogram("plc_read_seconds", "plc read latency on persistent session", ip=ip)
+        self.read_errors_total = metrics.counter("plc_read_errors_total", "plc read errors", ip=ip)
+        self.connects_total = metrics.counter("plc_connects_total", "plc (re)connects", ip=ip)
+
+        # 重连退避
+        self._backoff = 0.0
+        self._next_connect_t = 0.0
+
+    def _connect_wait(self) -> float:
+        """距离下一次允许重连的时间"""
+        return max(0.0, self._next_connect_t - time.monotonic())
+
+    def _on_connected(self, operator: OperatorT):
+        self.operator = operator
+        self._backoff = 0.0
+        self.stats.on_connect()
+        self.connects_total.inc()
+        _logger.info(f"{self.identity} connected, connect count={self.stats.connect_count}")
+
+    def _on_connect_failed(self, err: BaseException):
+        self.stats.on_connect_error(err)
+        self._backoff = min(RECONNECT_BACKOFF_MAX_S, max(RECONNECT_BACKOFF_MIN_S, self._backoff * 2))
+        self._next_connect_t = time.monotonic() + self._backoff
+        _logger.warning(f"{self.identity} connect error: {err}, retry in {self._backoff}s")
+
+    def _on_read(self, latency_s: float):
+        self.stats.on_read(latency_s * 1000)
+        self.read_seconds.observe(latency_s)
+
+    def _on_read_error(self, err: BaseException):
+        self.stats.on_read_error(err)
+        self.read_errors_total.inc()
+
+    def _is_half_open(self, connected: bool) -> bool:
+        """读取失败后判断连接是否失效"""
+        if not connected:
+            return True
+        # 连接显示正常，但连续读取失败
+        if self.stats.consecutive_errors >= HALF_OPEN_ERROR_THRESHOLD:
+            self.stats.half_open_count += 1
+            _logger.warning(f"{self.identity} half-open connection detected after {self.stats.consecutive_errors} errors")
+            return True
+        return False
+
+    @property
+    def is_open(self) -> bool:
+        return self.operator is not None
+
+    @property
+    def identity(self):
+        return f"PLCSession[{self.ip}]"
+
+
+class PLCSession(_SessionBase[PLCOperator]):
+    """同步 PLC 会话，线程安全，保持一个常驻连接"""
+
+    def __init__(self, ip: str, factory: typing.Callable[[], PLCOperator]):
+        super().__init__(ip=ip, factory=factory)
+        self.lock = Lock()
+
+    def acquire(self) -> PLCOperator:
+        """获取已连接的 operator，必要时按退避时间重连"""
+        if self.operator is not None:
+            return self.operator
+
+        wait = self._connect_wait()
+        if wait > 0:
+            time.sleep(wait)
+
+        operator = self.factory()
+        try:
+            operator.connect()
+        except Exception as err:
+            self._on_connect_failed(err)
+            self._destroy(operator)
+            raise
+        self._on_connected(operator)
+        return operator
+
+    def read(self, func: typing.Callable[[PLCOperator], ResultT]) -> ResultT:
+        """
+        在常驻连接上执行读取
+        :param func: func(operator) -> result
+        :return:
+        """
+        with self.lock:
+            operator = self.acquire()
+            start_t = time.perf_counter()
+            try:
+                result = func(operator)
+            except Exception as err:
+                self._on_read_error(err)
+                try:
+                    connected = operator.is_connected()
+                except Exception:
+                    connected = False
+                if self._is_half_open(connected):
+                    self.invalidate()
+                raise
+            self._on_read(time.perf_counter() - start_t)
+            return result
+
+    def invalidate(self):
+        """丢弃当前连接，下一次 read 时重连"""
+        operator, self.operator = self.operator, None
+        if operator is not None:
+            self._destroy(operator)
+            self._next_connect_t = time.monotonic() + RECONNECT_BACKOFF_MIN_S
+
+    def close(self):
+        with self.lock:
+            operator, self.operator = self.operator, None
+            if operator is not None:
+                self._destroy(operator)
+
+    def _destroy(self, operator: PLCOperator):
+        try:
+            operator.disconnect()
+        except Exception as err:
+            _logger.debug(f"{self.identity} disconnect error: {err}")
+
+
+class AsyncPLCSession(_SessionBase[AsyncPLCOperator]):
+    """异步 PLC 会话，保持一个常驻连接"""
+
+    def __init__(self, ip: str, factory: typing.Callable[[], AsyncPLCOperator]):
+        super().__init__(ip=ip, factory=factory)
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> AsyncPLCOperator:
+        """获取已连接的 operator，必要时按退避时间重连"""
+        if self.operator is not None:
+            return self.operator
+
+        wait = self._connect_wait()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        operator = self.factory()
+        try:
+            await operator.connect()
+        except Exception as err:
+            self._on_connect_failed(err)
+            await self._destroy(operator)
+            raise
+        self._on_connected(operator)
+        return operator
+
+    async def read(self, func: typing.Callable[[AsyncPLCOperator], typing.Awaitable[ResultT]]) -> ResultT:
+        """
+        在常驻连接上执行读取
+        :param func: async func(operator) -> result
+        :return:
+        """
+        async with self.lock:
+            operator = await self.acquire()
+            start_t = time.perf_counter()
+            try:
+                result = await func(operator)
+            except Exception as err:
+                self._on_read_error(err)
+                try:
+                    connected = await operator.is_connected()
+                except Exception:
+                    connected = False
+                if self._is_half_open(connected):
+                    await self.invalidate()
+                raise
+            self._on_read(time.perf_counter() - start_t)
+            return result
+
+    async def invalidate(self):
+        """丢弃当前连接，下一次 read 时重连"""
+        operator, self.operator = self.operator, None
+        if operator is not None:
+            await self._destroy(operator)
+            self._next_connect_t = time.monotonic() + RECONNECT_BACKOFF_MIN_S
+
+    async def close(self):
+        async with self.lock:
+            operator, self.operator = self.operator, None
+            if operator is not None:
+                await self._destroy(operator)
+
+    async def _destroy(self, operator: AsyncPLCOperator):
+        try:
+            await operator.disconnect()
+        except Exception as err:
+            _logger.debug(f"{self.identity} disconnect error: {err}")
+        finally:
+            operator.cleanup()
+
+
+class PLCSessionManager:
+    """按 PLC ip 管理常驻会话，每个 ip 只保持一个连接"""
+
+    def __init__(self):
+        self.sessions: dict[str, typing.Union[PLCSession, AsyncPLCSession]] = dict()
+
+    def session(self, ip: str, factory: typing.Callable[[], OperatorT], is_async: bool) -> typing.Union[PLCSession, AsyncPLCSession]:
+        """
+        获取 ip 对应的会话，不存在则创建
+        :param ip:
+        :param factory: 创建 operator 的工厂函数
+        :param is_async: factory 创建的是否是 AsyncPLCOperator
+        :return:
+        """
+        session = self.sessions.get(ip)
+        if session is None:
+            session = AsyncPLCSession(ip=ip, factory=factory) if is_async else PLCSession(ip=ip, factory=factory)
+            self.sessions[ip] = session
+        elif isinstance(session, AsyncPLCSession) != is_async:
+            raise TypeError(f"{self.identity} session[{ip}] is already registered as {type(session).__name__}")
+        return session
+
+    def sync_session(self, ip: str, factory: typing.Callable[[], PLCOperator]) -> PLCSession:
+        return self.session(ip=ip, factory=factory, is_async=False)
+
+    def async_session(self, ip: str, factory: typing.Callable[[], AsyncPLCOperator]) -> AsyncPLCSession:
+        return self.session(ip=ip, factory=factory, is_async=True)
+
+    def stats(self) -> dict[str, dict]:
+        """每个 PLC 的连接次数、读取耗时、错误计数"""
+        return {ip: session.stats.to_dict() for ip, session in self.sessions.items()}
+
+    async def close(self):
+        for session in self.sessions.values():
+            if isinstance(session, AsyncPLCSession):
+                await session.close()
+            else:
+                session.close()
+        self.sessions.clear()
+
+    @property
+    def identity(self):
+        return f"PLCSessionManager"
@@ -0,0 +1,255 @@
+import struct
+import ctypes
+import typing
+import asyncio
+import logging
+
+from .s7_read_plan import S7ReadPlan
+from .s7_scanner import S7_MAX_VARS, S7_RES_HEADER_SIZE, S7_RES_ITEM_HEADER_SIZE
+
+_logger = logging.getLogger(__name__)
+
+
+'''
+    asyncio 实现的 S7 通讯，只包含我们用到的子集
+        TPKT (RFC1006)  : version(1)=3, reserved(1), length(2)
+        COTP            : CR/CC 建立连接, DT 传输数据
+        S7comm          : setup communication, read var (read_area / read_multi_vars)
+'''
+TPKT_VERSION = 0x03
+TPKT_HEADER_SIZE = 4
+
+COTP_CR = 0xE0
+COTP_CC = 0xD0
+COTP_DT = 0xF0
+COTP_TPDU_SIZE_1024 = 0x0A
+# PG 连接
+CONNECTION_TYPE_PG = 0x01
+LOCAL_TSAP = 0x0100
+
+S7_PROTOCOL_ID = 0x32
+S7_ROSCTR_JOB = 0x01
+S7_ROSCTR_ACK_DATA = 0x03
+S7_FUNC_SETUP_COMMUNICATION = 0xF0
+S7_FUNC_READ_VAR = 0x04
+# 请求的 pdu 长度，实际以 plc 协商结果为准
+S7_REQUESTED_PDU_LENGTH = 480
+
+S7_RETURN_CODE_SUCCESS = 0xFF
+# 数据长度单位为 bit 的 transport size
+S7_BIT_LENGTH_TRANSPORT_SIZES = (0x03, 0x04, 0x05)
+
+S7_WORDLEN_BIT = 0x01
+S7_WORDLEN_BYTE = 0x02
+# S7_WORDLEN -> 单个元素字节数
+S7_WORDLEN_SIZE = {
+    0x01: 1,    # Bit
+    0x02: 1,    # Byte
+    0x03: 1,    # Char
+    0x04: 2,    # Word
+    0x05: 2,    # Int
+    0x06: 4,    # DWord
+    0x07: 4,    # DInt
+    0x08: 4,    # Real
+    0x1C: 2,    # Counter
+    0x1D: 2,    # Timer
+}
+
+DEFAULT_TIMEOUT_S = 2.0
+
+
+class S7ProtocolError(Exception):
+    pass
+
+
+class AsyncS7Transport:
+    def __init__(self, ip: str, port: int, rack: int, slot: int, timeout: float = DEFAULT_TIMEOUT_S):
+        """
+        asyncio 原生的 S7 客户端，不占用线程池
+        :param ip:
+        :param port:
+        :param rack:
+        :param slot:
+        :param timeout: 单次请求超时，秒
+        """
+        self.ip = ip
+        self.port = port
+        self.rack = rack
+        self.slot = slot
+        self.timeout = timeout
+
+        self.reader: typing.Optional[asyncio.StreamReader] = None
+        self.writer: typing.Optional[asyncio.StreamWriter] = None
+        # 同一时间只有一个请求
+        self.lock = asyncio.Lock()
+        self.pdu_length = 0
+        self._pdu_ref = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.port),
+            timeout=self.timeout,
+        )
+        try:
+            await self._cotp_connect()
+            await self._setup_communication()
+        except BaseException:
+            await self.close()
+            raise
+        _logger.debug(f"{self.identity} connected, pdu length={self.pdu_length}")
+
+    async def close(self):
+        writer, self.writer, self.reader = self.writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception as err:
+                _logger.debug(f"{self.identity} close error: {err}")
+
+    # #################### 报文 ####################
+    async def _send(self, payload: bytes):
+        self.writer.write(struct.pack(">BBH", TPKT_VERSION, 0, TPKT_HEADER_SIZE + len(payload)) + payload)
+        await self.writer.drain()
+
+    async def _recv(self) -> bytes:
+        header = await self.reader.readexactly(TPKT_HEADER_SIZE)
+        version, _, length = struct.unpack(">BBH", header)
+        if version != TPKT_VERSION:
+            raise S7ProtocolError(f"illegal tpkt version[{version}]")
+        return await self.reader.readexactly(length - TPKT_HEADER_SIZE)
+
+    async def _cotp_connect(self):
+        remote_tsap = (CONNECTION_TYPE_PG << 8) | (self.rack * 0x20 + self.slot)
+        params = (
+            bytes([0xC0, 1, COTP_TPDU_SIZE_1024]) +
+            bytes([0xC1, 2]) + struct.pack(">H", LOCAL_TSAP) +
+            bytes([0xC2, 2]) + struct.pack(">H", remote_tsap)
+        )
+        # length, CR, dst ref, src ref, class
+        body = struct.pack(">BHHB", COTP_CR, 0x0000, 0x0001, 0x00) + params
+        await self._send(bytes([len(body)]) + body)
+        res = await asyncio.wait_for(self._recv(), timeout=self.timeout)
+        if len(res) < 2 or res[1] != COTP_CC:
+            raise S7ProtocolError(f"cotp connect refused by {self.ip}:{self.port}")
+
+    def _next_pdu_ref(self) -> int:
+        self._pdu_ref = (self._pdu_ref + 1) & 0xFFFF
+        return self._pdu_ref
+
+    async def _request(self, params: bytes, data: bytes = b"") -> tuple[bytes, bytes]:
+        """
+        发送 S7 job，返回 ack_data 的 (params, data)
+        """
+        pdu_ref = self._next_pdu_ref()
+        header = struct.pack(">BBHHHH", S7_PROTOCOL_ID, S7_ROSCTR_JOB, 0, pdu_ref, len(params), len(data))
+        # COTP DT: length=2, DT, last data unit
+        cotp = bytes([0x02, COTP_DT, 0x80])
+
+        async with self.lock:
+            try:
+                await self._send(cotp + header + params + data)
+                res = await asyncio.wait_for(self._recv(), timeout=self.timeout)
+            except BaseException:
+                # 超时或断线后报文可能错位，丢弃连接
+                await self.close()
+                raise
+
+        # 跳过 COTP
+        cotp_length = res[0] + 1
+        s7 = res[cotp_length:]
+        protocol_id, rosctr, _, _pdu_ref, param_length, data_length, err_class, err_code = struct.unpack(">BBHHHHBB", s7[:12])
+        if protocol_id != S7_PROTOCOL_ID or rosctr != S7_ROSCTR_ACK_DATA:
+            raise S7ProtocolError(f"illegal s7 response[protocol={protocol_id}, rosctr={rosctr}]")
+        if err_class or err_code:
+            raise S7ProtocolError(f"s7 error[class=0x{err_class:02X}, code=0x{err_code:02X}]")
+        if _pdu_ref != pdu_ref:
+            raise S7ProtocolError(f"s7 pdu ref mismatch[{_pdu_ref} != {pdu_ref}]")
+        return s7[12: 12 + param_length], s7[12 + param_length: 12 + param_length + data_length]
+
+    async def _setup_communication(self):
+        params = struct.pack(">BBHHH", S7_FUNC_SETUP_COMMUNICATION, 0, 1, 1, S7_REQUESTED_PDU_LENGTH)
+        res_params, _ = await self._request(params)
+        self.pdu_length = struct.unpack(">H", res_params[6:8])[0]
+
+    # #################### 读取 ####################
+    @staticmethod
+    def _encode_item(area: int, wordlen: int, db_number: int, start: int, amount: int) -> bytes:
+        # Bit 的地址为位地址，其他为字节地址
+        address = start if wordlen == S7_WORDLEN_BIT else start * 8
+        return struct.pack(
+            ">BBBBHHB",
+            0x12, 0x0A, 0x10,   # variable specification, length, syntax id (S7ANY)
+            wordlen, amount, db_number, area,
+        ) + address.to_bytes(3, "big")
+
+    async def _read_items(self, items: list[bytes]) -> list[tuple[int, bytes]]:
+        """
+        一次 read var 请求
+        :return: [(return_code, data), ...]
+        """
+        params = bytes([S7_FUNC_READ_VAR, len(items)]) + b"".join(items)
+        res_params, res_data = await self._request(params)
+        count = res_params[1]
+
+        results = list()
+        offset = 0
+        for i in range(count):
+            return_code, transport_size, length = struct.unpack(">BBH", res_data[offset: offset + 4])
+            offset += 4
+            if transport_size in S7_BIT_LENGTH_TRANSPORT_SIZES:
+                length = (length + 7) // 8
+            data = res_data[offset: offset + length]
+            offset += length
+            # 除最后一项外偶数对齐
+            if length % 2 and i < count - 1:
+                offset += 1
+            results.append((return_code, data))
+        return results
+
+    async def read_area(self, area: int, db_number: int, start: int, size: int) -> bytearray:
+        """
+        按字节读取一段区域，超过 pdu 时分段
+        :return: bytearray，与 snap7 client.read_area 一致
+        """
+        max_size = self.pdu_length - S7_RES_HEADER_SIZE - S7_RES_ITEM_HEADER_SIZE
+        data = bytearray()
+        for offset in range(0, size, max_size):
+            amount = min(max_size, size - offset)
+            item = self._encode_item(area, S7_WORDLEN_BYTE, db_number, start + offset, amount)
+            (return_code, chunk), = await self._read_items([item])
+            if return_code != S7_RETURN_CODE_SUCCESS:
+                raise S7ProtocolError(f"read area[0x{area:02X}, db={db_number}, start={start + offset}] error: return code 0x{return_code:02X}")
+            data.extend(chunk)
+        return data
+
+    async def read_plan(self, plan: S7ReadPlan):
+        """
+        按预编译的读取计划读取，结果写入 plan 缓冲区，由 plan.decode() 解码
+        plan 应已按 pdu 长度分批 (S7Scanner)，这里只按 S7_MAX_VARS 切分
+        """
+        for batch_start in range(0, len(plan), S7_MAX_VARS):
+            indexes = range(batch_start, min(len(plan), batch_start + S7_MAX_VARS))
+            items = [
+                self._encode_item(
+                    plan.items[i].Area, plan.items[i].WordLen, plan.items[i].DBNumber,
+                    plan.items[i].Start, plan.items[i].Amount,
+                )
+                for i in indexes
+            ]
+            results = await self._read_items(items)
+            for i, (return_code, data) in zip(indexes, results):
+                if return_code != S7_RETURN_CODE_SUCCESS:
+                    plan.items[i].Result = return_code
+                    continue
+                size = min(len(data), plan.sizes[i])
+                ctypes.memmove(plan.buffer_address + plan.offsets[i], data, size)
+                plan.items[i].Result = 0
+
+    @property
+    def identity(self):
+        return f"S7Transport[{self.ip}:{self.port}]"
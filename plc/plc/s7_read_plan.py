@@ -0,0 +1,155 @@
+import ctypes
+import logging
+import snap7
+import numpy as np
+
+from .s7_result_map import parse_s7_result
+from .s7_operation_map import PLC_AREA_MAP, PLC_DATATYPE_MAP, PLC_PARSER_MAP
+
+_logger = logging.getLogger(__name__)
+
+
+'''
+    数据类型 -> numpy dtype (S7 为大端序)
+    BOOL 单独按位解析，未列出的类型 (STRING, DATE, DT ...) 回退到 PLC_PARSER_MAP
+'''
+PLC_NUMPY_DTYPE_MAP = {
+    'BYTE': np.dtype('u1'),
+    'SINT': np.dtype('i1'),
+    'USINT': np.dtype('u1'),
+    'INT': np.dtype('>i2'),
+    'UINT': np.dtype('>u2'),
+    'UNIT': np.dtype('>u2'),
+    'DINT': np.dtype('>i4'),
+    'UDINT': np.dtype('>u4'),
+    'WORD': np.dtype('>u2'),
+    'DWORD': np.dtype('>u4'),
+    'REAL': np.dtype('>f4'),
+    'LREAL': np.dtype('>f8'),
+}
+
+
+class S7ReadPlan:
+    def __init__(self, var_dict: dict):
+        """
+        预编译的 read_multi_vars 读取计划
+            S7DataItem 数组 和 数据缓冲区 只创建一次，每次读取复用
+            所有 item 共用一块连续缓冲区，读取后按 numpy 结构化 dtype 一次性解码
+        注意：缓冲区被复用，同一个 plan 不能被多个线程同时读取
+        :param var_dict: 变量表，格式同 PLCOperator.multi_vars
+        """
+        self.var_dict = dict(var_dict)
+        self.names = list(self.var_dict.keys())
+
+        names = list()
+        formats = list()
+        offsets = list()
+        # 不能向量化解码的变量 name -> (offset, size)
+        self.fallbacks: dict[str, tuple[int, int]] = dict()
+
+        offset = 0
+        items = list()
+        # 每个 item 在缓冲区中的偏移和长度
+        self.offsets: list[int] = list()
+        self.sizes: list[int] = list()
+        for name, cfg in self.var_dict.items():
+            datatype = cfg['datatype']
+            size = PLC_DATATYPE_MAP[datatype]['size']
+            type_amount = PLC_DATATYPE_MAP[datatype]['amount']
+            value_amount = cfg.get('amount', 1)
+            amount = type_amount * value_amount
+            data_size = amount * size
+
+            item = snap7.type.S7DataItem()
+            item.Area = PLC_AREA_MAP[cfg['area']]
+            item.WordLen = PLC_DATATYPE_MAP[datatype]['type']
+            item.DBNumber = cfg.get('db_number', 0)
+            item.Start = cfg['start']
+            item.Amount = amount
+            items.append((item, offset))
+            self.offsets.append(offset)
+            self.sizes.append(data_size)
+
+            if datatype == 'BOOL':
+                names.append(name)
+                formats.append((np.dtype('u1'), (data_size, )))
+                offsets.append(offset)
+            elif datatype in PLC_NUMPY_DTYPE_MAP:
+                names.append(name)
+                formats.append((PLC_NUMPY_DTYPE_MAP[datatype], (value_amount, )))
+                offsets.append(offset)
+            else:
+                self.fallbacks[name] = (offset, data_size)
+
+            # 按 8 字节对齐，便于 numpy 读取
+            offset += (data_size + 7) & ~7
+
+        # 连续缓冲区
+        self.buffer = ctypes.create_string_buffer(max(offset, 1))
+        self.buffer_address = ctypes.addressof(self.buffer)
+
+        # S7DataItem 数组，pData 指向缓冲区中的各自位置
+        self.items = (snap7.type.S7DataItem * len(items))()
+        for i, (item, item_offset) in enumerate(items):
+            item.pData = ctypes.cast(self.buffer_address + item_offset, ctypes.POINTER(ctypes.c_uint8))
+            self.items[i] = item
+
+        # 结构化 dtype，直接作为缓冲区的视图
+        self.dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': len(self.buffer)})
+        self.record = np.frombuffer(self.buffer, dtype=self.dtype, count=1)[0]
+
+    def __len__(self):
+        return len(self.items)
+
+    def decode(self, as_array: bool = False) -> dict:
+        """
+        解码缓冲区
+        :param as_array: 数组变量是否返回 numpy 数组，默认返回 list，与 PLCOperator.read_multi_vars 一致
+        :return: {name: value}，读取失败的变量为 None
+        """
+        values = dict()
+        for item, name in zip(self.items, self.names):
+            if item.Result != 0:
+                _logger.error(f"{self.identity} item[{name}] error: {parse_s7_result(item.Result)}")
+                values[name] = None
+                continue
+
+            cfg = self.var_dict[name]
+            datatype = cfg['datatype']
+            value_amount = cfg.get('amount', 1)
+
+            if name in self.fallbacks:
+                offset, data_size = self.fallbacks[name]
+                values[name] = self._decode_fallback(cfg, bytearray(self.buffer.raw[offset: offset + data_size]))
+                continue
+
+            if datatype == 'BOOL':
+                bit = cfg.get('bit', 0)
+                # 小端位序：bit0 为字节最低位，与 snap7.util.get_bool 一致
+                bits = np.unpackbits(self.record[name], bitorder='little')[bit: bit + value_amount]
+                array = bits.astype(bool)
+            else:
+                array = self.record[name]
+
+            if value_amount == 1:
+                values[name] = array[0].item()
+            elif as_array:
+                values[name] = array.copy()
+            else:
+                values[name] = array.tolist()
+
+        return values
+
+    @staticmethod
+    def _decode_fallback(cfg: dict, buf: bytearray):
+        datatype = cfg['datatype']
+        parser = PLC_PARSER_MAP[datatype]
+        size = PLC_DATATYPE_MAP[datatype]['size'] * PLC_DATATYPE_MAP[datatype]['amount']
+        value_amount = cfg.get('amount', 1)
+        if value_amount == 1:
+            return parser(buf, 0, None)
+        return [parser(buf, i * size, None) for i in range(value_amount)]
+
+    @property
+    def identity(self):
+        return f"S7ReadPlan"
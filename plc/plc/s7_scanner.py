@@ -0,0 +1,160 @@
+import typing
+import logging
+
+from .s7_operation_map import PLC_DATATYPE_MAP
+from .s7_read_plan import S7ReadPlan
+
+_logger = logging.getLogger(__name__)
+
+
+'''
+    read_multi_vars 报文长度限制（字节）
+        请求:  S7 header(10) + param header(2) + item(12) * n                   <= pdu
+        响应:  S7 header(12) + param header(2) + Σ(data header(4) + data(偶数对齐)) <= pdu
+    snap7 单次 read_multi_vars 最多 20 个 item
+'''
+S7_MAX_VARS = 20
+S7_REQ_HEADER_SIZE = 12
+S7_REQ_ITEM_SIZE = 12
+S7_RES_HEADER_SIZE = 14
+S7_RES_ITEM_HEADER_SIZE = 4
+# S7-300 默认协商的 pdu 长度
+DEFAULT_PDU_LENGTH = 240
+
+
+def var_data_size(cfg: dict) -> int:
+    """变量在 plc 中占用的字节数"""
+    datatype = PLC_DATATYPE_MAP[cfg['datatype']]
+    return datatype['size'] * datatype['amount'] * cfg.get('amount', 1)
+
+
+class S7Scanner:
+    def __init__(self, var_dict: dict, pdu_length: int = DEFAULT_PDU_LENGTH):
+        """
+        扫描引擎：将一个 reader 需要的所有变量合并为尽可能少的 read_multi_vars 请求
+        :param var_dict: 变量表，格式同 PLCOperator.multi_vars
+        :param pdu_length: 与 plc 协商的 pdu 长度
+        """
+        self.var_dict = dict(var_dict)
+        self.pdu_length = pdu_length
+        # 超过单个 pdu 的数组变量会被拆分为多个 item, name -> [item_name, ...]
+        self.chunks: dict[str, list[str]] = dict()
+        # 分批后的变量表
+        self.batches: list[dict] = self.split(self.chunk(self.var_dict), self.pdu_length)
+        # 每个批次预编译为读取计划
+        self.plans: list[S7ReadPlan] = [S7ReadPlan(batch) for batch in self.batches]
+        _logger.debug(f"{self.identity} {len(self.var_dict)} vars -> {len(self.batches)} requests")
+
+    @property
+    def max_item_data_size(self) -> int:
+        """单个 item 在一次响应中可容纳的最大数据"""
+        return self.pdu_length - S7_RES_HEADER_SIZE - S7_RES_ITEM_HEADER_SIZE
+
+    def chunk(self, var_dict: dict) -> dict:
+        """
+        将超过单个 pdu 的数组变量拆分为多个 item
+        :param var_dict:
+        :return: 拆分后的变量表
+        """
+        items = dict()
+        for name, cfg in var_dict.items():
+            data_size = var_data_size(cfg)
+            if data_size <= self.max_item_data_size:
+                items[name] = cfg
+                continue
+
+            datatype = PLC_DATATYPE_MAP[cfg['datatype']]
+            value_size = datatype['size'] * datatype['amount']
+            amount = cfg.get('amount', 1)
+            per_chunk = self.max_item_data_size // value_size
+            if amount <= 1 or per_chunk <= 0:
+                raise ValueError(f"var[{name}] size[{data_size}] exceeds pdu length[{self.pdu_length}]")
+
+            self.chunks[name] = list()
+            for index, offset in enumerate(range(0, amount, per_chunk)):
+                sub_cfg = dict(cfg)
+                sub_cfg['amount'] = min(per_chunk, amount - offset)
+                if cfg['datatype'] == 'BOOL':
+                    bit = cfg.get('bit', 0) + offset
+                    sub_cfg['start'] = cfg['start'] + bit // 8
+                    sub_cfg['bit'] = bit % 8
+                else:
+                    sub_cfg['start'] = cfg['start'] + offset * value_size
+                sub_name = f"{name}#{index}"
+                items[sub_name] = sub_cfg
+                self.chunks[name].append(sub_name)
+        return items
+
+    @staticmethod
+    def split(var_dict: dict, pdu_length: int) -> list[dict]:
+        """
+        按 pdu 长度 和 最大 item 数量 切分变量表
+        :param var_dict:
+        :param pdu_length:
+        :return: 每个元素为一次 read_multi_vars 请求的变量表
+        """
+        batches = list()
+        batch = dict()
+        req_size = S7_REQ_HEADER_SIZE
+        res_size = S7_RES_HEADER_SIZE
+
+        for name, cfg in var_dict.items():
+            data_size = var_data_size(cfg)
+            item_req_size = S7_REQ_ITEM_SIZE
+            # 数据偶数对齐
+            item_res_size = S7_RES_ITEM_HEADER_SIZE + data_size + (data_size % 2)
+
+            if res_size + item_res_size > pdu_length and not batch:
+                raise ValueError(f"var[{name}] size[{data_size}] exceeds pdu length[{pdu_length}]")
+
+            if batch and (
+                    len(batch) >= S7_MAX_VARS or
+                    req_size + item_req_size > pdu_length or
+                    res_size + item_res_size > pdu_length
+            ):
+                batches.append(batch)
+                batch = dict()
+                req_size = S7_REQ_HEADER_SIZE
+                res_size = S7_RES_HEADER_SIZE
+
+            batch[name] = cfg
+            req_size += item_req_size
+            res_size += item_res_size
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def scan(self, read_plan: typing.Callable[[S7ReadPlan], dict]) -> dict:
+        """
+        执行一次扫描
+        :param read_plan: 同步读取函数，通常为 PLCOperator.read_plan
+        :return: {name: value}
+        """
+        values = dict()
+        for plan in self.plans:
+            values.update(read_plan(plan))
+        return self._merge_chunks(values)
+
+    async def ascan(self, read_plan: typing.Callable[[S7ReadPlan], typing.Awaitable[dict]]) -> dict:
+        """
+        执行一次扫描，异步版本
+        :param read_plan: 异步读取函数，通常为 AsyncPLCOperator.read_plan
+        :return: {name: value}
+        """
+        values = dict()
+        for plan in self.plans:
+            values.update(await read_plan(plan))
+        return self._merge_chunks(values)
+
+    def _merge_chunks(self, values: dict) -> dict:
+        # 合并拆分的数组变量
+        for name, sub_names in self.chunks.items():
+            parts = [values.pop(sub_name) for sub_name in sub_names]
+            values[name] = None if any(part is None for part in parts) else [v for part in parts for v in part]
+        return values
+
+    @property
+    def identity(self):
+        return f"S7Scanner"
@@ -0,0 +1,287 @@
+import time
+import typing
+import asyncio
+import dataclasses
+from enum import StrEnum
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from .plc import AsyncPLCOperator, AsyncPLCSession, PLCBackend, PLCSessionManager, S7Scanner
+from .plc_tag_table import PLCTarget, PLCTagGroup
+
+_logger = logging.getLogger(__name__)
+
+
+MAX_WORKERS = 10
+# 订阅队列长度，消费过慢时丢弃最旧的快照
+SUBSCRIBER_QUEUE_MAX_SIZE = 1000
+# 订阅 redis stream 的阻塞时间，毫秒
+SUBSCRIBE_BLOCK_MS = 1000
+# 订阅出错后重试的间隔，秒
+SUBSCRIBE_RETRY_INTERVAL_SEC = 1
+# 变量无变化时重新发布的间隔，秒，订阅者据此判断网关是否存活
+REPUBLISH_INTERVAL_SEC = 1
+
+
+class PLCSource(StrEnum):
+    DIRECT = "direct"       # 进程自己连接 plc
+    GATEWAY = "gateway"     # 订阅 plc 网关发布的变量
+
+    @classmethod
+    def create(cls, source: typing.Optional[str]):
+        try:
+            return cls(str(source).lower())
+        except ValueError:
+            return cls.DIRECT
+
+
+@dataclasses.dataclass
+class PLCTagSnapshot:
+    """plc 网关发布的一个 plc 的全部变量"""
+    plc: str
+    values: dict
+    t: int      # 扫描完成时间戳，毫秒
+
+
+@dataclasses.dataclass
+class PLCTagGroupStats:
+    """变量组轮询统计"""
+    name: str
+    interval: float
+    read_count: int = 0
+    read_error_count: int = 0
+    publish_count: int = 0
+    overrun_count: int = 0          # 一次扫描超过轮询间隔的次数
+    max_scan_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class PLCGateway:
+    def __init__(
+            self,
+            targets: dict[str, PLCTarget],
+            executor: typing.Optional[ThreadPoolExecutor] = None,
+            backend: str = PLCBackend.EXECUTOR,
+            publisher: typing.Optional[typing.Callable[[PLCTagSnapshot], typing.Awaitable]] = None,
+            republish_interval: float = REPUBLISH_INTERVAL_SEC,
+    ):
+        """
+        plc 网关
+            持有所有 plc 的常驻会话，按变量表中的 interval 分组轮询
+            同一个 plc 的各组共用一个连接，读取依次排队，plc 负载固定
+            任一变量变化时发布该 plc 的全部变量；无变化时每 republish_interval 重新发布一次，
+            读取失败时不发布，订阅者按快照时间判断数据是否过期
+        :param targets: PLCTagTable.load() 的结果
+        :param executor:
+        :param backend: plc 通讯后端
+        :param publisher: 可选，async publisher(snapshot)，例如写入 redis stream
+        :param republish_interval: 秒
+        """
+        self.targets = targets
+        self.publisher = publisher
+        self.republish_interval = republish_interval
+
+        # 执行器
+        self.executor = executor or ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        # 标识是否是我们自己创建的 executor
+        self._own_executor = executor is None
+
+        # 每个 plc ip 只保持一个连接
+        self.sessions = PLCSessionManager()
+        for target in self.targets.values():
+            self.sessions.async_session(
+                ip=target.ip,
+                factory=lambda t=target: AsyncPLCOperator(
+                    ip=t.ip, executor=self.executor, model=t.model, port=t.port, backend=backend,
+                ),
+            )
+
+        self.groups: list[PLCTagGroup] = [group for target in self.targets.values() for group in target.groups()]
+        self.group_stats = {group.name: PLCTagGroupStats(name=group.name, interval=group.interval) for group in self.groups}
+        # 扫描引擎和创建它的 operator，重连后重新创建
+        self._scanners: dict[str, tuple[AsyncPLCOperator, S7Scanner]] = dict()
+
+        # 每个 plc 的当前变量
+        self.values: dict[str, dict] = {name: dict() for name in self.targets}
+        # 每个 plc 最近一次发布的时间，monotonic
+        self._publish_t: dict[str, float] = {name: 0.0 for name in self.targets}
+
+        self.tasks = list()
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.run(group)) for group in self.groups]
+        _logger.info(f"{self.identity} started, groups={[group.name for group in self.groups]}")
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = list()
+
+        await self.sessions.close()
+
+        if self._own_executor:
+            self.executor.shutdown()
+
+    async def run(self, group: PLCTagGroup):
+        stats = self.group_stats[group.name]
+        while True:
+            start_t = time.perf_counter()
+            try:
+                await self.poll(group)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                stats.read_error_count += 1
+                _logger.warning(f"{self.identity} poll group[{group.name}] error: {err}")
+            # 固定轮询周期
+            elapsed = time.perf_counter() - start_t
+            if elapsed > group.interval:
+                stats.overrun_count += 1
+            await asyncio.sleep(max(0.0, group.interval - elapsed))
+
+    async def poll(self, group: PLCTagGroup) -> bool:
+        """
+        扫描一次变量组
+        :return: 是否有变量变化
+        """
+        stats = self.group_stats[group.name]
+        session = self.session(group.plc)
+
+        start_t = time.perf_counter()
+        values = await session.read(lambda operator: self._scan(group, operator))
+        t = int(time.time() * 1000)
+        stats.read_count += 1
+        stats.max_scan_ms = max(stats.max_scan_ms, (time.perf_counter() - start_t) * 1000)
+
+        current = self.values[group.plc]
+        changed = any(tag not in current or current[tag] != value for tag, value in values.items())
+        current.update(values)
+        if changed or time.monotonic() - self._publish_t[group.plc] >= self.republish_interval:
+            stats.publish_count += 1
+            self._publish_t[group.plc] = time.monotonic()
+            await self.emit(PLCTagSnapshot(plc=group.plc, values=dict(current), t=t))
+        return changed
+
+    async def _scan(self, group: PLCTagGroup, operator: AsyncPLCOperator) -> dict:
+        cached = self._scanners.get(group.name)
+        if cached is None or cached[0] is not operator:
+            cached = (operator, operator.create_scanner(group.tags))
+            self._scanners[group.name] = cached
+        return await cached[1].ascan(operator.read_plan)
+
+    async def emit(self, snapshot: PLCTagSnapshot):
+        _logger.debug(f"{self.identity} {snapshot}")
+        if self.publisher is None:
+            return
+        try:
+            await self.publisher(snapshot)
+        except Exception as err:
+            _logger.warning(f"{self.identity} publish error: {err}")
+
+    def session(self, plc: str) -> AsyncPLCSession:
+        return self.sessions.sessions[self.targets[plc].ip]
+
+    def stats(self) -> dict[str, dict]:
+        """每个变量组的轮询统计 和 每个 plc 的会话统计"""
+        return {
+            "groups": {name: stats.to_dict() for name, stats in self.group_stats.items()},
+            "sessions": self.sessions.stats(),
+        }
+
+    @property
+    def identity(self):
+        return f"PLCGateway"
+
+
+class PLCTagSubscriber:
+    def __init__(self, redis, press_line: str, plcs: typing.Iterable[str]):
+        """
+        订阅 plc 网关发布的变量
+        :param redis: AsyncRedisDB
+        :param press_line:
+        :param plcs: 变量表中的 plc 名称
+        """
+        self.redis = redis
+        self.press_line = press_line
+        self.plcs = list(plcs)
+
+        # 每个 plc 最新的快照
+        self.snapshots: dict[str, typing.Optional[PLCTagSnapshot]] = {plc: None for plc in self.plcs}
+        # 订阅者
+        self.subscribers: dict[str, list[asyncio.Queue[PLCTagSnapshot]]] = {plc: list() for plc in self.plcs}
+
+        self.tasks = list()
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.run(plc)) for plc in self.plcs]
+        _logger.info(f"{self.identity} started, plcs={self.plcs}")
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = list()
+
+    def subscribe(self, plc: str, maxsize: int = SUBSCRIBER_QUEUE_MAX_SIZE) -> asyncio.Queue:
+        """订阅 plc 的变量快照"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self.subscribers[plc].append(queue)
+        return queue
+
+    def unsubscribe(self, plc: str, queue: asyncio.Queue):
+        if queue in self.subscribers[plc]:
+            self.subscribers[plc].remove(queue)
+
+    def get(self, plc: str, tag: str, default=None, max_age_ms: typing.Optional[int] = None):
+        """
+        最新的变量值
+        :param max_age_ms: 快照早于该时间 (网关失联或读取 plc 失败) 时返回 default，None 不检查
+        """
+        snapshot = self.snapshots[plc]
+        if snapshot is None:
+            return default
+        if max_age_ms is not None and self.age_ms(plc) > max_age_ms:
+            return default
+        return snapshot.values.get(tag, default)
+
+    def age_ms(self, plc: str) -> typing.Optional[int]:
+        """最新快照距今的时间，毫秒，没有快照时返回 None"""
+        snapshot = self.snapshots[plc]
+        if snapshot is None:
+            return None
+        return int(time.time() * 1000) - snapshot.t
+
+    async def run(self, plc: str):
+        include_last = True
+        while True:
+            try:
+                async for t, values in self.redis.get_plc_tags(
+                        press_line=self.press_line,
+                        plc=plc,
+                        block=SUBSCRIBE_BLOCK_MS,
+                        include_last=include_last,
+                ):
+                    if values is None:
+                        continue
+                    include_last = False
+                    self.emit(PLCTagSnapshot(plc=plc, values=values, t=t))
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                _logger.warning(f"{self.identity} subscribe plc[{plc}] error: {err}")
+                await asyncio.sleep(SUBSCRIBE_RETRY_INTERVAL_SEC)
+
+    def emit(self, snapshot: PLCTagSnapshot):
+        self.snapshots[snapshot.plc] = snapshot
+        for queue in self.subscribers[snapshot.plc]:
+            if queue.full():
+                # 丢弃最旧的快照
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    @property
+    def identity(self):
+        return f"PLCTagSubscriber[{self.press_line}]"
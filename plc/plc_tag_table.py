@@ -0,0 +1,87 @@
+import os
+import yaml
+import typing
+import dataclasses
+
+from .plc.s7_operation_map import PLC_AREA_MAP, PLC_DATATYPE_MAP
+from .plc.plc_operator import S7_TCP_PORT
+
+
+# 变量默认轮询间隔，秒
+DEFAULT_TAG_INTERVAL_SEC = 1.0
+DEFAULT_PLC_MODEL = "S7-300"
+
+
+@dataclasses.dataclass
+class PLCTagGroup:
+    """同一个 plc 上相同轮询间隔的变量，合并为一次扫描"""
+    plc: str
+    interval: float
+    tags: dict          # 格式同 PLCOperator.multi_vars
+
+    @property
+    def name(self) -> str:
+        return f"{self.plc}@{self.interval}s"
+
+
+@dataclasses.dataclass
+class PLCTarget:
+    """变量表中的一个 plc"""
+    name: str
+    ip: str
+    port: int
+    model: str
+    tags: dict          # 格式同 PLCOperator.multi_vars，另加 interval
+
+    def groups(self) -> list[PLCTagGroup]:
+        """按 interval 分组"""
+        groups: dict[float, dict] = dict()
+        for tag, cfg in self.tags.items():
+            cfg = dict(cfg)
+            interval = float(cfg.pop("interval", DEFAULT_TAG_INTERVAL_SEC))
+            groups.setdefault(interval, dict())[tag] = cfg
+        return [PLCTagGroup(plc=self.name, interval=interval, tags=tags) for interval, tags in sorted(groups.items())]
+
+
+class PLCTagTable:
+
+    @classmethod
+    def load(cls, path: str) -> dict[str, PLCTarget]:
+        """
+        加载 plc 网关变量表
+        :param path: YAML 文件路径
+        :return: {plc name: PLCTarget}
+        :raises FileNotFoundError, ValueError
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"plc tag table yaml file not found: {path}")
+
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or dict()
+
+        targets = dict()
+        for name, cfg in config.items():
+            if "ip" not in cfg:
+                raise ValueError(f"plc[{name}] ip is not defined")
+            tags = cfg.get("tags") or dict()
+            for tag, tag_cfg in tags.items():
+                cls.validate(name, tag, tag_cfg)
+            targets[name] = PLCTarget(
+                name=name,
+                ip=cfg["ip"],
+                port=int(cfg.get("port", S7_TCP_PORT)),
+                model=cfg.get("model", DEFAULT_PLC_MODEL),
+                tags=tags,
+            )
+        return targets
+
+    @staticmethod
+    def validate(plc: str, tag: str, cfg: dict):
+        if cfg.get("area") not in PLC_AREA_MAP:
+            raise ValueError(f"plc[{plc}] tag[{tag}] has illegal area[{cfg.get('area')}]")
+        if cfg.get("datatype") not in PLC_DATATYPE_MAP:
+            raise ValueError(f"plc[{plc}] tag[{tag}] has illegal datatype[{cfg.get('datatype')}]")
+        if "start" not in cfg:
+            raise ValueError(f"plc[{plc}] tag[{tag}] start is not defined")
+        if float(cfg.get("interval", DEFAULT_TAG_INTERVAL_SEC)) <= 0:
+            raise ValueError(f"plc[{plc}] tag[{tag}] interval must be positive")
@@ -3,15 +3,20 @@ from .plc.plc_operator import PLCOperator, _logger
 
 
 PLC_IP = "10.108.1.1"
+PLC_PORT = 102
 PLC_MODEL = "S7-300"
 
 class Press1stReader(PLCOperator):
+    PLC_IP = PLC_IP
+    PLC_PORT = PLC_PORT
+
     def __init__(self):
 
-        ip = PLC_IP
+        ip = self.PLC_IP
+        port = self.PLC_PORT
         model = PLC_MODEL
 
-        super().__init__(ip=ip, model=model)
+        super().__init__(ip=ip, model=model, port=port)
 
         self.multi_vars = {
             "running": {
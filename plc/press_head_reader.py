@@ -1,19 +1,23 @@
 import snap7
-from .plc.async_plc_operator import AsyncPLCOperator, _logger
-from utils import async_run_in_executor
+from .plc.async_plc_operator import AsyncPLCOperator, PLCBackend, _logger
 
 
 PLC_IP = "10.108.9.1"
+PLC_PORT = 102
 PLC_MODEL = "S7-300"
 
 
 class PressHeadReader(AsyncPLCOperator):
-    def __init__(self, executor):
+    PLC_IP = PLC_IP
+    PLC_PORT = PLC_PORT
 
-        ip = PLC_IP
+    def __init__(self, executor, backend: str = PLCBackend.EXECUTOR):
+
+        ip = self.PLC_IP
+        port = self.PLC_PORT
         model = PLC_MODEL
 
-        super().__init__(ip=ip, executor=executor, model=model)
+        super().__init__(ip=ip, executor=executor, model=model, port=port, backend=backend)
 
         self.multi_vars = {
             "program_id": {
@@ -25,9 +29,8 @@ class PressHeadReader(AsyncPLCOperator):
             },
         }
 
-    @async_run_in_executor
-    def read_program_id(self) -> int:
-        data = self.client.read_area(snap7.type.Area.DB, 61, 2, 2)
+    async def read_program_id(self) -> int:
+        data = await self.read_area(snap7.type.Area.DB, 61, 2, 2)
         program_id = snap7.util.get_word(data, 0)
         _logger.debug(f"{self.identity} read_program_id()={program_id}")
         return int(program_id)
@@ -1,29 +1,44 @@
+import time
+import dataclasses
 import snap7
-from .plc.async_plc_operator import AsyncPLCOperator, _logger
-from utils import async_run_in_executor
+from .plc.async_plc_operator import AsyncPLCOperator, PLCBackend, _logger
 
 
 PLC_IP = "10.108.7.1"
+PLC_PORT = 102
 PLC_MODEL = "S7-300"
 
 
+@dataclasses.dataclass
+class PressTailSnapshot:
+    """同一次扫描得到的 press tail 变量"""
+    shuttle_s1: bool
+    shuttle_s2: bool
+    part_counter: int
+    t: int      # 扫描完成时间戳，毫秒
+
+
 class PressTailReader(AsyncPLCOperator):
-    def __init__(self, executor):
+    PLC_IP = PLC_IP
+    PLC_PORT = PLC_PORT
 
-        ip = PLC_IP
+    def __init__(self, executor, backend: str = PLCBackend.EXECUTOR):
+
+        ip = self.PLC_IP
+        port = self.PLC_PORT
         model = PLC_MODEL
 
-        super().__init__(ip=ip, executor=executor, model=model)
+        super().__init__(ip=ip, executor=executor, model=model, port=port, backend=backend)
 
         self.multi_vars = {
-            # "shuttle_sensors": {
-            #     'area': 'PE',
-            #     'db_number': 0,
-            #     'start': 538,
-            #     'bit': 1,
-            #     'amount': 2,
-            #     'datatype': 'BOOL',
-            # },
+            "shuttle_sensors": {
+                'area': 'PE',
+                'db_number': 0,
+                'start': 538,
+                'bit': 1,
+                'amount': 2,
+                'datatype': 'BOOL',
+            },
             "part_counter": {
                 'area': 'DB',
                 'db_number': 160,
@@ -41,24 +56,34 @@ class PressTailReader(AsyncPLCOperator):
             # },
         }
 
-    @async_run_in_executor
-    def read_shuttle_sensors(self) -> tuple[bool, bool]:
-        data = self.client.read_area(snap7.type.Area.PE, 0, 538, 1)
+    async def read_snapshot(self) -> PressTailSnapshot:
+        """一次扫描读取 shuttle 传感器 和 part counter"""
+        values = await self.scan()
+        s1, s2 = values["shuttle_sensors"]
+        snapshot = PressTailSnapshot(
+            shuttle_s1=s1,
+            shuttle_s2=s2,
+            part_counter=values["part_counter"],
+            t=int(time.time() * 1000),
+        )
+        _logger.debug(f"{self.identity} read_snapshot()={snapshot}")
+        return snapshot
+
+    async def read_shuttle_sensors(self) -> tuple[bool, bool]:
+        data = await self.read_area(snap7.type.Area.PE, 0, 538, 1)
         s1 = snap7.util.get_bool(data, 0, 1)
         s2 = snap7.util.get_bool(data, 0, 2)
         _logger.debug(f"{self.identity} read_shuttle_sensors()={(s1, s2)}")
         return s1, s2
 
-    @async_run_in_executor
-    def read_part_counter(self) -> int:
-        data = self.client.read_area(snap7.type.Area.DB, 160, 54, 4)
+    async def read_part_counter(self) -> int:
+        data = await self.read_area(snap7.type.Area.DB, 160, 54, 4)
         count = snap7.util.get_dword(data, 0)
         _logger.debug(f"{self.identity} read_part_counter()={count}")
         return count
 
-    @async_run_in_executor
-    def read_right_conveyer_1(self) -> int:
-        data = self.client.read_area(snap7.type.Area.DB, 630, 6, 1)
+    async def read_right_conveyer_1(self) -> int:
+        data = await self.read_area(snap7.type.Area.DB, 630, 6, 1)
         running = snap7.util.get_bool(data, 0, 6)
         _logger.debug(f"{self.identity} read_right_conveyer_1()={running}")
         return running
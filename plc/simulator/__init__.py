@@ -0,0 +1,2 @@
+from .timeline import Timeline, SimEvent, SIM_TAGS, SIM_TAG_READERS
+from .s7_simulator import S7Simulator, use_simulator, SIM_TCP_PORT
@@ -0,0 +1,209 @@
+import time
+import struct
+import ctypes
+import typing
+import threading
+import logging
+import snap7
+
+from .timeline import SIM_TAGS, Timeline, SimEvent
+from ..press_1st_reader import Press1stReader
+from ..press_head_reader import PressHeadReader
+from ..press_tail_reader import PressTailReader
+
+_logger = logging.getLogger(__name__)
+
+
+# 非特权端口，102 需要管理员权限
+SIM_TCP_PORT = 1102
+
+# 各 reader 连接的回环地址，不同地址保证 PLCSessionManager 为每个 reader 保持独立会话
+SIM_READER_IPS = {
+    PressHeadReader: "127.0.0.1",
+    PressTailReader: "127.0.0.2",
+    Press1stReader: "127.0.0.3",
+}
+
+# 区域大小，字节
+SIM_AREA_SIZE = {
+    ('DB', 61): 64,
+    ('DB', 160): 64,
+    ('PE', 0): 1024,
+    ('PA', 0): 512,
+}
+
+SIM_SRV_AREA_MAP = {
+    'PE': snap7.type.SrvArea.PE,
+    'PA': snap7.type.SrvArea.PA,
+    'MK': snap7.type.SrvArea.MK,
+    'DB': snap7.type.SrvArea.DB,
+}
+
+# 数据类型 -> struct 格式 (大端序)
+SIM_STRUCT_MAP = {
+    'BYTE': '>B',
+    'INT': '>h',
+    'WORD': '>H',
+    'DINT': '>i',
+    'DWORD': '>I',
+    'REAL': '>f',
+}
+
+
+def use_simulator(port: int = SIM_TCP_PORT, reader_ips: typing.Optional[dict] = None):
+    """
+    将 PressHeadReader / PressTailReader / Press1stReader 指向模拟器
+    需要在创建 PressInfo / CameraCtrl 之前调用
+    """
+    for reader, ip in (reader_ips or SIM_READER_IPS).items():
+        reader.PLC_IP = ip
+        reader.PLC_PORT = port
+    _logger.info(f"[S7Simulator] readers redirected to simulator port[{port}]")
+
+
+class S7Simulator:
+    def __init__(self, host: str = "0.0.0.0", port: int = SIM_TCP_PORT):
+        """
+        基于 snap7 server 的 plc 模拟器，提供 DB61 / DB160 / PE538 / PA255
+        :param host: 监听地址，0.0.0.0 才能接受 127.0.0.x 上所有 reader 的连接
+        :param port:
+        """
+        self.host = host
+        self.port = port
+
+        self.server = snap7.server.Server(log=False)
+        # 注册区域，ctypes 缓冲区需要保持引用
+        self.areas: dict[tuple[str, int], ctypes.Array] = dict()
+        for (area, index), size in SIM_AREA_SIZE.items():
+            buffer = (ctypes.c_uint8 * size)()
+            self.server.register_area(SIM_SRV_AREA_MAP[area], index, buffer)
+            self.areas[(area, index)] = buffer
+
+        self.lock = threading.Lock()
+        # 变量当前值
+        self.values: dict[str, typing.Union[int, bool]] = dict()
+        # 事件实际写入时间 (event, time.time())，用于计算检测延时
+        self.applied: list[tuple[SimEvent, float]] = list()
+
+        self.play_thread: typing.Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        if self.host == "0.0.0.0":
+            self.server.start(tcp_port=self.port)
+        else:
+            self.server.start_to(self.host, tcp_port=self.port)
+        _logger.info(f"{self.identity} started on {self.host}:{self.port}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.play_thread is not None:
+            self.play_thread.join()
+        self.server.stop()
+        self.server.destroy()
+        _logger.info(f"{self.identity} stopped")
+
+    def __enter__(self) -> typing.Self:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.stop()
+        # 返回 False 以便异常继续抛出
+        return False
+
+    def set_tag(self, name: str, value: typing.Union[int, bool]):
+        """写入 SIM_TAGS 中的变量"""
+        cfg = SIM_TAGS[name]
+        area = cfg['area']
+        index = cfg.get('db_number', 0) if area == 'DB' else 0
+        srv_area = SIM_SRV_AREA_MAP[area]
+        buffer = self.areas[(area, index)]
+        start = cfg['start']
+
+        with self.lock:
+            self.server.lock_area(srv_area, index)
+            try:
+                if cfg['datatype'] == 'BOOL':
+                    mask = 1 << cfg.get('bit', 0)
+                    buffer[start] = (buffer[start] | mask) if value else (buffer[start] & ~mask & 0xFF)
+                else:
+                    data = struct.pack(SIM_STRUCT_MAP[cfg['datatype']], value)
+                    buffer[start: start + len(data)] = list(data)
+            finally:
+                self.server.unlock_area(srv_area, index)
+            self.values[name] = value
+        _logger.debug(f"{self.identity} set_tag({name}, {value})")
+
+    def apply(self, event: SimEvent):
+        self.set_tag(event.name, event.value)
+        self.applied.append((event, time.time()))
+
+    def play(self, timeline: Timeline, speed: float = 1.0, repeat: bool = False, block: bool = False):
+        """
+        回放时间线
+        :param timeline:
+        :param speed: 回放速度倍数
+        :param repeat: 是否循环回放
+        :param block: 是否阻塞到回放结束
+        :return:
+        """
+        self.stop_event.clear()
+        self.play_thread = threading.Thread(
+            target=self._play,
+            args=(timeline, speed, repeat),
+            name="S7SimulatorPlayer",
+            daemon=True,
+        )
+        self.play_thread.start()
+        if block:
+            self.play_thread.join()
+
+    def _play(self, timeline: Timeline, speed: float, repeat: bool):
+        while True:
+            start_t = time.perf_counter()
+            for event in timeline:
+                # 等待事件时间
+                wait = event.t / speed - (time.perf_counter() - start_t)
+                if wait > 0 and self.stop_event.wait(wait):
+                    return
+                if self.stop_event.is_set():
+                    return
+                self.apply(event)
+            if not repeat:
+                break
+        _logger.info(f"{self.identity} timeline played, {len(timeline)} events")
+
+    def wait_played(self, timeout: typing.Optional[float] = None):
+        if self.play_thread is not None:
+            self.play_thread.join(timeout)
+
+    @property
+    def identity(self):
+        return f"S7Simulator[{self.port}]"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="S7 PLC simulator")
+    parser.add_argument("--port", type=int, default=SIM_TCP_PORT)
+    parser.add_argument("--timeline", type=str, default=None, help="yaml 时间线文件")
+    parser.add_argument("--spm", type=float, default=15)
+    parser.add_argument("--strokes", type=int, default=100)
+    parser.add_argument("--program-id", type=int, default=1)
+    parser.add_argument("--repeat", action="store_true")
+    args = parser.parse_args()
+
+    if args.timeline:
+        sim_timeline = Timeline.load(args.timeline)
+    else:
+        sim_timeline = Timeline.stamping(spm=args.spm, strokes=args.strokes, program_id=args.program_id)
+
+    with S7Simulator(port=args.port) as simulator:
+        try:
+            simulator.play(sim_timeline, repeat=args.repeat, block=True)
+        except KeyboardInterrupt:
+            pass
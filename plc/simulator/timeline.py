@@ -0,0 +1,229 @@
+import time
+import typing
+import dataclasses
+import logging
+import yaml
+
+from ..press_1st_reader import Press1stReader
+from ..press_head_reader import PressHeadReader
+from ..press_tail_reader import PressTailReader
+
+_logger = logging.getLogger(__name__)
+
+
+'''
+    模拟器变量表，格式同 PLCOperator.multi_vars，地址与各 reader 一致
+        program_id      -> PressHeadReader  DB61.DBW2
+        part_counter    -> PressTailReader  DB160.DBD54
+        shuttle_s1/s2   -> PressTailReader  I538.1 / I538.2
+        running         -> Press1stReader   Q255.7
+'''
+SIM_TAGS = {
+    "program_id": {
+        'area': 'DB',
+        'db_number': 61,
+        'start': 2,
+        'amount': 1,
+        'datatype': 'WORD',
+    },
+    "part_counter": {
+        'area': 'DB',
+        'db_number': 160,
+        'start': 54,
+        'amount': 1,
+        'datatype': 'DWORD',
+    },
+    "shuttle_s1": {
+        'area': 'PE',
+        'db_number': 0,
+        'start': 538,
+        'bit': 1,
+        'amount': 1,
+        'datatype': 'BOOL',
+    },
+    "shuttle_s2": {
+        'area': 'PE',
+        'db_number': 0,
+        'start': 538,
+        'bit': 2,
+        'amount': 1,
+        'datatype': 'BOOL',
+    },
+    "running": {
+        'area': 'PA',
+        'db_number': 0,
+        'start': 255,
+        'bit': 7,
+        'amount': 1,
+        'datatype': 'BOOL',
+    },
+}
+
+# 变量所在的 plc，key 同 S7Simulator 的 SIM_READER_IPS
+SIM_TAG_READERS = {
+    "program_id": PressHeadReader,
+    "part_counter": PressTailReader,
+    "shuttle_s1": PressTailReader,
+    "shuttle_s2": PressTailReader,
+    "running": Press1stReader,
+}
+
+# 零件到达时 s1 -> s2 的间隔，秒
+SENSOR_GAP_S = 0.05
+# 传感器保持时间，秒
+SENSOR_HOLD_S = 0.3
+
+
+@dataclasses.dataclass(order=True)
+class SimEvent:
+    t: float            # 相对时间线起点，秒
+    name: str           # SIM_TAGS 中的变量名
+    value: typing.Union[int, bool]
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class Timeline:
+    def __init__(self, events: typing.Optional[typing.Iterable[SimEvent]] = None):
+        """
+        模拟器时间线，事件按时间排序
+        :param events:
+        """
+        self.events: list[SimEvent] = sorted(events or list())
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    @property
+    def duration(self) -> float:
+        return self.events[-1].t if self.events else 0.0
+
+    def add(self, t: float, name: str, value) -> typing.Self:
+        if name not in SIM_TAGS:
+            raise ValueError(f"tag[{name}] is illegal. only {list(SIM_TAGS.keys())} is defined.")
+        self.events.append(SimEvent(t=t, name=name, value=value))
+        self.events.sort()
+        return self
+
+    def merge(self, other: "Timeline") -> "Timeline":
+        return Timeline(self.events + other.events)
+
+    def shift(self, dt: float) -> "Timeline":
+        return Timeline(SimEvent(t=e.t + dt, name=e.name, value=e.value) for e in self.events)
+
+    def edges(self, name: str, value=True) -> list[float]:
+        """变量变为 value 的时间点，用于计算检测延时"""
+        return [e.t for e in self.events if e.name == name and e.value == value]
+
+    @classmethod
+    def stamping(
+            cls,
+            spm: float,
+            strokes: int,
+            program_id: typing.Optional[int] = None,
+            start_counter: int = 0,
+            start_delay: float = 1.0,
+            sensor_gap: float = SENSOR_GAP_S,
+            sensor_hold: float = SENSOR_HOLD_S,
+    ) -> "Timeline":
+        """
+        按冲次生成时间线：压机运行 -> 每个冲次零件经过 shuttle (s1、s2 上升沿, part counter + 1) -> 压机停止
+        :param spm: 冲次，strokes per minute
+        :param strokes: 冲次数量
+        :param program_id: 生产的零件号，None 则不写入
+        :param start_counter: part counter 初始值
+        :param start_delay: 第一个冲次前的等待时间，秒
+        :param sensor_gap: s1 -> s2 的间隔，秒
+        :param sensor_hold: 传感器保持时间，秒
+        :return:
+        """
+        period = 60 / spm
+        if sensor_gap + sensor_hold >= period:
+            raise ValueError(f"spm[{spm}] is too high for sensor gap[{sensor_gap}] and hold[{sensor_hold}]")
+
+        timeline = cls()
+        if program_id is not None:
+            timeline.add(0, "program_id", program_id)
+        timeline.add(0, "part_counter", start_counter)
+        timeline.add(0, "running", True)
+
+        for k in range(strokes):
+            t = start_delay + k * period
+            timeline.add(t, "shuttle_s1", True)
+            timeline.add(t, "part_counter", start_counter + k + 1)
+            timeline.add(t + sensor_gap, "shuttle_s2", True)
+            timeline.add(t + sensor_gap + sensor_hold, "shuttle_s1", False)
+            timeline.add(t + sensor_gap + sensor_hold, "shuttle_s2", False)
+
+        timeline.add(start_delay + strokes * period, "running", False)
+        return timeline
+
+    @classmethod
+    def program_changes(cls, changes: typing.Iterable[tuple[float, int]]) -> "Timeline":
+        """
+        零件号变化
+        :param changes: [(t, program_id), ...]
+        :return:
+        """
+        return cls(SimEvent(t=t, name="program_id", value=program_id) for t, program_id in changes)
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        """
+        从 yaml 文件读取时间线
+            events:
+              - {t: 0.0, name: running, value: true}
+              - {t: 1.0, name: shuttle_s1, value: true}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or dict()
+        timeline = cls()
+        for event in data.get("events", list()):
+            timeline.add(float(event["t"]), event["name"], event["value"])
+        return timeline
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump({"events": [e.to_dict() for e in self.events]}, f, sort_keys=False)
+
+    @classmethod
+    def record(cls, operators: dict, duration: float, interval: float = 0.01) -> "Timeline":
+        """
+        从真实 plc 录制时间线，记录 SIM_TAGS 中变量的变化
+            SIM_TAGS 分布在三台 plc 上，每个变量从 SIM_TAG_READERS 对应的 plc 读取，事件合并到同一时间线
+        :param operators: {reader 类: 已连接的 PLCOperator}，如 {PressHeadReader: PLCOperator(ip=PressHeadReader.PLC_IP), ...}
+        :param duration: 录制时长，秒
+        :param interval: 轮询间隔，秒
+        :return:
+        """
+        missing = {reader.__name__ for reader in SIM_TAG_READERS.values() if reader not in operators}
+        if missing:
+            raise ValueError(f"operators of {sorted(missing)} are required.")
+
+        # 每台 plc 只读取自己的变量
+        plans = list()
+        for reader, operator in operators.items():
+            tags = {name: tag for name, tag in SIM_TAGS.items() if SIM_TAG_READERS[name] is reader}
+            if tags:
+                plans.append((operator, operator.compile(tags)))
+
+        timeline = cls()
+        pre_values = dict()
+        start_t = time.perf_counter()
+        while time.perf_counter() - start_t < duration:
+            for operator, plan in plans:
+                values = operator.read_plan(plan)
+                # 读取完成的时间
+                t = round(time.perf_counter() - start_t, 4)
+                for name, value in values.items():
+                    if value is not None and pre_values.get(name) != value:
+                        timeline.events.append(SimEvent(t=t, name=name, value=value))
+                        pre_values[name] = value
+            time.sleep(interval)
+        timeline.events.sort()
+        _logger.info(f"[Timeline] recorded {len(timeline)} events from {len(plans)} plc in {duration}s")
+        return timeline
@@ -0,0 +1,66 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from plc import PressTailReader, PLCBackend
+from plc.simulator import S7Simulator, Timeline, use_simulator
+from plc.test.simulator_bench import percentile
+
+_logger = logging.getLogger(__name__)
+
+
+DURATION_S = 10
+SPM = 30
+# 并发读取的 reader 数量
+CONCURRENCY = (1, 4, 16)
+# executor 后端线程池大小，与 CameraCtrl 一致
+MAX_WORKERS = 50
+
+
+async def sample(reader: PressTailReader, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        start_t = time.perf_counter()
+        await reader.read_snapshot()
+        latencies.append((time.perf_counter() - start_t) * 1000)
+
+
+async def bench(backend: PLCBackend, concurrency: int, executor: ThreadPoolExecutor):
+    """同一个 PLC 上 concurrency 个连接并发读取 press tail snapshot"""
+    readers = [PressTailReader(executor=executor, backend=backend) for _ in range(concurrency)]
+    for reader in readers:
+        await reader.connect()
+
+    latencies = list()
+    deadline = time.perf_counter() + DURATION_S
+    try:
+        await asyncio.gather(*(sample(reader, deadline, latencies) for reader in readers))
+    finally:
+        for reader in readers:
+            await reader.disconnect()
+
+    print(
+        f"backend={backend:<8} concurrency={concurrency:<3} samples/s={len(latencies) / DURATION_S:8.1f} "
+        f"latency ms p50={percentile(latencies, 50):.3f} p95={percentile(latencies, 95):.3f} "
+        f"p99={percentile(latencies, 99):.3f}"
+    )
+
+
+async def main():
+    use_simulator()
+    # 覆盖整个测试时长
+    duration_s = len(CONCURRENCY) * len(PLCBackend) * DURATION_S
+    timeline = Timeline.stamping(spm=SPM, strokes=int(duration_s * SPM / 60) + 10, program_id=1)
+
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    with S7Simulator() as simulator:
+        simulator.play(timeline)
+        for concurrency in CONCURRENCY:
+            for backend in PLCBackend:
+                await bench(backend, concurrency, executor)
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main())
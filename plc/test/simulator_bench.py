@@ -0,0 +1,97 @@
+import time
+import asyncio
+import logging
+import statistics
+
+from plc import PressTailReader, PressHeadReader, PLCSessionManager
+from plc.simulator import S7Simulator, Timeline, use_simulator
+from press.shuttle import Shuttle
+
+_logger = logging.getLogger(__name__)
+
+
+SPM = 15
+STROKES = 20
+SPEED = 1.0
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def report(name: str, latencies_ms: list, reads: int, duration: float):
+    print(
+        f"{name}: n={len(latencies_ms)}, reads/s={reads / duration:.1f}, "
+        f"latency ms p50={percentile(latencies_ms, 50):.2f} p95={percentile(latencies_ms, 95):.2f} "
+        f"p99={percentile(latencies_ms, 99):.2f} max={max(latencies_ms, default=float('nan')):.2f} "
+        f"mean={statistics.fmean(latencies_ms) if latencies_ms else float('nan'):.2f}"
+    )
+
+
+async def bench_shuttle_detect(simulator: S7Simulator, sessions: PLCSessionManager, duration: float):
+    """模拟 CameraCtrl.shuttle_detect，统计 s2 上升沿 -> 检测到零件 的延时"""
+    session = sessions.async_session(ip=PressTailReader.PLC_IP, factory=lambda: PressTailReader(executor=None))
+    shuttle = Shuttle()
+    detected = list()
+    reads = 0
+    start_t = time.perf_counter()
+    while time.perf_counter() - start_t < duration:
+        snapshot = await session.read(lambda plc: plc.read_snapshot())
+        reads += 1
+        has_part, has_part_t = shuttle.check_part(snapshot.shuttle_s1, snapshot.shuttle_s2)
+        if has_part:
+            detected.append((snapshot.part_counter, time.time()))
+
+    # 按 part counter 对齐模拟器写入 s2 的时间
+    edges = [t for event, t in simulator.applied if event.name == "shuttle_s2" and event.value]
+    latencies = [(t - edges[counter - 1]) * 1000 for counter, t in detected if 0 < counter <= len(edges)]
+    report("shuttle detect", latencies, reads, duration)
+    print(f"shuttle detect: edges={len(edges)}, detected={len(detected)}")
+
+
+async def bench_program_id(simulator: S7Simulator, sessions: PLCSessionManager, duration: float):
+    """模拟 PressInfo.poll_program_id，统计 program id 变化 -> 检测到 的延时"""
+    session = sessions.async_session(ip=PressHeadReader.PLC_IP, factory=lambda: PressHeadReader(executor=None))
+    pre = None
+    detected = list()
+    reads = 0
+    start_t = time.perf_counter()
+    while time.perf_counter() - start_t < duration:
+        program_id = await session.read(lambda reader: reader.read_program_id())
+        reads += 1
+        if program_id != pre:
+            detected.append((program_id, time.time()))
+            pre = program_id
+        await asyncio.sleep(0.2)
+
+    changes = {event.value: t for event, t in simulator.applied if event.name == "program_id"}
+    latencies = [(t - changes[pid]) * 1000 for pid, t in detected[1:] if pid in changes]
+    report("program id", latencies, reads, duration)
+
+
+async def main():
+    use_simulator()
+    timeline = Timeline.stamping(spm=SPM, strokes=STROKES, program_id=1).merge(
+        Timeline.program_changes([(10.3, 2), (30.7, 3), (50.1, 4)])
+    )
+    duration = timeline.duration / SPEED + 1
+
+    with S7Simulator() as simulator:
+        sessions = PLCSessionManager()
+        simulator.play(timeline, speed=SPEED)
+        try:
+            await asyncio.gather(
+                bench_shuttle_detect(simulator, sessions, duration),
+                bench_program_id(simulator, sessions, duration),
+            )
+        finally:
+            await sessions.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main())
@@ -1,3 +1,4 @@
 from .press_info import PressInfo
 from .shuttle import Shuttle, DetectType
 from .part_counter import PartCounter
+from .shuttle_history import ShuttleHistory, ShuttleCycleStats
@@ -1,32 +1,50 @@
 import typing
 import asyncio
 import time
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 import logging
 
-from plc import Press1stReader, PressHeadReader
+from plc import Press1stReader, PressHeadReader, PLCSessionManager, PLCBackend, PLCSource, PLCTagSubscriber
 from redisDb import AsyncRedisDB
 from .press_running_status import PressRunningStatus, SIGNAL_DETECT_INTERVAL_S, RunningType
-from utils import async_run_in_executor
+import metrics
 
 _logger = logging.getLogger(__name__)
 
-# 间隔 1min 读取 program id
-SCHEDULER_READ_PROGRAM_ID_INTERVAL_MIN = 1
+# 间隔 0.2sec 轮询 program id
+READ_PROGRAM_ID_INTERVAL_SEC = 0.2
+# 间隔 60sec 记录 plc 会话统计
+LOG_PLC_SESSION_STATS_INTERVAL_SEC = 60
 # 间隔 4sec 读取 part counter
 SCHEDULER_READ_PART_COUNTER_INTERVAL_SEC = 4
-# 间隔 4sec 读取 running status
-SCHEDULER_READ_RUNNING_STATUS_INTERVAL_SEC = 4
+# 间隔 0.5sec 采样 running light
+SAMPLE_RUNNING_STATUS_INTERVAL_SEC = SIGNAL_DETECT_INTERVAL_S
+
+# plc 网关变量表中的 plc 名称
+GATEWAY_PRESS_HEAD = "press_head"
+GATEWAY_PRESS_1ST = "press_1st"
+# 超过该时间没有 plc 网关快照视为失联 (网关无变化时每秒重新发布)，毫秒
+GATEWAY_SNAPSHOT_STALE_MS = 3000
+# 网关失联日志的最小间隔，秒
+LOG_GATEWAY_STALE_INTERVAL_SEC = 10
 
 
 MAX_WORKERS = 10
 
 class PressInfo:
-    def __init__(self, press_line: str, redis_host: str, redis_port: int, redis_db: int, executor = None):
+    def __init__(
+            self,
+            press_line: str,
+            redis_host: str, redis_port: int, redis_db: int,
+            executor = None,
+            program_id_interval: float = READ_PROGRAM_ID_INTERVAL_SEC,
+            running_status_interval: float = SAMPLE_RUNNING_STATUS_INTERVAL_SEC,
+            plc_backend: str = PLCBackend.EXECUTOR,
+            plc_source: str = PLCSource.DIRECT,
+    ):
         # 冲压线名称
         self.press_line = press_line
 
@@ -43,21 +61,70 @@ class PressInfo:
         self.part_counter = None
         self.running_status = None
 
+        # program id 轮询间隔
+        self.program_id_interval = program_id_interval
+        # 上一次成功读取 program id 的时间
+        self._program_id_read_t: typing.Optional[float] = None
+        # 上一次成功读取时 press head 会话的连接次数，用于发现重连
+        self._program_id_connect_count: typing.Optional[int] = None
+        # 最近一次 program id 变化的检测延时（上限），毫秒
+        self.program_id_detect_latency_ms: typing.Optional[float] = None
+
+        # running light 采样间隔
+        self.running_status_interval = running_status_interval
+        # 当前滚动判定结果 RUNNING / STANDBY / STOPPED
+        self.running_type: typing.Optional[RunningType] = None
+
         # 执行器
         self.executor = executor or ThreadPoolExecutor(max_workers=MAX_WORKERS)
         # 标识是否是我们自己创建的 executor
         self._own_executor = executor is None
 
+        # plc 变量来源，gateway 模式下订阅 plc 网关，不连接 plc
+        self.plc_source = PLCSource.create(plc_source)
+        self.plc_tags: typing.Optional[PLCTagSubscriber] = None
+        # plc 网关快照过期的时间，monotonic，None 表示正常
+        self._gateway_stale_t: typing.Optional[float] = None
+        self._gateway_stale_log_t = 0.0
+        self.gateway_stale = metrics.gauge("press_info_gateway_stale", "plc gateway snapshot older than stale threshold", plc=GATEWAY_PRESS_1ST)
+
+        # plc 常驻会话，每个 plc 只保持一个连接，gateway 模式不创建
+        self.plc_sessions = PLCSessionManager()
+        self.press_head_session = None
+        self.press_1st_session = None
+        if self.plc_source is PLCSource.DIRECT:
+            self.press_head_session = self.plc_sessions.async_session(
+                ip=PressHeadReader.PLC_IP,
+                factory=lambda: PressHeadReader(executor=self.executor, backend=plc_backend),
+            )
+            self.press_1st_session = self.plc_sessions.sync_session(
+                ip=Press1stReader.PLC_IP,
+                factory=Press1stReader,
+            )
+
         # 定时器
         self.scheduler = AsyncIOScheduler()
 
         # 获取 loop
         self.loop = asyncio.get_running_loop()
 
+        self.tasks = list()
+
     @classmethod
-    async def create(cls, press_line, redis_host, redis_port, redis_db, executor: typing.Optional[ThreadPoolExecutor] = None) -> typing.Self:
+    async def create(
+            cls,
+            press_line, redis_host, redis_port, redis_db,
+            executor: typing.Optional[ThreadPoolExecutor] = None,
+            program_id_interval: float = READ_PROGRAM_ID_INTERVAL_SEC,
+            running_status_interval: float = SAMPLE_RUNNING_STATUS_INTERVAL_SEC,
+            plc_backend: str = PLCBackend.EXECUTOR,
+            plc_source: str = PLCSource.DIRECT,
+    ) -> typing.Self:
         # 实例化
-        press_info = cls(press_line, redis_host, redis_port, redis_db, executor)
+        press_info = cls(
+            press_line, redis_host, redis_port, redis_db, executor,
+            program_id_interval, running_status_interval, plc_backend, plc_source,
+        )
 
         # 连接 redis
         press_info.redis = await AsyncRedisDB.create(
@@ -67,36 +134,47 @@ class PressInfo:
             ping=True
         )
 
-        # scheduler 任务
-        # read_program_id
-        press_info.scheduler.add_job(
-            func=press_info.read_program_id,
-            trigger=IntervalTrigger(minutes=SCHEDULER_READ_PROGRAM_ID_INTERVAL_MIN),
-            name="read program id scheduler",
-            misfire_grace_time=2,
-            coalesce=True,
-            max_instances=1,
-            next_run_time=datetime.now(),
-        )
+        # 订阅 plc 网关
+        if press_info.plc_source is PLCSource.GATEWAY:
+            press_info.plc_tags = PLCTagSubscriber(
+                redis=press_info.redis,
+                press_line=press_info.press_line,
+                plcs=(GATEWAY_PRESS_HEAD, GATEWAY_PRESS_1ST),
+            )
 
-        # read_running_status
+        # scheduler 任务
+        # log_plc_session_stats
         press_info.scheduler.add_job(
-            func=press_info.read_running_status,
-            trigger=IntervalTrigger(seconds=SCHEDULER_READ_RUNNING_STATUS_INTERVAL_SEC),
-            name="read running status scheduler",
+            func=press_info.log_plc_session_stats,
+            trigger=IntervalTrigger(seconds=LOG_PLC_SESSION_STATS_INTERVAL_SEC),
+            name="log plc session stats scheduler",
             misfire_grace_time=2,
             coalesce=True,
             max_instances=1,
-            next_run_time=datetime.now(),
         )
 
         return press_info
 
     def work(self):
         self.scheduler.start()
+        # 协程任务
+        if self.plc_tags is not None:
+            self.plc_tags.start()
+            self.tasks = [asyncio.create_task(self.subscribe_program_id())]
+        else:
+            self.tasks = [asyncio.create_task(self.poll_program_id())]
+        self.tasks.append(asyncio.create_task(self.sample_running_status()))
         _logger.info(f"{self.identity} work() started")
 
     async def cleanup(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        if self.plc_tags is not None:
+            await self.plc_tags.close()
+        await self.plc_sessions.close()
+
         # wait=False → 立即返回，不阻塞主线程
         # cancel_futures=True → 尝试取消线程池里还没开始执行的任务
         if self._own_executor:
@@ -117,55 +195,155 @@ class PressInfo:
         # 返回 False 以便异常继续抛出
         return False
 
-    async def read_program_id(self):
-        try:
-            # 从 plc 中读取 program_id
-            async with PressHeadReader(executor=self.executor) as reader:
-                program_id = await reader.read_program_id()
-
-            # program id 变化 -> 写入 redis
-            if program_id != self.program_id:
-                await self.redis.set_program_id(program_id=program_id, press_line=self.press_line)
-                _logger.info(f"{self.identity} program id={program_id}")
-                self.program_id = program_id
-
-        except Exception as err:
-            _logger.exception(f"{self.identity} read program id error: {err}")
+    async def poll_program_id(self):
+        """常驻 plc 连接，按 program_id_interval 轮询 program id"""
+        while True:
+            start_t = time.perf_counter()
+            try:
+                await self.read_program_id()
+            except Exception as err:
+                # 会话自动重连，重连前不计算检测延时
+                self._program_id_read_t = None
+                self.program_id_detect_latency_ms = None
+                _logger.exception(f"{self.identity} read program id error: {err}")
+            # 固定轮询周期
+            elapsed = time.perf_counter() - start_t
+            await asyncio.sleep(max(0.0, self.program_id_interval - elapsed))
 
-    async def read_running_status(self):
+    async def read_program_id(self):
+        # 从 plc 中读取 program_id
+        program_id = await self.press_head_session.read(lambda reader: reader.read_program_id())
+        read_t = time.perf_counter()
+
+        # 会话重连后，上一次读取时间不再是变化发生时间的下界
+        connect_count = self.press_head_session.stats.connect_count
+        if connect_count != self._program_id_connect_count:
+            self._program_id_read_t = None
+
+        # 检测延时上限：变化发生在上一次读取和本次读取之间，无法确定时为 None
+        if program_id != self.program_id:
+            if self.program_id is not None and self._program_id_read_t is not None:
+                self.program_id_detect_latency_ms = (read_t - self._program_id_read_t) * 1000
+            else:
+                self.program_id_detect_latency_ms = None
+        await self.on_program_id(program_id)
+
+        self._program_id_read_t = read_t
+        self._program_id_connect_count = connect_count
+
+    async def subscribe_program_id(self):
+        """gateway 模式，program id 由 plc 网关按变量表中的间隔轮询"""
+        queue = self.plc_tags.subscribe(GATEWAY_PRESS_HEAD)
         try:
-            # 读取 running status
-            running_status = await self._read_running_status()
-
-            # running_status 变化 -> 接入redis
-            if self.running_status is None or running_status.is_running() != self.running_status.is_running():
-                await self.redis.set_running_status(
-                    running_status=running_status.is_running(),
-                    press_line=self.press_line
-                )
-                _logger.info(f"{self.identity} running status={running_status}")
-                self.running_status = running_status
-
-        except Exception as err:
-            _logger.exception(f"{self.identity} read running status error: {err}")
-
-    @async_run_in_executor
-    def _read_running_status(self) -> RunningType:
-        """读取 press_running"""
-        with Press1stReader() as reader:
-            gen = self.press_running_status.detect_in_loop()
-            # 初始化 generator，进入 yield 状态
-            next(gen)
             while True:
-                # 读取灯信号
-                light = reader.read_running_light()
+                snapshot = await queue.get()
                 try:
-                    gen.send(light)
-                except StopIteration as err:
-                    running = err.value
-                    break
-                time.sleep(SIGNAL_DETECT_INTERVAL_S)
-        return running
+                    program_id = snapshot.values.get("program_id")
+                    if program_id is not None:
+                        # 检测延时：plc 网关扫描到发布到本进程的时间
+                        self.program_id_detect_latency_ms = max(0, int(time.time() * 1000) - snapshot.t)
+                        await self.on_program_id(int(program_id))
+                except Exception as err:
+                    self.program_id_detect_latency_ms = None
+                    _logger.exception(f"{self.identity} handle program id error: {err}")
+        finally:
+            self.plc_tags.unsubscribe(GATEWAY_PRESS_HEAD, queue)
+
+    async def on_program_id(self, program_id: int):
+        # program id 变化 -> 写入 redis
+        if program_id != self.program_id:
+            await self.redis.set_program_id(
+                program_id=program_id,
+                press_line=self.press_line,
+                detect_latency_ms=self.program_id_detect_latency_ms,
+            )
+            _logger.info(f"{self.identity} program id={program_id}, detect latency<={self.program_id_detect_latency_ms}ms")
+            self.program_id = program_id
+
+    def log_plc_session_stats(self):
+        for ip, stats in self.plc_sessions.stats().items():
+            _logger.info(f"{self.identity} plc[{ip}] session stats={stats}")
+
+    async def sample_running_status(self):
+        """常驻 plc 连接，按 running_status_interval 持续采样 running light"""
+        while True:
+            start_t = time.perf_counter()
+            try:
+                await self.read_running_status()
+            except Exception as err:
+                _logger.exception(f"{self.identity} read running status error: {err}")
+            # 固定采样周期
+            elapsed = time.perf_counter() - start_t
+            await asyncio.sleep(max(0.0, self.running_status_interval - elapsed))
+
+    async def read_running_light(self) -> typing.Optional[bool]:
+        # gateway 模式，使用 plc 网关发布的最新值，按本进程的采样周期判定，快照过期时返回 None
+        if self.plc_tags is not None:
+            return self.plc_tags.get(GATEWAY_PRESS_1ST, "running", max_age_ms=GATEWAY_SNAPSHOT_STALE_MS)
+        # 读取灯信号，只占用线程池一次读取的时间
+        return await self.loop.run_in_executor(
+            self.executor,
+            self.press_1st_session.read,
+            lambda reader: reader.read_running_light(),
+        )
+
+    async def read_running_status(self):
+        light = await self.read_running_light()
+        if self.plc_tags is not None:
+            await self.check_gateway_stale(stale=light is None)
+        if light is None:
+            return
+        # 滚动判定
+        running_type = self.press_running_status.update(light)
+        if running_type is None or running_type == self.running_type:
+            return
+
+        _logger.info(f"{self.identity} running type {self.running_type} -> {running_type}")
+        self.running_type = running_type
+
+        # running_type 变化 -> 写入 redis，STANDBY <-> STOPPED 也写入，running_status 不变
+        # 消费者按 running_status 变化决定是否响应 (CameraCtrl 开关灯)
+        await self.redis.set_running_status(
+            running_status=running_type.is_running(),
+            press_line=self.press_line,
+            running_type=running_type,
+        )
+        if self.running_status is None or running_type.is_running() != self.running_status.is_running():
+            _logger.info(f"{self.identity} running status={running_type}")
+        self.running_status = running_type
+
+    async def check_gateway_stale(self, stale: bool):
+        """
+        gateway 模式，网关失联或读取 plc 失败时 running light 未知
+            视为停机并写入 redis，CameraCtrl 停止触发，light 按停机时间关闭；恢复后由滚动判定重新写入
+        """
+        now = time.monotonic()
+        if not stale:
+            if self._gateway_stale_t is not None:
+                _logger.warning(f"{self.identity} plc gateway[{GATEWAY_PRESS_1ST}] recovered after {now - self._gateway_stale_t:.1f}s")
+                self._gateway_stale_t = None
+                self.gateway_stale.set(0)
+            return
+
+        if self._gateway_stale_t is None:
+            self._gateway_stale_t = now
+            self.gateway_stale.set(1)
+        if now - self._gateway_stale_log_t >= LOG_GATEWAY_STALE_INTERVAL_SEC:
+            self._gateway_stale_log_t = now
+            _logger.error(
+                f"{self.identity} plc gateway[{GATEWAY_PRESS_1ST}] snapshot stale for {now - self._gateway_stale_t:.1f}s, "
+                f"age={self.plc_tags.age_ms(GATEWAY_PRESS_1ST)}ms, running status unknown"
+            )
+
+        if self.running_status is not None and self.running_status.is_running():
+            await self.redis.set_running_status(
+                running_status=False,
+                press_line=self.press_line,
+                running_type=RunningType.STOPPED,
+            )
+            _logger.warning(f"{self.identity} running status={RunningType.STOPPED} (plc gateway stale)")
+            self.running_status = RunningType.STOPPED
+            self.running_type = RunningType.STOPPED
 
     @property
     def identity(self):
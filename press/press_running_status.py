@@ -31,6 +31,8 @@ class PressRunningStatus:
         # 队列
         self.queue = deque(maxlen=QUEUE_MAX_LEN)
         self.lock = Lock()
+        # 滚动判定结果，每次 update() 更新
+        self.status: typing.Optional[RunningType] = None
 
     def detect_in_loop(self):
         t = 0
@@ -59,6 +61,20 @@ class PressRunningStatus:
         else:
             return RunningType.STANDBY
 
+    def update(self, light_signal: bool) -> typing.Optional[RunningType]:
+        """
+        放入一次采样，并根据最近 SIGNAL_DETECT_TIMES 次采样滚动判定
+        :param light_signal:
+        :return: 判定结果，采样不足时返回 None
+        """
+        self.push(light_signal)
+        with self.lock:
+            if len(self.queue) < SIGNAL_DETECT_TIMES:
+                return None
+            self.status = self.detect()
+        _logger.debug(f"{self.identity} get[{light_signal}], queue={self.__repr__()}, status={self.status}")
+        return self.status
+
     def push(self, light_signal: bool):
         now = time.time()
         with self.lock:
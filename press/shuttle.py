@@ -1,7 +1,10 @@
 import time
+import typing
 from enum import IntEnum
 
-# 最小检测时间间隔，滤波防抖
+from .shuttle_history import ShuttleHistory, ShuttleCycleStats
+
+# 最小检测时间间隔，滤波防抖，节拍不足时使用，之后根据观测到的节拍自适应
 HAS_PART_THRESHOLD_MS = 1000
 
 
@@ -29,10 +32,20 @@ class Shuttle:
 
         self._interval_between_parts = 0
 
-    def check_part(self, s1: bool, s2: bool):
-        t = int(time.time() * 1000)
+        # 传感器采样历史，用于节拍统计和自适应防抖
+        self.history = ShuttleHistory()
+        self.debounce_ms: float = HAS_PART_THRESHOLD_MS
+
+    def check_part(self, s1: bool, s2: bool, t: typing.Optional[int] = None):
+        """
+        :param s1:
+        :param s2:
+        :param t: 传感器读取时间戳，毫秒，默认为当前时间
+        """
+        t = int(time.time() * 1000) if t is None else t
+        self.history.push(s1, s2, t)
         # 滤波
-        if t - self.pre_has_part_t <= HAS_PART_THRESHOLD_MS:
+        if t - self.pre_has_part_t <= self.debounce_ms:
             return False, t
 
         # 无零件转变为有零件
@@ -53,12 +66,22 @@ class Shuttle:
         if has_part:
             self._interval_between_parts = t - self.pre_has_part_t
             self.pre_read_t = self.pre_has_part_t = t
+            # 每个零件更新一次防抖时间
+            self.debounce_ms = self.history.debounce_ms(default_ms=HAS_PART_THRESHOLD_MS, detect_type=self.detect_type)
         else:
             self.pre_read_t = t
 
     def set_detect_type(self, detect_type: int):
         self.detect_type = DetectType.create(detect_type)
 
+    def stats(self) -> ShuttleCycleStats:
+        """滚动冲次、节拍百分位 和 当前防抖时间"""
+        return self.history.stats(debounce_ms=self.debounce_ms, detect_type=self.detect_type)
+
+    def recent_spm(self) -> typing.Optional[float]:
+        """最近节拍中位数对应的冲次，用于触发延时"""
+        return self.history.recent_spm(detect_type=self.detect_type)
+
     @property
     def interval(self) -> float:
         return self._interval_between_parts / 1000
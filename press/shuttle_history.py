@@ -0,0 +1,172 @@
+import typing
+import dataclasses
+import numpy as np
+
+
+# 环形缓冲区容量，只保存传感器变化的采样
+HISTORY_CAPACITY = 4096
+# 滚动统计窗口，毫秒
+STATS_WINDOW_MS = 60_000
+# 小于该间隔的相邻上升沿视为抖动，毫秒
+EDGE_MIN_GAP_MS = 200
+# 自适应防抖 = 节拍中位数 * DEBOUNCE_CYCLE_RATIO，限制在 [DEBOUNCE_MIN_MS, DEBOUNCE_MAX_MS]
+DEBOUNCE_CYCLE_RATIO = 0.5
+DEBOUNCE_MIN_MS = 300
+DEBOUNCE_MAX_MS = 3000
+# 计算自适应防抖所需的最少节拍数 和 使用的最近节拍数
+DEBOUNCE_MIN_CYCLES = 5
+DEBOUNCE_RECENT_CYCLES = 50
+# 当前冲次使用的最近节拍数，取中位数，不受窗口内停机影响
+RECENT_SPM_CYCLES = 5
+
+# 采样
+SAMPLE_DTYPE = np.dtype([("t", "i8"), ("s1", "?"), ("s2", "?")])
+
+
+@dataclasses.dataclass
+class ShuttleCycleStats:
+    """shuttle 节拍统计"""
+    spm: typing.Optional[float]             # 滚动窗口内的冲次，次/分钟
+    parts: int                              # 滚动窗口内的零件数
+    cycle_p50_ms: typing.Optional[float]    # 节拍百分位，毫秒
+    cycle_p90_ms: typing.Optional[float]
+    cycle_p99_ms: typing.Optional[float]
+    debounce_ms: float                      # 当前防抖时间，毫秒
+    t: int                                  # 统计时间戳，毫秒
+
+    def to_dict(self) -> dict:
+        return {k: ("null" if v is None else round(v, 1) if isinstance(v, float) else v) for k, v in dataclasses.asdict(self).items()}
+
+
+class ShuttleHistory:
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        """
+        shuttle 传感器采样的环形缓冲区
+            只在 s1 / s2 变化时写入，上升沿可由缓冲区完整还原，容量覆盖更长的时间
+        :param capacity:
+        """
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        # 下一个写入位置 和 已写入数量
+        self.index = 0
+        self.count = 0
+        # 最近一次采样时间
+        self.last_t: typing.Optional[int] = None
+
+    def __len__(self):
+        return self.count
+
+    def push(self, s1: bool, s2: bool, t: int):
+        """写入一次采样，与上一次相同时只更新 last_t"""
+        self.last_t = t
+        if self.count:
+            last = self.buffer[(self.index - 1) % self.capacity]
+            if last["s1"] == s1 and last["s2"] == s2:
+                return
+        self.buffer[self.index] = (t, s1, s2)
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def samples(self) -> np.ndarray:
+        """按时间顺序返回采样 (拷贝)"""
+        if self.count < self.capacity:
+            return self.buffer[:self.count].copy()
+        return np.roll(self.buffer, -self.index)
+
+    def edges(self, detect_type: int = 0, min_gap_ms: int = EDGE_MIN_GAP_MS) -> np.ndarray:
+        """
+        向量化提取零件信号的上升沿
+        :param detect_type: DetectType, 0 -> s1 and s2, 1 -> s1, 2 -> s2
+        :param min_gap_ms: 与前一个上升沿间隔小于该值的视为抖动
+        :return: 上升沿时间戳，毫秒
+        """
+        samples = self.samples()
+        if len(samples) < 2:
+            return np.empty(0, dtype=np.int64)
+
+        if detect_type == 1:
+            signal = samples["s1"]
+        elif detect_type == 2:
+            signal = samples["s2"]
+        else:
+            signal = samples["s1"] & samples["s2"]
+
+        rising = signal[1:] & ~signal[:-1]
+        edges = samples["t"][1:][rising]
+        if min_gap_ms and len(edges) > 1:
+            gaps = np.diff(edges, prepend=edges[0] - min_gap_ms)
+            edges = edges[gaps >= min_gap_ms]
+        return edges
+
+    def intervals(self, detect_type: int = 0, window_ms: typing.Optional[int] = STATS_WINDOW_MS) -> np.ndarray:
+        """窗口内相邻零件的间隔，毫秒"""
+        edges = self._window(self.edges(detect_type), window_ms)
+        return np.diff(edges)
+
+    def spm(self, detect_type: int = 0, window_ms: int = STATS_WINDOW_MS) -> typing.Optional[float]:
+        """
+        滚动冲次，次/分钟
+        以窗口内第一个和最后一个上升沿之间的时间计算，零件不足 2 个时返回 None
+        """
+        return self._spm(self._window(self.edges(detect_type), window_ms))
+
+    def recent_spm(self, detect_type: int = 0, cycles: int = RECENT_SPM_CYCLES) -> typing.Optional[float]:
+        """
+        当前冲次，次/分钟
+        以最近 cycles 个节拍的中位数计算，窗口内的停机不会拉低结果，节拍不足时返回 None
+        """
+        intervals = self.intervals(detect_type, window_ms=None)[-cycles:]
+        if len(intervals) < cycles:
+            return None
+        median = float(np.median(intervals))
+        return 60_000 / median if median > 0 else None
+
+    def interval_percentiles(
+            self,
+            q: typing.Sequence[float] = (50, 90, 99),
+            detect_type: int = 0,
+            window_ms: int = STATS_WINDOW_MS,
+    ) -> typing.Optional[np.ndarray]:
+        """窗口内节拍的百分位，毫秒，没有节拍时返回 None"""
+        intervals = self.intervals(detect_type, window_ms)
+        if not len(intervals):
+            return None
+        return np.percentile(intervals, q)
+
+    def debounce_ms(self, default_ms: float, detect_type: int = 0) -> float:
+        """
+        根据观测到的节拍自适应防抖时间
+        :param default_ms: 节拍不足 DEBOUNCE_MIN_CYCLES 时使用
+        :param detect_type:
+        :return: 毫秒
+        """
+        intervals = self.intervals(detect_type, window_ms=None)[-DEBOUNCE_RECENT_CYCLES:]
+        if len(intervals) < DEBOUNCE_MIN_CYCLES:
+            return default_ms
+        debounce = float(np.median(intervals)) * DEBOUNCE_CYCLE_RATIO
+        return float(np.clip(debounce, DEBOUNCE_MIN_MS, DEBOUNCE_MAX_MS))
+
+    def stats(self, debounce_ms: float, detect_type: int = 0, window_ms: int = STATS_WINDOW_MS) -> ShuttleCycleStats:
+        edges = self._window(self.edges(detect_type), window_ms)
+        intervals = np.diff(edges)
+        percentiles = np.percentile(intervals, (50, 90, 99)).tolist() if len(intervals) else [None] * 3
+        return ShuttleCycleStats(
+            spm=self._spm(edges),
+            parts=len(edges),
+            cycle_p50_ms=percentiles[0],
+            cycle_p90_ms=percentiles[1],
+            cycle_p99_ms=percentiles[2],
+            debounce_ms=float(debounce_ms),
+            t=self.last_t or 0,
+        )
+
+    @staticmethod
+    def _spm(edges: np.ndarray) -> typing.Optional[float]:
+        if len(edges) < 2:
+            return None
+        return (len(edges) - 1) * 60_000 / float(edges[-1] - edges[0])
+
+    def _window(self, edges: np.ndarray, window_ms: typing.Optional[int]) -> np.ndarray:
+        if window_ms is None or self.last_t is None:
+            return edges
+        return edges[edges >= self.last_t - window_ms]
@@ -0,0 +1,3 @@
+from .process_spec import SupervisorSpec, ProcessSpec, ReadinessSpec, BackoffPolicy, RestartPolicy
+from .supervised_process import SupervisedProcess
+from .supervisor import Supervisor
@@ -0,0 +1,149 @@
+import os
+import yaml
+import typing
+import dataclasses
+from enum import StrEnum
+
+
+# 就绪检查默认超时，秒
+DEFAULT_READY_TIMEOUT_SEC = 60
+# 停止进程时等待退出的时间，超时后强制结束进程树，秒
+DEFAULT_STOP_TIMEOUT_SEC = 10
+# 采集进程资源占用的间隔，秒
+DEFAULT_STATS_INTERVAL_SEC = 5
+
+
+class RestartPolicy(StrEnum):
+    ALWAYS = "always"           # 任何退出都重启
+    ON_FAILURE = "on-failure"   # 返回码非 0 或就绪超时时重启
+    NEVER = "never"
+
+
+@dataclasses.dataclass
+class ReadinessSpec:
+    """
+    就绪检查，满足全部配置的条件即就绪
+        metrics:    进程名称，支持通配符，MetricsPublisher 在进程启动后发布过快照即视为就绪
+        min_count:  匹配 metrics 的快照数量，例如所有相机子进程
+        tcp:        host:port 可以连接
+        timeout:    超时视为启动失败，秒
+    """
+    metrics: typing.Optional[str] = None
+    min_count: int = 1
+    tcp: typing.Optional[str] = None
+    timeout: float = DEFAULT_READY_TIMEOUT_SEC
+
+    @property
+    def tcp_address(self) -> typing.Optional[tuple[str, int]]:
+        if not self.tcp:
+            return None
+        host, _, port = self.tcp.rpartition(":")
+        return host or "127.0.0.1", int(port)
+
+
+@dataclasses.dataclass
+class BackoffPolicy:
+    """重启退避：initial * factor^n，不超过 max；稳定运行 reset_after 秒后重置"""
+    initial: float = 1
+    max: float = 60
+    factor: float = 2
+    reset_after: float = 60
+
+    def next_delay(self, previous: typing.Optional[float], uptime: float) -> float:
+        if previous is None or uptime >= self.reset_after:
+            return self.initial
+        return min(self.max, previous * self.factor)
+
+
+@dataclasses.dataclass
+class ProcessSpec:
+    name: str
+    script: str
+    args: list[str] = dataclasses.field(default_factory=list)
+    depends_on: list[str] = dataclasses.field(default_factory=list)
+    ready: typing.Optional[ReadinessSpec] = None
+    restart: RestartPolicy = RestartPolicy.ALWAYS
+    enabled: bool = True
+
+
+@dataclasses.dataclass
+class SupervisorSpec:
+    processes: dict[str, ProcessSpec]
+    pythonpath: list[str] = dataclasses.field(default_factory=list)
+    backoff: BackoffPolicy = dataclasses.field(default_factory=BackoffPolicy)
+    stop_timeout: float = DEFAULT_STOP_TIMEOUT_SEC
+    stats_interval: float = DEFAULT_STATS_INTERVAL_SEC
+
+    @classmethod
+    def load(cls, path: str) -> typing.Self:
+        """
+        加载进程监管配置
+        :param path: YAML 文件路径
+        :return:
+        :raises FileNotFoundError, ValueError
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"supervisor yaml file not found: {path}")
+
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or dict()
+
+        processes = dict()
+        for name, cfg in (config.get("processes") or dict()).items():
+            if "script" not in cfg:
+                raise ValueError(f"process[{name}] script is not defined")
+            ready = cfg.get("ready")
+            try:
+                restart = RestartPolicy(cfg.get("restart", RestartPolicy.ALWAYS))
+            except ValueError:
+                raise ValueError(f"process[{name}] has illegal restart policy[{cfg.get('restart')}]")
+            processes[name] = ProcessSpec(
+                name=name,
+                script=cfg["script"],
+                args=[str(arg) for arg in cfg.get("args") or list()],
+                depends_on=list(cfg.get("depends_on") or list()),
+                ready=ReadinessSpec(**ready) if ready else None,
+                restart=restart,
+                enabled=bool(cfg.get("enabled", True)),
+            )
+
+        spec = cls(
+            processes=processes,
+            pythonpath=list(config.get("pythonpath") or list()),
+            backoff=BackoffPolicy(**(config.get("backoff") or dict())),
+            stop_timeout=float(config.get("stop_timeout", DEFAULT_STOP_TIMEOUT_SEC)),
+            stats_interval=float(config.get("stats_interval", DEFAULT_STATS_INTERVAL_SEC)),
+        )
+        # 检查依赖
+        spec.ordered()
+        return spec
+
+    def enabled(self) -> list[ProcessSpec]:
+        return [p for p in self.ordered() if p.enabled]
+
+    def ordered(self) -> list[ProcessSpec]:
+        """
+        按依赖排序，依赖在前
+        :raises ValueError: 未知依赖或循环依赖
+        """
+        ordered: list[ProcessSpec] = list()
+        visiting: set[str] = set()
+        visited: set[str] = set()
+
+        def visit(name: str, path: tuple):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"circular process dependency: {' -> '.join((*path, name))}")
+            visiting.add(name)
+            for dep in self.processes[name].depends_on:
+                if dep not in self.processes:
+                    raise ValueError(f"process[{name}] depends on unknown process[{dep}]")
+                visit(dep, (*path, name))
+            visiting.discard(name)
+            visited.add(name)
+            ordered.append(self.processes[name])
+
+        for name in self.processes:
+            visit(name, tuple())
+        return ordered
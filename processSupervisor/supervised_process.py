@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import signal
+import typing
+import asyncio
+import subprocess
+import logging
+import psutil
+
+from .process_spec import ProcessSpec
+import metrics
+import utils
+
+_logger = logging.getLogger(__name__)
+
+
+class SupervisedProcess:
+    def __init__(self, spec: ProcessSpec, root_dir: str, pythonpath: typing.Sequence[str] = ()):
+        """
+        一个被监管的 python 脚本进程
+        :param spec:
+        :param root_dir: 项目根目录，脚本路径相对于此目录，并加入 PYTHONPATH
+        :param pythonpath: 额外的 PYTHONPATH，例如 hikrobot_camera 项目根
+        """
+        self.spec = spec
+        self.root_dir = root_dir
+        self.pythonpath = list(pythonpath)
+
+        self.process: typing.Optional[asyncio.subprocess.Process] = None
+        self.started_t: typing.Optional[float] = None
+        # 就绪状态，依赖它的进程等待此事件
+        self.ready = asyncio.Event()
+        # 本次启动的重启退避时间
+        self.backoff: typing.Optional[float] = None
+        # psutil 进程缓存，cpu_percent 需要同一对象两次采样
+        self._ps_cache: dict[int, psutil.Process] = dict()
+
+        # 指标
+        self.up = metrics.gauge("supervised_process_up", "process is running", process=spec.name)
+        self.is_ready = metrics.gauge("supervised_process_ready", "process passed readiness check", process=spec.name)
+        self.restarts_total = metrics.counter("supervised_process_restarts_total", "process restarts", process=spec.name)
+        self.cpu_percent = metrics.gauge("supervised_process_cpu_percent", "cpu percent of process tree", process=spec.name)
+        self.rss_bytes = metrics.gauge("supervised_process_rss_bytes", "rss of process tree", process=spec.name)
+        self.threads = metrics.gauge("supervised_process_threads", "threads of process tree", process=spec.name)
+        self.children = metrics.gauge("supervised_process_children", "child processes", process=spec.name)
+        self.uptime_seconds = metrics.gauge("supervised_process_uptime_seconds", "seconds since start", process=spec.name)
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def pid(self) -> typing.Optional[int]:
+        return self.process.pid if self.process is not None else None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    @property
+    def uptime(self) -> float:
+        return time.time() - self.started_t if self.started_t is not None else 0.0
+
+    def _env(self) -> dict:
+        env = os.environ.copy()
+        # PYTHONPATH 顺序：项目根 -> 额外路径 -> 原有
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [self.root_dir, *self.pythonpath, env.get("PYTHONPATH")]))
+        env["PYTHONUNBUFFERED"] = "1"
+        return env
+
+    async def start(self):
+        script_path = os.path.join(self.root_dir, self.spec.script)
+        if not os.path.isfile(script_path):
+            raise FileNotFoundError(f"script not found: {script_path}")
+
+        kwargs = dict()
+        if utils.is_win():
+            # 独立进程组，才能单独发送 CTRL_BREAK_EVENT
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+
+        self.ready.clear()
+        self.is_ready.set(0)
+        self._ps_cache.clear()
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, script_path, *self.spec.args,
+            cwd=self.root_dir,
+            env=self._env(),
+            **kwargs,
+        )
+        self.started_t = time.time()
+        self.up.set(1)
+        _logger.info(f"{self.identity} started, pid={self.pid}")
+
+    async def wait(self) -> int:
+        returncode = await self.process.wait()
+        self.up.set(0)
+        self.is_ready.set(0)
+        self.ready.clear()
+        return returncode
+
+    def set_ready(self):
+        self.ready.set()
+        self.is_ready.set(1)
+        _logger.info(f"{self.identity} ready in {self.uptime:.1f}s")
+
+    async def stop(self, timeout: float):
+        """先请求退出，超时后结束整个进程树"""
+        if not self.running:
+            return
+        try:
+            if utils.is_win():
+                self.process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                self.process.send_signal(signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=timeout)
+            _logger.info(f"{self.identity} stopped, returncode={self.process.returncode}")
+        except asyncio.TimeoutError:
+            _logger.warning(f"{self.identity} stop timeout, kill process tree")
+            self.kill_tree()
+            await self.process.wait()
+        finally:
+            self.up.set(0)
+            self.is_ready.set(0)
+
+    def kill_tree(self):
+        try:
+            parent = psutil.Process(self.pid)
+            processes = [*parent.children(recursive=True), parent]
+        except psutil.NoSuchProcess:
+            return
+        for p in processes:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+        psutil.wait_procs(processes, timeout=3)
+
+    def collect_stats(self) -> typing.Optional[dict]:
+        """采集进程树的 cpu / rss / 线程数，并更新指标"""
+        if not self.running:
+            return None
+        try:
+            parent = psutil.Process(self.pid)
+            tree = [parent, *parent.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return None
+
+        cpu, rss, threads = 0.0, 0, 0
+        alive = dict()
+        for p in tree:
+            p = self._ps_cache.get(p.pid, p)
+            try:
+                with p.oneshot():
+                    cpu += p.cpu_percent(None)
+                    rss += p.memory_info().rss
+                    threads += p.num_threads()
+                alive[p.pid] = p
+            except psutil.NoSuchProcess:
+                continue
+        self._ps_cache = alive
+
+        stats = {
+            "pid": self.pid,
+            "cpu_percent": round(cpu, 1),
+            "rss_bytes": rss,
+            "threads": threads,
+            "children": len(tree) - 1,
+            "uptime_seconds": round(self.uptime, 1),
+        }
+        self.cpu_percent.set(stats["cpu_percent"])
+        self.rss_bytes.set(rss)
+        self.threads.set(threads)
+        self.children.set(stats["children"])
+        self.uptime_seconds.set(stats["uptime_seconds"])
+        return stats
+
+    @property
+    def identity(self):
+        return f"SupervisedProcess[{self.name}]"
@@ -0,0 +1,188 @@
+import time
+import typing
+import asyncio
+import fnmatch
+import logging
+
+from .process_spec import SupervisorSpec, RestartPolicy
+from .supervised_process import SupervisedProcess
+
+_logger = logging.getLogger(__name__)
+
+
+# 就绪检查的轮询间隔，秒
+READY_POLL_INTERVAL_SEC = 0.5
+# tcp 就绪检查的连接超时，秒
+TCP_CONNECT_TIMEOUT_SEC = 1
+# 记录进程资源占用的间隔，秒
+LOG_STATS_INTERVAL_SEC = 60
+
+
+class Supervisor:
+    def __init__(
+            self,
+            spec: SupervisorSpec,
+            redis,
+            press_line: str,
+            root_dir: str,
+            stop_event: typing.Optional[asyncio.Event] = None,
+    ):
+        """
+        按依赖顺序启动进程，依赖就绪后再启动下游进程；进程退出后按退避时间重启；定时采集资源占用到指标
+        :param spec:
+        :param redis: AsyncRedisDB，用于 metrics 就绪检查
+        :param press_line:
+        :param root_dir: 项目根目录
+        :param stop_event:
+        """
+        self.spec = spec
+        self.redis = redis
+        self.press_line = press_line
+        self.stop_event = stop_event or asyncio.Event()
+
+        self.processes: dict[str, SupervisedProcess] = {
+            p.name: SupervisedProcess(spec=p, root_dir=root_dir, pythonpath=spec.pythonpath)
+            for p in spec.enabled()
+        }
+        self.tasks: list[asyncio.Task] = list()
+
+    async def run(self):
+        """运行直到 stop_event，然后按依赖逆序停止所有进程"""
+        _logger.info(f"{self.identity} start processes: {list(self.processes)}")
+        supervise_tasks = [asyncio.create_task(self.supervise(p)) for p in self.processes.values()]
+        self.tasks = [*supervise_tasks, asyncio.create_task(self.collect_stats())]
+        try:
+            await self.stop_event.wait()
+        finally:
+            self.stop_event.set()
+            # 下游先停
+            for p in reversed(self.processes.values()):
+                await p.stop(timeout=self.spec.stop_timeout)
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            _logger.info(f"{self.identity} all processes stopped")
+
+    async def supervise(self, process: SupervisedProcess):
+        while not self.stop_event.is_set():
+            await self.wait_dependencies(process)
+            if self.stop_event.is_set():
+                break
+
+            ready = False
+            try:
+                await process.start()
+            except Exception as err:
+                _logger.error(f"{process.identity} start error: {err}")
+                returncode = None
+            else:
+                waiter = asyncio.create_task(process.wait())
+                ready = await self.wait_ready(process, waiter)
+                if not ready and not waiter.done():
+                    _logger.error(f"{process.identity} not ready in {process.spec.ready.timeout}s, stop it")
+                    await process.stop(timeout=self.spec.stop_timeout)
+                returncode = await waiter
+
+            if self.stop_event.is_set():
+                break
+
+            failed = returncode != 0 or not ready
+            _logger.warning(f"{process.identity} exited, returncode={returncode}, uptime={process.uptime:.1f}s")
+            if process.spec.restart is RestartPolicy.NEVER or (process.spec.restart is RestartPolicy.ON_FAILURE and not failed):
+                break
+
+            process.backoff = self.spec.backoff.next_delay(process.backoff, process.uptime)
+            _logger.warning(f"{process.identity} restart in {process.backoff:.1f}s")
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), timeout=process.backoff)
+                break
+            except asyncio.TimeoutError:
+                process.restarts_total.inc()
+
+    async def wait_dependencies(self, process: SupervisedProcess):
+        """等待依赖就绪，未启用的依赖视为已满足"""
+        for name in process.spec.depends_on:
+            dependency = self.processes.get(name)
+            if dependency is None or dependency.ready.is_set():
+                continue
+            _logger.info(f"{process.identity} waiting for {dependency.identity} ready")
+            stop_waiter = asyncio.create_task(self.stop_event.wait())
+            ready_waiter = asyncio.create_task(dependency.ready.wait())
+            await asyncio.wait((stop_waiter, ready_waiter), return_when=asyncio.FIRST_COMPLETED)
+            stop_waiter.cancel()
+            ready_waiter.cancel()
+            if self.stop_event.is_set():
+                return
+
+    async def wait_ready(self, process: SupervisedProcess, waiter: asyncio.Task) -> bool:
+        """
+        轮询就绪检查
+        :return: 超时或进程已退出返回 False
+        """
+        ready_spec = process.spec.ready
+        if ready_spec is None:
+            process.set_ready()
+            return True
+
+        deadline = time.time() + ready_spec.timeout
+        while time.time() < deadline and not waiter.done() and not self.stop_event.is_set():
+            try:
+                if await self.check_ready(process):
+                    process.set_ready()
+                    return True
+            except Exception as err:
+                _logger.debug(f"{process.identity} readiness check error: {err}")
+            await asyncio.sleep(READY_POLL_INTERVAL_SEC)
+        return False
+
+    async def check_ready(self, process: SupervisedProcess) -> bool:
+        ready_spec = process.spec.ready
+
+        if ready_spec.metrics:
+            # 本次启动之后发布的快照
+            started_ms = process.started_t * 1000
+            snapshots = await self.redis.get_metrics_snapshots(press_line=self.press_line)
+            count = sum(
+                1 for snapshot in snapshots
+                if fnmatch.fnmatchcase(snapshot["process"], ready_spec.metrics) and snapshot["t"] >= started_ms
+            )
+            if count < ready_spec.min_count:
+                return False
+
+        if ready_spec.tcp_address is not None:
+            host, port = ready_spec.tcp_address
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=TCP_CONNECT_TIMEOUT_SEC)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            await writer.wait_closed()
+
+        return True
+
+    async def collect_stats(self):
+        """定时采集各进程树的资源占用，更新指标并定期记录日志"""
+        last_log_t = time.time()
+        while True:
+            stats = {p.name: p.collect_stats() for p in self.processes.values()}
+            if time.time() - last_log_t >= LOG_STATS_INTERVAL_SEC:
+                last_log_t = time.time()
+                for name, process_stats in stats.items():
+                    _logger.info(f"{self.identity} process[{name}] stats={process_stats}")
+            await asyncio.sleep(self.spec.stats_interval)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "pid": p.pid,
+                "running": p.running,
+                "ready": p.ready.is_set(),
+                "uptime_seconds": round(p.uptime, 1),
+                "restarts": p.restarts_total.value,
+            }
+            for name, p in self.processes.items()
+        }
+
+    @property
+    def identity(self):
+        return f"Supervisor"
@@ -1 +1,2 @@
 from .async_redis_db import AsyncRedisDB
+from .part_trace import PartTrace, PartTraceStage, summarize_part_traces
@@ -1,12 +1,17 @@
 import asyncio
+import json
 import time
 from datetime import datetime, timedelta, timezone
-import numpy as np
 import typing
 import redis
 import logging
 
-from .key import FrameMetaT, PressKey, ShuttleKey, ShuttleMeta
+from .key import FrameMetaT, PressKey, ShuttleKey, ShuttleMeta, PLCKey, MetricsKey
+from .part_trace import PartTrace
+
+# numpy 只在读写帧时导入，不读写帧的进程不加载
+if typing.TYPE_CHECKING:
+    import numpy as np
 
 _logger = logging.getLogger(__name__)
 
@@ -15,9 +20,9 @@ _logger = logging.getLogger(__name__)
 redis中数据形式：
     press:
         程序号 -> xadd:
-            press:programId:pressLine -> dict {"program_id": "id"}
+            press:programId:pressLine -> dict {"program_id": "id", "detect_latency_ms": "200.0"}
         运行状态 -> xadd:
-            press:runningStatus:pressLine -> dict {"running_status": "0"}
+            press:runningStatus:pressLine -> dict {"running_status": "0", "running_type": "STOPPED"}
         零件计数 -> xadd:
             press:partCounter:pressLine -> dict {"part_counter": "0"}
             
@@ -36,6 +41,34 @@ redis中数据形式：
             例：shuttle:photographed:5-100:1:1 -> {192.168.1.1}
         灯 -> int
             shuttle:lightEnable:pressLine -> key, int
+        相机 open -> GRABBING 耗时 -> hset
+            shuttle:cameraOpenLatency:pressLine -> hash, {ip: latency_ms}
+        相机 GRABBING -> 第一帧 耗时 (等待触发) -> hset
+            shuttle:cameraFirstFrameWait:pressLine -> hash, {ip: wait_ms}
+        相机心跳 -> hset，值为 json，t 超时视为相机进程失联
+            shuttle:cameraHeartbeat:pressLine -> hash, {ip: '{"t": 0, "pid": 0, "state": "GRABBING", "worker_alive": true, "frames": 0}'}
+        modbus 寄存器变化 -> xadd
+            shuttle:modbusChange:pressLine -> dict {"type": "REGISTER", "name": "part_exist", "old": "0", "new": "1", "t": "0"}
+        plc 硬触发记录 -> xadd，相机按 capture_host_t 将帧对应到零件
+            shuttle:plcCapture:pressLine -> dict {"program_id": "1", "part_counter": "1", "capture_count": "1", "capture_t": "0", "capture_host_t": "0"}
+        出帧反馈 -> xadd，image saver 保存 ShuttleImage 后发布，用于学习触发延时
+            shuttle:frameOffset:pressLine -> dict {"program_id": "1", "part_counter": "1", "has_part_t": "0", "frame_ts": "[0, 0]"}
+        节拍统计 -> xadd
+            shuttle:cycleStats:pressLine -> dict {"spm": "12.0", "parts": "12", "cycle_p50_ms": "5000.0", ..., "debounce_ms": "1000.0", "t": "0"}
+        零件链路时间戳 -> hset，字段为 stage 或 stage@cameraIp，值为毫秒时间戳
+            shuttle:trace:pressLine:programId:partCounter -> hash, {"edge": "0.0", "sent@192.168.1.1": "0.0"} (expire)
+        已完成链路的零件 -> xadd，image saver 发送 udp 通知后发布
+            shuttle:traceIndex:pressLine -> dict {"program_id": "1", "part_counter": "1"}
+
+    plc:
+        plc 网关变量 -> xadd，任一变量变化时发布该 plc 的全部变量，值为 json
+            plc:tag:pressLine:plcName -> dict {"t": "0", "program_id": "1", "shuttle_sensors": "[true, false]"}
+
+    metrics:
+        各进程的指标快照 -> hset，值为 json
+            metrics:snapshot:pressLine -> hash, {process: '{"process": "", "pid": 0, "t": 0, "metrics": []}'}
+        剖析命令 -> xadd，process 支持通配符，各进程的 Profiler 读取
+            metrics:profileCommand:pressLine -> dict {"process": "shuttleCamera@*", "kind": "sample", "duration": "30"}
 
 '''
 
@@ -168,13 +201,15 @@ class AsyncRedisDB(redis.asyncio.Redis):
     # 通过 meta 从redis解析 np.ndarray
     # --------------------------------------------------------------------------- #
     @staticmethod
-    def decode_frame_bytes(frame_bytes: bytes, frame_meat: dict, meta_class: typing.Type[FrameMetaT]) -> tuple[np.ndarray, FrameMetaT]:
+    def decode_frame_bytes(frame_bytes: bytes, frame_meat: dict, meta_class: typing.Type[FrameMetaT]) -> tuple["np.ndarray", FrameMetaT]:
         # 元数据
         meta = {
             _decode_bytes(k): _decode_bytes(v) for k, v in frame_meat.items()
         }
         meta = meta_class.create(**meta)
 
+        import numpy as np
+
         # 原始 numpy 二进制数据
         frame = np.frombuffer(
             buffer=frame_bytes,
@@ -188,19 +223,29 @@ class AsyncRedisDB(redis.asyncio.Redis):
     # --------------------------------------------------------------------------- #
     # press -> program_id
     # --------------------------------------------------------------------------- #
-    async def set_program_id(self, program_id: int, press_line: str, maxlen: int = 1000):
+    async def set_program_id(
+            self,
+            program_id: int,
+            press_line: str,
+            maxlen: int = 1000,
+            detect_latency_ms: typing.Optional[float] = None
+    ):
         """
         发布 program_id, 加入 key.program_id_key stream
         :param maxlen:
         :param program_id:
         :param press_line:
+        :param detect_latency_ms: program_id 变化的检测延时（上限），毫秒
         :return:
         """
         key = PressKey.create(press_line=press_line)
+        fields = {"program_id": program_id}
+        if detect_latency_ms is not None:
+            fields["detect_latency_ms"] = round(detect_latency_ms, 1)
         # Add to stream
         await self.xadd(
             key.program_id_key,
-            {"program_id": program_id},
+            fields,
             maxlen=maxlen,      # 限制最大长度
             approximate=True    # 使用 ~，近似裁剪，效率高
         )
@@ -252,19 +297,29 @@ class AsyncRedisDB(redis.asyncio.Redis):
     # --------------------------------------------------------------------------- #
     # press -> running_status
     # --------------------------------------------------------------------------- #
-    async def set_running_status(self, running_status: bool, press_line: str, maxlen: int = 1000):
+    async def set_running_status(
+            self,
+            running_status: bool,
+            press_line: str,
+            maxlen: int = 1000,
+            running_type: typing.Optional[str] = None,
+    ):
         """
         发布 running_status, 加入 key.running_status_key stream
         :param maxlen:
         :param running_status:
         :param press_line:
+        :param running_type: RUNNING / STANDBY / STOPPED
         :return:
         """
         key = PressKey.create(press_line=press_line)
+        fields = {"running_status": int(running_status)}
+        if running_type is not None:
+            fields["running_type"] = str(running_type)
         # Add to stream
         await self.xadd(
             key.running_status_key,
-            {"running_status": int(running_status)},
+            fields,
             maxlen=maxlen,        # 限制最大长度
             approximate=True    # 使用 ~，近似裁剪，效率高
         )
@@ -402,10 +457,72 @@ class AsyncRedisDB(redis.asyncio.Redis):
         _logger.debug(f"{self.identity} get_running_cameras({press_line})={ips}")
         return ips
 
+    # --------------------------------------------------------------------------- #
+    # shuttle -> camera_open_latency
+    # --------------------------------------------------------------------------- #
+    async def set_camera_open_latency(self, ip: str, press_line: str, latency_ms: float):
+        """
+        发布相机 open 命令 -> 开始取流 (GRABBING) 的耗时，不包含等待触发的时间
+        :param ip:
+        :param press_line:
+        :param latency_ms:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.hset(key.camera_open_latency_key, ip, round(latency_ms, 1))
+
+    async def get_camera_open_latency(self, press_line: str) -> dict[str, float]:
+        key = ShuttleKey.create(press_line=press_line)
+        raw = await self.hgetall(key.camera_open_latency_key)
+        latency = {_decode_bytes(k): float(v) for k, v in raw.items()}
+        _logger.debug(f"{self.identity} get_camera_open_latency({press_line})={latency}")
+        return latency
+
+    async def set_camera_first_frame_wait(self, ip: str, press_line: str, wait_ms: float):
+        """
+        发布相机 开始取流 (GRABBING) -> 第一帧 的耗时，即等待触发的时间
+        :param ip:
+        :param press_line:
+        :param wait_ms:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.hset(key.camera_first_frame_wait_key, ip, round(wait_ms, 1))
+
+    async def get_camera_first_frame_wait(self, press_line: str) -> dict[str, float]:
+        key = ShuttleKey.create(press_line=press_line)
+        raw = await self.hgetall(key.camera_first_frame_wait_key)
+        wait = {_decode_bytes(k): float(v) for k, v in raw.items()}
+        _logger.debug(f"{self.identity} get_camera_first_frame_wait({press_line})={wait}")
+        return wait
+
+    # --------------------------------------------------------------------------- #
+    # shuttle -> camera_heartbeat
+    # --------------------------------------------------------------------------- #
+    async def set_camera_heartbeat(self, ip: str, press_line: str, heartbeat: dict):
+        """
+        发布相机进程心跳
+        :param ip:
+        :param press_line:
+        :param heartbeat: {"t": 毫秒时间戳, "pid", "state": CameraState, "worker_alive", "frames"}
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.hset(key.camera_heartbeat_key, ip, json.dumps(heartbeat))
+
+    async def get_camera_heartbeats(self, press_line: str) -> dict[str, dict]:
+        key = ShuttleKey.create(press_line=press_line)
+        raw = await self.hgetall(key.camera_heartbeat_key)
+        return {_decode_bytes(k): json.loads(v) for k, v in raw.items()}
+
+    async def remove_camera_heartbeat(self, ip: str, press_line: str):
+        key = ShuttleKey.create(press_line=press_line)
+        await self.hdel(key.camera_heartbeat_key, ip)
+
     # --------------------------------------------------------------------------- #
     # shuttle -> frame
     # --------------------------------------------------------------------------- #
-    async def set_shuttle_frame(self, press_line: str, program_id: int, part_counter: int, camera_ip: str, matrix: np.ndarray, **kwargs):
+    async def set_shuttle_frame(self, press_line: str, program_id: int, part_counter: int, camera_ip: str, matrix: "np.ndarray", **kwargs):
         """
         将 shuttle_frame 数组 存入 Redis
         :param matrix:
@@ -480,7 +597,7 @@ class AsyncRedisDB(redis.asyncio.Redis):
         _logger.debug(f"{self.identity} get_unphotographed_ips({press_line},{program_id},{part_counter})={ips}")
         return ips
 
-    async def get_shuttle_frame(self, press_line: str, program_id: int, part_counter: int, camera_ip: str) -> tuple[np.ndarray, ShuttleMeta]:
+    async def get_shuttle_frame(self, press_line: str, program_id: int, part_counter: int, camera_ip: str) -> tuple["np.ndarray", ShuttleMeta]:
         key = ShuttleKey.create(
             press_line=press_line,
             program_id=program_id,
@@ -496,7 +613,7 @@ class AsyncRedisDB(redis.asyncio.Redis):
         # 解析
         return self.decode_frame_bytes(frame_bytes=raw_matrix, frame_meat=raw_meta, meta_class=ShuttleMeta)
 
-    async def get_all_shuttle_frames(self, press_line: str, program_id: int, part_counter: int, timeout_sec: int = 20) -> dict[str, tuple[np.ndarray, ShuttleMeta]]:
+    async def get_all_shuttle_frames(self, press_line: str, program_id: int, part_counter: int, timeout_sec: int = 20) -> dict[str, tuple["np.ndarray", ShuttleMeta]]:
         # 等待所有相机拍照完成
         start = time.time()
         while True:
@@ -528,6 +645,402 @@ class AsyncRedisDB(redis.asyncio.Redis):
             frames[camera_ip] = self.decode_frame_bytes(frame_bytes=raw_matrix, frame_meat=raw_meta, meta_class=ShuttleMeta)
         return frames
 
+    # --------------------------------------------------------------------------- #
+    # shuttle -> modbusChange
+    # --------------------------------------------------------------------------- #
+    async def add_modbus_changes(self, changes: list[dict], press_line: str, maxlen: int = 10000):
+        """
+        发布 modbus 寄存器变化, 加入 key.modbus_change_key stream
+        :param changes: [ModbusChange.to_dict(), ...]
+        :param press_line:
+        :param maxlen:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        async with self.pipeline(transaction=False) as pipe:
+            for change in changes:
+                pipe.xadd(key.modbus_change_key, change, maxlen=maxlen, approximate=True)
+            await pipe.execute()
+
+    async def get_modbus_changes(
+            self,
+            press_line: str,
+            block: typing.Union[None, int, float] = None,
+            include_last: bool = False
+    ) -> typing.AsyncGenerator[tuple[typing.Optional[int], typing.Optional[dict]], None]:
+        """
+        异步生成器，持续返回 modbus 寄存器变化
+        :param press_line: 生产线
+        :param block: 阻塞时间，单位毫秒；None 或 0 表示无限阻塞
+        :param include_last: 是否先返回最后一条历史消息
+        :return: dict change
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        async for msg_id, msg_data in self.get_stream_tail(
+                stream_key=key.modbus_change_key,
+                block=block,
+                include_last=include_last
+        ):
+            # 阻塞后没有消息
+            if msg_data is None:
+                yield None, None
+            else:
+                # 时间戳
+                timestamp_ms = int(msg_id.split("-")[0])
+                yield timestamp_ms, msg_data
+
+    # --------------------------------------------------------------------------- #
+    # shuttle -> plcCapture
+    # --------------------------------------------------------------------------- #
+    async def add_plc_capture(
+            self,
+            press_line: str,
+            program_id: typing.Optional[int],
+            part_counter: typing.Optional[int],
+            capture_count: int,
+            capture_t: typing.Optional[int],
+            capture_host_t: typing.Optional[int] = None,
+            maxlen: int = 10000,
+    ):
+        """
+        发布 plc 硬触发记录，用于将帧对应到零件
+        :param press_line:
+        :param program_id:
+        :param part_counter:
+        :param capture_count: plc 触发计数
+        :param capture_t: plc 触发时间戳，plc 时钟，毫秒
+        :param capture_host_t: 换算为主机时钟的触发时间戳，与 frame_t 比较，毫秒
+        :param maxlen:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.xadd(
+            key.plc_capture_key,
+            {
+                "program_id": "null" if program_id is None else program_id,
+                "part_counter": "null" if part_counter is None else part_counter,
+                "capture_count": capture_count,
+                "capture_t": "null" if capture_t is None else capture_t,
+                "capture_host_t": "null" if capture_host_t is None else capture_host_t,
+            },
+            maxlen=maxlen,
+            approximate=True,
+        )
+
+    async def get_plc_captures(self, press_line: str, count: int = 100) -> list[dict]:
+        """
+        获取最近的 plc 硬触发记录，按时间倒序
+        :param press_line:
+        :param count:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        captures = list()
+        for msg_id, msg_data in await self.xrevrange(key.plc_capture_key, count=count):
+            _, data = _decode_stream_msg(msg_id, msg_data)
+            captures.append({k: (None if v == "null" else int(v)) for k, v in data.items()})
+        return captures
+
+    # --------------------------------------------------------------------------- #
+    # shuttle -> frameOffset
+    # --------------------------------------------------------------------------- #
+    async def add_frame_offsets(
+            self,
+            press_line: str,
+            program_id: int,
+            part_counter: int,
+            has_part_t: int,
+            frame_ts: list[int],
+            maxlen: int = 10000,
+    ):
+        """
+        发布一个零件各相机的出帧时间
+        :param press_line:
+        :param program_id:
+        :param part_counter:
+        :param has_part_t: 传感器沿时间戳，毫秒
+        :param frame_ts: 各相机的 frame_t，毫秒
+        :param maxlen:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.xadd(
+            key.frame_offset_key,
+            {
+                "program_id": program_id,
+                "part_counter": part_counter,
+                "has_part_t": has_part_t,
+                "frame_ts": json.dumps(frame_ts),
+            },
+            maxlen=maxlen,
+            approximate=True,
+        )
+
+    async def get_frame_offsets(
+            self,
+            press_line: str,
+            block: typing.Union[None, int, float] = None,
+            include_last: bool = False
+    ) -> typing.AsyncGenerator[tuple[typing.Optional[int], typing.Optional[dict]], None]:
+        """
+        异步生成器，持续返回出帧反馈
+        :param press_line: 生产线
+        :param block: 阻塞时间，单位毫秒；None 或 0 表示无限阻塞
+        :param include_last: 是否先返回最后一条历史消息
+        :return: dict {"program_id": int, "part_counter": int, "has_part_t": int, "frame_ts": list}
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        async for msg_id, msg_data in self.get_stream_tail(
+                stream_key=key.frame_offset_key,
+                block=block,
+                include_last=include_last
+        ):
+            # 阻塞后没有消息
+            if msg_data is None:
+                yield None, None
+            else:
+                data = {
+                    "program_id": int(msg_data["program_id"]),
+                    "part_counter": int(msg_data["part_counter"]),
+                    "has_part_t": int(msg_data["has_part_t"]),
+                    "frame_ts": json.loads(msg_data["frame_ts"]),
+                }
+                # 时间戳
+                timestamp_ms = int(msg_id.split("-")[0])
+                yield timestamp_ms, data
+
+    # --------------------------------------------------------------------------- #
+    # shuttle -> trace
+    # --------------------------------------------------------------------------- #
+    async def add_part_trace(self, press_line: str, program_id: int, part_counter: int, stages: dict[str, float], expire_sec: int = 3600):
+        """
+        记录零件链路时间戳
+        :param press_line:
+        :param program_id:
+        :param part_counter:
+        :param stages: {PartTrace.field(stage, camera_ip): 毫秒时间戳}
+        :param expire_sec:
+        :return:
+        """
+        if not stages:
+            return
+        key = ShuttleKey.create(press_line=press_line, program_id=program_id, part_counter=part_counter)
+        async with self.pipeline(transaction=False) as pipe:
+            pipe.hset(key.trace_key, mapping={k: round(v, 1) for k, v in stages.items()})
+            pipe.expire(key.trace_key, expire_sec)
+            await pipe.execute()
+
+    async def finish_part_trace(self, press_line: str, program_id: int, part_counter: int, maxlen: int = 10000):
+        """零件链路完成，加入 key.trace_index_key stream，用于汇总"""
+        key = ShuttleKey.create(press_line=press_line)
+        await self.xadd(
+            key.trace_index_key,
+            {"program_id": program_id, "part_counter": part_counter},
+            maxlen=maxlen,
+            approximate=True,
+        )
+
+    async def get_part_trace(self, press_line: str, program_id: int, part_counter: int) -> PartTrace:
+        key = ShuttleKey.create(press_line=press_line, program_id=program_id, part_counter=part_counter)
+        raw = await self.hgetall(key.trace_key)
+        fields = {_decode_bytes(k): float(v) for k, v in raw.items()}
+        return PartTrace.from_fields(program_id=program_id, part_counter=part_counter, fields=fields)
+
+    async def get_recent_part_traces(self, press_line: str, count: int = 200) -> list[PartTrace]:
+        """
+        获取最近完成的零件链路，按时间倒序，已过期的链路跳过
+        :param press_line:
+        :param count:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        parts = list()
+        for msg_id, msg_data in await self.xrevrange(key.trace_index_key, count=count):
+            _, data = _decode_stream_msg(msg_id, msg_data)
+            parts.append((int(data["program_id"]), int(data["part_counter"])))
+
+        async with self.pipeline(transaction=False) as pipe:
+            for program_id, part_counter in parts:
+                pipe.hgetall(ShuttleKey.create(press_line=press_line, program_id=program_id, part_counter=part_counter).trace_key)
+            results = await pipe.execute()
+
+        traces = list()
+        for (program_id, part_counter), raw in zip(parts, results):
+            if not raw:
+                continue
+            fields = {_decode_bytes(k): float(v) for k, v in raw.items()}
+            traces.append(PartTrace.from_fields(program_id=program_id, part_counter=part_counter, fields=fields))
+        return traces
+
+    # --------------------------------------------------------------------------- #
+    # shuttle -> cycleStats
+    # --------------------------------------------------------------------------- #
+    async def set_shuttle_cycle_stats(self, stats: dict, press_line: str, maxlen: int = 1000):
+        """
+        发布 shuttle 节拍统计, 加入 key.cycle_stats_key stream
+        :param stats: ShuttleCycleStats.to_dict()
+        :param press_line:
+        :param maxlen:
+        :return:
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        await self.xadd(key.cycle_stats_key, stats, maxlen=maxlen, approximate=True)
+
+    async def get_shuttle_cycle_stats(
+            self,
+            press_line: str,
+            block: typing.Union[None, int, float] = None,
+            include_last: bool = True
+    ) -> typing.AsyncGenerator[tuple[typing.Optional[int], typing.Optional[dict]], None]:
+        """
+        异步生成器，先返回最后一条消息（可选），然后持续返回新消息。
+        :param press_line: 生产线
+        :param block: 阻塞时间，单位毫秒；None 或 0 表示无限阻塞
+        :param include_last: 是否先返回最后一条历史消息
+        :return: dict stats，"null" 转为 None
+        """
+        key = ShuttleKey.create(press_line=press_line)
+        async for msg_id, msg_data in self.get_stream_tail(
+                stream_key=key.cycle_stats_key,
+                block=block,
+                include_last=include_last
+        ):
+            # 阻塞后没有消息
+            if msg_data is None:
+                yield None, None
+            else:
+                stats = {k: (None if v == "null" else float(v)) for k, v in msg_data.items()}
+                # 时间戳
+                timestamp_ms = int(msg_id.split("-")[0])
+                yield timestamp_ms, stats
+
+    # --------------------------------------------------------------------------- #
+    # plc -> tag
+    # --------------------------------------------------------------------------- #
+    async def add_plc_tags(self, press_line: str, plc: str, values: dict, t: int, maxlen: int = 10000):
+        """
+        发布 plc 网关读取的变量, 加入 key.tag_key stream
+        :param press_line:
+        :param plc: 变量表中的 plc 名称
+        :param values: {tag: value}
+        :param t: 扫描完成时间戳，毫秒
+        :param maxlen:
+        :return:
+        """
+        key = PLCKey.create(press_line=press_line, plc=plc)
+        fields = {"t": t, **{tag: json.dumps(value) for tag, value in values.items()}}
+        await self.xadd(key.tag_key, fields, maxlen=maxlen, approximate=True)
+
+    @staticmethod
+    def _decode_plc_tags(msg_data: dict) -> tuple[int, dict]:
+        t = int(msg_data.pop("t"))
+        return t, {tag: json.loads(value) for tag, value in msg_data.items()}
+
+    async def get_latest_plc_tags(self, press_line: str, plc: str) -> tuple[int, dict]:
+        key = PLCKey.create(press_line=press_line, plc=plc)
+        _, msg_data = await self.get_latest_stream(key.tag_key)
+        return self._decode_plc_tags(msg_data)
+
+    async def get_plc_tags(
+            self,
+            press_line: str,
+            plc: str,
+            block: typing.Union[None, int, float] = None,
+            include_last: bool = True
+    ) -> typing.AsyncGenerator[tuple[typing.Optional[int], typing.Optional[dict]], None]:
+        """
+        异步生成器，持续返回 plc 网关发布的变量
+        :param press_line: 生产线
+        :param plc: 变量表中的 plc 名称
+        :param block: 阻塞时间，单位毫秒；None 或 0 表示无限阻塞
+        :param include_last: 是否先返回最后一条历史消息
+        :return: (扫描时间戳, {tag: value})
+        """
+        key = PLCKey.create(press_line=press_line, plc=plc)
+        async for msg_id, msg_data in self.get_stream_tail(
+                stream_key=key.tag_key,
+                block=block,
+                include_last=include_last
+        ):
+            # 阻塞后没有消息
+            if msg_data is None:
+                yield None, None
+            else:
+                yield self._decode_plc_tags(msg_data)
+
+    # --------------------------------------------------------------------------- #
+    # metrics -> snapshot
+    # --------------------------------------------------------------------------- #
+    async def set_metrics_snapshot(self, press_line: str, process: str, snapshot: dict):
+        """
+        发布进程的指标快照
+        :param press_line:
+        :param process: 进程名称
+        :param snapshot: MetricsRegistry.snapshot()
+        :return:
+        """
+        key = MetricsKey.create(press_line=press_line)
+        await self.hset(key.snapshot_key, process, json.dumps(snapshot))
+
+    async def get_metrics_snapshots(self, press_line: str) -> list[dict]:
+        """获取所有进程的指标快照，按进程名称排序"""
+        key = MetricsKey.create(press_line=press_line)
+        raw = await self.hgetall(key.snapshot_key)
+        return [json.loads(raw[k]) for k in sorted(raw, key=_decode_bytes)]
+
+    async def remove_metrics_snapshot(self, press_line: str, process: str):
+        key = MetricsKey.create(press_line=press_line)
+        await self.hdel(key.snapshot_key, process)
+
+    # --------------------------------------------------------------------------- #
+    # metrics -> profileCommand
+    # --------------------------------------------------------------------------- #
+    async def add_profile_command(self, press_line: str, process: str, kind: str, duration: float, maxlen: int = 100):
+        """
+        发布剖析命令
+        :param press_line:
+        :param process: 进程名称，支持通配符
+        :param kind: sample / cprofile / tracemalloc
+        :param duration: 剖析时长，秒
+        :param maxlen:
+        :return:
+        """
+        key = MetricsKey.create(press_line=press_line)
+        await self.xadd(
+            key.profile_command_key,
+            {"process": process, "kind": kind, "duration": duration},
+            maxlen=maxlen,
+            approximate=True
+        )
+
+    async def get_profile_command(
+            self,
+            press_line: str,
+            block: typing.Union[None, int, float] = None,
+    ) -> typing.AsyncGenerator[tuple[typing.Optional[int], typing.Optional[dict]], None]:
+        """
+        异步生成器，持续返回新的剖析命令，不返回历史命令
+        :param press_line:
+        :param block: 阻塞时间，单位毫秒；None 或 0 表示无限阻塞
+        :return: (时间戳, {"process", "kind", "duration"})
+        """
+        key = MetricsKey.create(press_line=press_line)
+        async for msg_id, msg_data in self.get_stream_tail(
+                stream_key=key.profile_command_key,
+                block=block,
+                include_last=False
+        ):
+            # 阻塞后没有消息
+            if msg_data is None:
+                yield None, None
+            else:
+                timestamp_ms = int(msg_id.split("-")[0])
+                yield timestamp_ms, {
+                    "process": msg_data["process"],
+                    "kind": msg_data["kind"],
+                    "duration": float(msg_data["duration"]),
+                }
+
     # --------------------------------------------------------------------------- #
     # shuttle -> lightEnable
     # --------------------------------------------------------------------------- #
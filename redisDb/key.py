@@ -157,6 +157,67 @@ class ShuttleKey(KeyBase):
     def light_enable_key(self):
         return self._generate_key("lightEnable", self.press_line)
 
+    @property
+    def camera_open_latency_key(self):
+        return self._generate_key("cameraOpenLatency", self.press_line)
+
+    @property
+    def camera_first_frame_wait_key(self):
+        return self._generate_key("cameraFirstFrameWait", self.press_line)
+
+    @property
+    def camera_heartbeat_key(self):
+        return self._generate_key("cameraHeartbeat", self.press_line)
+
+    @property
+    def modbus_change_key(self):
+        return self._generate_key("modbusChange", self.press_line)
+
+    @property
+    def plc_capture_key(self):
+        return self._generate_key("plcCapture", self.press_line)
+
+    @property
+    def cycle_stats_key(self):
+        return self._generate_key("cycleStats", self.press_line)
+
+    @property
+    def frame_offset_key(self):
+        return self._generate_key("frameOffset", self.press_line)
+
+    @property
+    def trace_key(self):
+        return self._generate_key("trace", self.press_line, self.program_id, self.part_counter)
+
+    @property
+    def trace_index_key(self):
+        return self._generate_key("traceIndex", self.press_line)
+
+@dataclasses.dataclass
+class PLCKey(KeyBase):
+    """plc 网关"""
+    press_line: str
+    plc: typing.Optional[str] = None
+    prefix: str = 'plc'
+
+    @property
+    def tag_key(self):
+        return self._generate_key("tag", self.press_line, self.plc)
+
+@dataclasses.dataclass
+class MetricsKey(KeyBase):
+    """各进程的指标快照"""
+    press_line: str
+    prefix: str = 'metrics'
+
+    @property
+    def snapshot_key(self):
+        return self._generate_key("snapshot", self.press_line)
+
+    @property
+    def profile_command_key(self):
+        return self._generate_key("profileCommand", self.press_line)
+
 @dataclasses.dataclass
 class ShuttleMeta(MetaBase):
     program_id: int
@@ -169,6 +230,8 @@ class ShuttleMeta(MetaBase):
     frame_shape: tuple
     frame_size: int
     frame_dtype: str
+    # plc 硬触发时匹配到的 capture_count，软触发为 None
+    capture_count: typing.Optional[int] = None
 
 
 
@@ -0,0 +1,178 @@
+import typing
+import dataclasses
+from enum import StrEnum
+
+
+# 相机阶段字段名中 stage 与 camera_ip 的分隔符
+CAMERA_SEPARATOR = "@"
+# 汇总的百分位
+TRACE_PERCENTILES = (50, 90, 99)
+
+
+class PartTraceStage(StrEnum):
+    """
+    零件链路阶段，按先后顺序排列
+    时间戳均为本机 time.time() 毫秒，各进程需运行在同一台主机或做好时钟同步
+    """
+    EDGE = "edge"                   # 传感器上升沿 has_part_t           CameraCtrl
+    SCHEDULED = "scheduled"         # 计算触发延时，排入 call_later      CameraCtrl
+    SENT = "sent"                   # 软触发消息发布到 rabbitmq          CameraCtrl, 每个相机
+    RECEIVED = "received"           # 相机收到 TriggerSoftware          MyCamera
+    FRAME = "frame"                 # SDK 出帧回调                     MyCamera
+    REDIS_SET = "redisSet"          # 帧写入 redis                     MyCamera
+    FETCH = "fetch"                 # 取到该零件全部相机的帧              ImageSaver
+    ENCODED = "encoded"             # 图片编码完成                      ImageSaver, 每个相机
+    WRITTEN = "written"             # 图片写入文件                      ImageSaver, 每个相机
+    DB_COMMITTED = "dbCommitted"    # ShuttleImage 写入数据库           ImageSaver, 每个相机
+    UDP_NOTIFIED = "udpNotified"    # 发送 udp 组播通知                 ImageSaver
+
+    @property
+    def per_camera(self) -> bool:
+        return self in CAMERA_STAGES
+
+    @property
+    def previous(self) -> typing.Optional["PartTraceStage"]:
+        """计算该阶段耗时的起点"""
+        stages = list(PartTraceStage)
+        index = stages.index(self)
+        return stages[index - 1] if index else None
+
+
+CAMERA_STAGES = frozenset({
+    PartTraceStage.SENT,
+    PartTraceStage.RECEIVED,
+    PartTraceStage.FRAME,
+    PartTraceStage.REDIS_SET,
+    PartTraceStage.ENCODED,
+    PartTraceStage.WRITTEN,
+    PartTraceStage.DB_COMMITTED,
+})
+
+
+@dataclasses.dataclass
+class PartTrace:
+    """一个零件的链路时间戳"""
+    program_id: int
+    part_counter: int
+    stages: dict[str, float] = dataclasses.field(default_factory=dict)              # stage -> t
+    cameras: dict[str, dict[str, float]] = dataclasses.field(default_factory=dict)  # camera_ip -> {stage -> t}
+
+    @staticmethod
+    def field(stage: PartTraceStage, camera_ip: typing.Optional[str] = None) -> str:
+        """redis hash 字段名，相机阶段为 stage@camera_ip"""
+        return f"{stage}{CAMERA_SEPARATOR}{camera_ip}" if camera_ip else str(stage)
+
+    @classmethod
+    def from_fields(cls, program_id: int, part_counter: int, fields: dict[str, float]) -> typing.Self:
+        trace = cls(program_id=program_id, part_counter=part_counter)
+        for name, t in fields.items():
+            stage, _, camera_ip = name.partition(CAMERA_SEPARATOR)
+            if camera_ip:
+                trace.cameras.setdefault(camera_ip, dict())[stage] = float(t)
+            else:
+                trace.stages[stage] = float(t)
+        return trace
+
+    def get(self, stage: PartTraceStage, camera_ip: typing.Optional[str] = None) -> typing.Optional[float]:
+        """
+        阶段时间戳
+            相机阶段未指定 camera_ip 时取所有相机中最晚的一个，即该零件所有相机完成该阶段的时间
+        """
+        if not stage.per_camera:
+            return self.stages.get(stage)
+        if camera_ip is not None:
+            return self.cameras.get(camera_ip, dict()).get(stage)
+        values = [stages[stage] for stages in self.cameras.values() if stage in stages]
+        return max(values) if values else None
+
+    def latencies(self) -> dict[tuple[str, typing.Optional[str]], float]:
+        """
+        各阶段耗时，毫秒
+            起点为上一个阶段，缺失时继续向前查找
+            上一个阶段是相机阶段时，相机阶段取同一相机，零件阶段取所有相机中最晚的一个
+        :return: {(stage, camera_ip): latency_ms}，零件阶段 camera_ip 为 None
+        """
+        latencies = dict()
+        for stage in PartTraceStage:
+            camera_ips = list(self.cameras) if stage.per_camera else [None]
+            for camera_ip in camera_ips:
+                t = self.get(stage, camera_ip)
+                if t is None:
+                    continue
+                start_t = self._start_t(stage, camera_ip)
+                if start_t is not None:
+                    latencies[(str(stage), camera_ip)] = t - start_t
+        return latencies
+
+    def total_ms(self) -> typing.Optional[float]:
+        """传感器上升沿 -> udp 通知"""
+        start_t = self.get(PartTraceStage.EDGE)
+        end_t = self.get(PartTraceStage.UDP_NOTIFIED)
+        if start_t is None or end_t is None:
+            return None
+        return end_t - start_t
+
+    def _start_t(self, stage: PartTraceStage, camera_ip: typing.Optional[str]) -> typing.Optional[float]:
+        previous = stage.previous
+        while previous is not None:
+            t = self.get(previous, camera_ip if previous.per_camera else None)
+            if t is not None:
+                return t
+            previous = previous.previous
+        return None
+
+
+def _percentiles(values: list[float], q: typing.Sequence[float]) -> dict:
+    # 只在汇总时导入 numpy，webViewer / supervisor 不需要在启动时加载
+    import numpy as np
+
+    result = {"count": len(values)}
+    for p, v in zip(q, np.percentile(values, q).tolist()):
+        result[f"p{p:g}"] = round(v, 1)
+    return result
+
+
+def summarize_part_traces(traces: typing.Iterable[PartTrace], q: typing.Sequence[float] = TRACE_PERCENTILES) -> dict:
+    """
+    汇总各阶段耗时的百分位
+    :param traces:
+    :param q: 百分位
+    :return: {
+                "parts": 零件数,
+                "total": {"count": n, "p50": ms, ...},
+                "stages": {stage: {"count": n, "p50": ms, ...}},
+                "cameras": {camera_ip: {stage: {"count": n, "p50": ms, ...}}},
+            }
+    """
+    totals = list()
+    stages: dict[str, list[float]] = dict()
+    cameras: dict[str, dict[str, list[float]]] = dict()
+
+    parts = 0
+    for trace in traces:
+        parts += 1
+        total = trace.total_ms()
+        if total is not None:
+            totals.append(total)
+        for (stage, camera_ip), latency in trace.latencies().items():
+            stages.setdefault(stage, list()).append(latency)
+            if camera_ip is not None:
+                cameras.setdefault(camera_ip, dict()).setdefault(stage, list()).append(latency)
+
+    # 按阶段顺序输出
+    order = {str(stage): index for index, stage in enumerate(PartTraceStage)}
+    return {
+        "parts": parts,
+        "total": _percentiles(totals, q) if totals else {"count": 0},
+        "stages": {
+            stage: _percentiles(values, q)
+            for stage, values in sorted(stages.items(), key=lambda item: order.get(item[0], len(order)))
+        },
+        "cameras": {
+            camera_ip: {
+                stage: _percentiles(values, q)
+                for stage, values in sorted(camera_stages.items(), key=lambda item: order.get(item[0], len(order)))
+            }
+            for camera_ip, camera_stages in sorted(cameras.items())
+        },
+    }
@@ -0,0 +1,119 @@
+"""
+端到端基准测试的本地替身
+    RedisCameraProducer / RedisCameraConsumer   用 redis list 代替 rabbitmq，接口与 RabbitmqCamera* 相同
+    BenchCameraCtrl / BenchCamera               使用上述替身的 CameraCtrl / MyCamera，业务代码不变
+"""
+import json
+import typing
+import uuid
+import logging
+
+from redisDb import AsyncRedisDB
+from camera import CameraCtrlForShuttle, MyCameraForShuttle
+
+_logger = logging.getLogger(__name__)
+
+
+# 替身消息队列的 key 前缀
+BENCH_QUEUE_PREFIX = "bench:camera"
+# 阻塞读取队列的时间，秒
+BENCH_QUEUE_BLOCK_SEC = 1
+
+
+class RedisCameraProducer:
+    def __init__(self, rabbitmq_url: str, location: typing.Optional[str] = "shuttle"):
+        """
+        rabbitmq_url 为 redis://host:port/db
+        每个相机一个 list，广播发送到所有已注册的相机
+        """
+        self.url = rabbitmq_url
+        self.location = location if location is not None else ""
+        self.redis: typing.Optional[AsyncRedisDB] = None
+        self.response_key = f"{BENCH_QUEUE_PREFIX}:{self.location}:response:{uuid.uuid4().hex[:8]}"
+
+    async def connect(self):
+        if self.redis is None:
+            self.redis = await AsyncRedisDB.create(**_parse_redis_url(self.url), ping=True)
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.delete(self.response_key)
+            await self.redis.aclose()
+            self.redis = None
+
+    async def publish(self, camera_ip: typing.Union[list[str], str, None], data: str):
+        await self.connect()
+        if not camera_ip:
+            camera_ips = [ip.decode() for ip in await self.redis.smembers(_consumers_key(self.location))]
+        elif isinstance(camera_ip, str):
+            camera_ips = [camera_ip]
+        else:
+            camera_ips = camera_ip
+        message = json.dumps({"data": data, "reply_to": self.response_key})
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for ip in camera_ips:
+                pipe.rpush(_queue_key(self.location, ip), message)
+            await pipe.execute()
+
+    async def listener(self):
+        await self.connect()
+        while True:
+            item = await self.redis.blpop([self.response_key], timeout=BENCH_QUEUE_BLOCK_SEC)
+            if item is not None:
+                yield item[1].decode()
+
+
+class RedisCameraConsumer:
+    def __init__(self, rabbitmq_url: str, camera_ip: str, location: typing.Optional[str] = "shuttle"):
+        self.url = rabbitmq_url
+        self.camera_ip = camera_ip
+        self.location = location if location is not None else ""
+        self.redis: typing.Optional[AsyncRedisDB] = None
+
+    async def connect(self):
+        if self.redis is None:
+            self.redis = await AsyncRedisDB.create(**_parse_redis_url(self.url), ping=True)
+            await self.redis.sadd(_consumers_key(self.location), self.camera_ip)
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.srem(_consumers_key(self.location), self.camera_ip)
+            await self.redis.aclose()
+            self.redis = None
+
+    async def listener(self):
+        await self.connect()
+        key = _queue_key(self.location, self.camera_ip)
+        while True:
+            item = await self.redis.blpop([key], timeout=BENCH_QUEUE_BLOCK_SEC)
+            if item is None:
+                continue
+            message = json.loads(item[1])
+            response = yield message["data"]
+            if response:
+                await self.redis.rpush(message["reply_to"], response)
+
+
+def _queue_key(location: str, ip: str) -> str:
+    return f"{BENCH_QUEUE_PREFIX}:{location}:{ip}"
+
+
+def _consumers_key(location: str) -> str:
+    return f"{BENCH_QUEUE_PREFIX}:{location}:consumers"
+
+
+def _parse_redis_url(url: str) -> dict:
+    """redis://host:port/db -> {"host", "port", "db"}"""
+    rest = url.split("://", 1)[-1]
+    address, _, db = rest.partition("/")
+    host, _, port = address.partition(":")
+    return {"host": host or "127.0.0.1", "port": int(port or 6379), "db": int(db or 0)}
+
+
+class BenchCameraCtrl(CameraCtrlForShuttle):
+    PRODUCER_CLASS = RedisCameraProducer
+
+
+class BenchCamera(MyCameraForShuttle):
+    """camera_params.yml 中配置 simulation.enable，由 MyCamera.create 选择模拟相机"""
+    CONSUMER_CLASS = RedisCameraConsumer
@@ -0,0 +1,193 @@
+"""
+各入口的 import 耗时报告与启动预算检查 (python -X importtime)
+    每个入口在独立子进程中只 import 一次（不运行 main），重复 --repeat 次取中位数
+    报告写入 --output-dir/<入口>.txt：import 耗时、进程墙钟耗时、加载了的 forbidden 包、耗时最多的模块、最后一次的原始输出
+    汇总写入 --output-dir/summary.json；超出 max_import_ms 或加载了 forbidden 包时返回码为 1，用于 CI
+
+    python -m test.import_budget
+    python -m test.import_budget --entries readerForPress plcGateway --repeat 5
+预算见 config/startup_budget.yml
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import yaml
+
+from config import config
+
+
+# -X importtime 输出：import time: self [us] | cumulative | imported package
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)\s*$")
+# 报告中列出的模块数
+REPORT_TOP_N = 30
+# 单次 import 的超时，秒
+IMPORT_TIMEOUT_S = 120
+# 子进程打印已加载的顶层包
+IMPORT_SNIPPET = (
+    "import importlib, json, sys; importlib.import_module({module!r}); "
+    "print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}})))"
+)
+
+
+def load_budget(path: str, names: list = None) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = (yaml.safe_load(f) or dict()).get("entries") or dict()
+    unknown = set(names or list()) - set(entries)
+    if unknown:
+        raise ValueError(f"unknown entries: {sorted(unknown)}, expected some of {list(entries)}")
+    return {name: entry for name, entry in entries.items() if not names or name in names}
+
+
+def load_pythonpath() -> list:
+    """与 supervisor 启动的进程一致：项目根 + supervisor.yml pythonpath"""
+    with open(config.SUPERVISOR_PATH, "r", encoding="utf-8") as f:
+        extra = (yaml.safe_load(f) or dict()).get("pythonpath") or list()
+    return [config.ROOT_DIR, *extra]
+
+
+def parse_import_time(stderr: str) -> list[dict]:
+    """
+    解析 -X importtime 输出
+    :return: [{"module", "self_us", "cumulative_us", "level"}]，按 import 完成顺序
+    """
+    records = list()
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        records.append({
+            "module": module,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "level": (len(indent) - 1) // 2,
+        })
+    return records
+
+
+def import_once(module: str, env: dict) -> dict:
+    start_t = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=config.ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=IMPORT_TIMEOUT_S,
+    )
+    wall_ms = (time.perf_counter() - start_t) * 1000
+    if completed.returncode != 0:
+        # 去掉 importtime 行，只保留错误
+        error = "\n".join(line for line in completed.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import {module} failed:\n{error}")
+
+    records = parse_import_time(completed.stderr)
+    # 入口模块及其父包的顶层 import，不包含解释器启动时的 import
+    import_us = sum(
+        r["cumulative_us"] for r in records
+        if r["level"] == 0 and (r["module"] == module or module.startswith(r["module"] + "."))
+    )
+    return {
+        "import_ms": import_us / 1000,
+        "wall_ms": wall_ms,
+        "packages": json.loads(completed.stdout.strip().splitlines()[-1]),
+        "records": records,
+        "raw": completed.stderr,
+    }
+
+
+def check_entry(name: str, entry: dict, repeat: int, env: dict) -> dict:
+    runs = [import_once(entry["module"], env) for _ in range(repeat)]
+    last = runs[-1]
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    forbidden = sorted(set(entry.get("forbidden") or list()) & set(last["packages"]))
+    max_import_ms = entry.get("max_import_ms")
+    return {
+        "entry": name,
+        "module": entry["module"],
+        "import_ms": round(import_ms, 1),
+        "import_ms_runs": [round(r["import_ms"], 1) for r in runs],
+        "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+        "max_import_ms": max_import_ms,
+        "forbidden_loaded": forbidden,
+        "over_budget": max_import_ms is not None and import_ms > max_import_ms,
+        "ok": not forbidden and not (max_import_ms is not None and import_ms > max_import_ms),
+        "packages": last["packages"],
+        "_records": last["records"],
+        "_raw": last["raw"],
+    }
+
+
+def write_report(output_dir: str, result: dict):
+    records = result["_records"]
+    lines = [
+        f"entry: {result['entry']} ({result['module']})",
+        f"import ms: median={result['import_ms']} runs={result['import_ms_runs']} budget={result['max_import_ms']}",
+        f"wall ms (interpreter start + import): median={result['wall_ms']}",
+        f"forbidden loaded: {result['forbidden_loaded']}",
+        f"packages: {' '.join(result['packages'])}",
+        "",
+        "top cumulative ms:",
+        *(f"{r['cumulative_us'] / 1000:10.1f}  {'  ' * r['level']}{r['module']}"
+          for r in sorted(records, key=lambda r: r["cumulative_us"], reverse=True)[:REPORT_TOP_N]),
+        "",
+        "top self ms:",
+        *(f"{r['self_us'] / 1000:10.1f}  {r['module']}"
+          for r in sorted(records, key=lambda r: r["self_us"], reverse=True)[:REPORT_TOP_N]),
+        "",
+        "raw -X importtime (last run):",
+        result["_raw"],
+    ]
+    with open(os.path.join(output_dir, f"{result['entry']}.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="import time report and startup budget check")
+    parser.add_argument("--budget", default=config.STARTUP_BUDGET_PATH)
+    parser.add_argument("--entries", nargs="+", default=None, help="只检查这些入口，默认全部")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output-dir", default=config.IMPORT_TIME_DIR)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    entries = load_budget(args.budget, args.entries)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [*load_pythonpath(), env.get("PYTHONPATH")]))
+    # 需要写入 __pycache__，否则每次运行都包含编译耗时
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    results = list()
+    for name, entry in entries.items():
+        try:
+            # 预热一次，生成 .pyc
+            import_once(entry["module"], env)
+            result = check_entry(name, entry, args.repeat, env)
+        except (RuntimeError, subprocess.TimeoutExpired) as err:
+            print(f"{name:<22} ERROR {err}")
+            results.append({"entry": name, "module": entry["module"], "ok": False, "error": str(err)})
+            continue
+        write_report(args.output_dir, result)
+        results.append({k: v for k, v in result.items() if not k.startswith("_")})
+        print(
+            f"{name:<22} {'OK  ' if result['ok'] else 'FAIL'} import={result['import_ms']:8.1f}ms "
+            f"budget={result['max_import_ms']}ms wall={result['wall_ms']:8.1f}ms forbidden={result['forbidden_loaded']}"
+        )
+
+    with open(os.path.join(args.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"reports -> {args.output_dir}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+事件循环实现对比基准测试：asyncio vs uvloop
+    redis stream 读取：N 个 AsyncRedisDB.get_stream_tail 读取者 (与 PressInfo / PLC 网关订阅一致)，1 个写入者 xadd M 条消息
+    websocket 扇出：uvicorn + HybridManager (与 webViewer 一致)，C 个 websockets 客户端，广播 M 条消息
+    统计 投递数/s 与 写入 -> 收到 的延迟百分位；读写在同一进程、同一事件循环中，结果反映事件循环本身的开销
+
+    python -m test.loop_bench --messages 2000 --readers 8 --clients 50
+    每种事件循环在独立子进程中运行 (utils.run_async)，未安装 uvloop 时跳过
+    redis 默认使用 db 15，只读写 loopBench: 前缀的 key；--spawn-redis 时启动一个临时 redis-server
+"""
+import sys
+import time
+import json
+import shutil
+import asyncio
+import argparse
+import subprocess
+import importlib.util
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+BENCH_PREFIX = "loopBench"
+BENCH_TAG = "loopBench"
+CASES = ("redis", "websocket")
+LOOPS = ("asyncio", "uvloop")
+# 等待所有消息收到的时间，秒
+RECEIVE_TIMEOUT_S = 60
+# 读取者/客户端就绪后再开始写入，秒
+WARMUP_S = 0.5
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(case: str, loop: str, latencies_ms: list, elapsed: float) -> dict:
+    return {
+        "case": case,
+        "loop": loop,
+        "deliveries": len(latencies_ms),
+        "elapsed_s": round(elapsed, 3),
+        "per_sec": round(len(latencies_ms) / elapsed, 1) if elapsed > 0 else float("nan"),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms, default=float("nan")), 3),
+    }
+
+
+async def bench_redis(args) -> tuple[list, float]:
+    from redisDb import AsyncRedisDB
+
+    redis = await AsyncRedisDB.create(host=args.redis_host, port=args.redis_port, db=args.redis_db, ping=True)
+    stream_key = f"{BENCH_PREFIX}:stream"
+    await redis.delete(stream_key)
+    latencies = list()
+
+    async def reader():
+        async for _, data in redis.get_stream_tail(stream_key=stream_key, block=1000, include_last=False):
+            if data is None:
+                continue
+            latencies.append((time.perf_counter_ns() - int(data["t"])) / 1e6)
+            if int(data["seq"]) == args.messages - 1:
+                return
+
+    readers = [asyncio.create_task(reader()) for _ in range(args.readers)]
+    await asyncio.sleep(WARMUP_S)
+
+    start_t = time.perf_counter()
+    interval = 1 / args.rate if args.rate > 0 else 0
+    for seq in range(args.messages):
+        await redis.xadd(stream_key, {"seq": seq, "t": time.perf_counter_ns()}, maxlen=args.messages, approximate=True)
+        if interval:
+            await asyncio.sleep(interval)
+    try:
+        await asyncio.wait_for(asyncio.gather(*readers), timeout=RECEIVE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        _logger.error(f"[LoopBench] redis readers timeout, received {len(latencies)}/{args.messages * args.readers}")
+        for task in readers:
+            task.cancel()
+    elapsed = time.perf_counter() - start_t
+
+    await redis.delete(stream_key)
+    await redis.aclose()
+    return latencies, elapsed
+
+
+async def bench_websocket(args) -> tuple[list, float]:
+    import uvicorn
+    import websockets
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+    from web.websocket_manager import HybridManager
+
+    manager = HybridManager()
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def endpoint(ws: WebSocket):
+        await manager.connect(BENCH_TAG, ws)
+        try:
+            while True:
+                await ws.receive_text()
+        except WebSocketDisconnect:
+            manager.disconnect(BENCH_TAG, ws)
+
+    # loop="none"：使用当前 (utils.run_async 创建的) 事件循环
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=args.ws_port, loop="none", lifespan="off", log_level="warning", ws="websockets"
+    ))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"ws://127.0.0.1:{args.ws_port}/ws"
+    clients = [await websockets.connect(url, max_queue=None) for _ in range(args.clients)]
+    while manager.quantity(BENCH_TAG) < args.clients:
+        await asyncio.sleep(0.05)
+    latencies = list()
+
+    async def client(ws):
+        for _ in range(args.messages):
+            message = json.loads(await ws.recv())
+            latencies.append((time.perf_counter_ns() - message["t"]) / 1e6)
+
+    receivers = [asyncio.create_task(client(ws)) for ws in clients]
+    await asyncio.sleep(WARMUP_S)
+
+    start_t = time.perf_counter()
+    interval = 1 / args.rate if args.rate > 0 else 0
+    for seq in range(args.messages):
+        await manager.broadcast(BENCH_TAG, {"seq": seq, "t": time.perf_counter_ns()})
+        if interval:
+            await asyncio.sleep(interval)
+    try:
+        await asyncio.wait_for(asyncio.gather(*receivers), timeout=RECEIVE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        _logger.error(f"[LoopBench] websocket clients timeout, received {len(latencies)}/{args.messages * args.clients}")
+        for task in receivers:
+            task.cancel()
+    elapsed = time.perf_counter() - start_t
+
+    for ws in clients:
+        await ws.close()
+    server.should_exit = True
+    await serve_task
+    return latencies, elapsed
+
+
+async def worker(args) -> dict:
+    bench = {"redis": bench_redis, "websocket": bench_websocket}[args.case]
+    latencies, elapsed = await bench(args)
+    return summarize(args.case, args.worker, latencies, elapsed)
+
+
+def run_worker(args):
+    import utils
+
+    logging.basicConfig(level=logging.WARNING)
+    result = utils.run_async(worker(args), loop=args.worker)
+    # 最后一行为结果，供父进程解析
+    print(json.dumps(result))
+
+
+def spawn_redis(port: int) -> subprocess.Popen:
+    if shutil.which("redis-server") is None:
+        raise FileNotFoundError("redis-server not found in PATH")
+    process = subprocess.Popen(
+        ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+    )
+    time.sleep(0.5)
+    return process
+
+
+def report(results: list):
+    print(f"{'case':<10} {'loop':<8} {'deliveries':>10} {'elapsed s':>10} {'per sec':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in results:
+        print(
+            f"{r['case']:<10} {r['loop']:<8} {r['deliveries']:>10} {r['elapsed_s']:>10.3f} {r['per_sec']:>10.1f} "
+            f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['max_ms']:>8.3f}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="event loop implementation benchmark")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--loops", nargs="+", default=list(LOOPS), choices=LOOPS)
+    parser.add_argument("--messages", type=int, default=2000, help="写入 / 广播的消息数")
+    parser.add_argument("--rate", type=float, default=0, help="写入速率 msgs/s，0 为不限速")
+    parser.add_argument("--readers", type=int, default=8, help="redis stream 读取者数量")
+    parser.add_argument("--clients", type=int, default=50, help="websocket 客户端数量")
+    parser.add_argument("--ws-port", type=int, default=18002)
+    parser.add_argument("--redis-host", default="127.0.0.1")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--redis-db", type=int, default=15)
+    parser.add_argument("--spawn-redis", action="store_true", help="在 --redis-port 启动临时 redis-server")
+    parser.add_argument("--json", default=None, help="结果另存为 json")
+    # 内部使用：子进程
+    parser.add_argument("--worker", default=None, choices=LOOPS, help=argparse.SUPPRESS)
+    parser.add_argument("--case", default=None, choices=CASES, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker is not None:
+        run_worker(args)
+        return
+
+    redis_process = spawn_redis(args.redis_port) if args.spawn_redis and "redis" in args.cases else None
+    forwarded = [
+        "--messages", str(args.messages), "--rate", str(args.rate),
+        "--readers", str(args.readers), "--clients", str(args.clients), "--ws-port", str(args.ws_port),
+        "--redis-host", args.redis_host, "--redis-port", str(args.redis_port), "--redis-db", str(args.redis_db),
+    ]
+    results = list()
+    try:
+        for case in args.cases:
+            for loop in args.loops:
+                if loop == "uvloop" and importlib.util.find_spec("uvloop") is None:
+                    print(f"skip {case}/{loop}: uvloop is not installed")
+                    continue
+                completed = subprocess.run(
+                    [sys.executable, "-m", "test.loop_bench", "--worker", loop, "--case", case, *forwarded],
+                    capture_output=True, text=True,
+                )
+                if completed.returncode != 0:
+                    print(f"{case}/{loop} failed:\n{completed.stderr}")
+                    continue
+                results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    finally:
+        if redis_process is not None:
+            redis_process.terminate()
+            redis_process.wait()
+
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+穿梭小车拍照链路 端到端吞吐基准测试
+    S7Simulator(冲压时间线) -> PressInfo + CameraCtrl -> N 个合成相机进程 -> ImageSaver(SQLite) -> udp
+    控制消息使用 redis list 代替 rabbitmq，数据库使用 SQLite，除此之外运行的都是生产代码
+    结束后从零件链路追踪统计：parts/s、各阶段耗时百分位、丢失零件、各进程峰值 RSS
+
+    python -m test.pipeline_bench --cameras 4 --spm 15 --strokes 60 --width 2448 --height 2048
+    相机为 camera_params.yml simulation 配置的模拟相机，需要 hikrobot_camera 包可导入（不打开设备）
+    redis 默认使用 db 15，开始前会清空该 db；--spawn-redis 时启动一个临时 redis-server
+"""
+import os
+import sys
+import time
+import typing
+import json
+import shutil
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing as mp
+import logging
+import yaml
+
+from camera.simulator import SIM_PIXEL_TYPES
+
+_logger = logging.getLogger(__name__)
+
+
+PRESS_LINE = "bench"
+BENCH_PROGRAM_ID = 140
+# 合成相机 IP，127.0.10.x，只用作标识
+BENCH_CAMERA_IP = "127.0.10.{}"
+# 时间线结束后等待最后一个零件落盘的时间，秒
+DRAIN_SEC = 10
+# 等待子进程退出的时间，秒
+WAIT_PROCESS_END_TIMEOUT_S = 10
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值 RSS，MB"""
+    try:
+        import resource
+        # linux 为 KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+
+
+def init_child_logger():
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s")
+
+
+async def _wait_mp_event(mp_stop, stop_event: asyncio.Event):
+    """mp.Event -> asyncio.Event"""
+    await asyncio.to_thread(mp_stop.wait)
+    stop_event.set()
+
+
+def _child_main(name: str, target, mp_stop, rss_queue, **kwargs):
+    """子进程入口：运行 target 直到 mp_stop，然后上报峰值 RSS"""
+    init_child_logger()
+    # ctrl+c 由主进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(target(mp_stop=mp_stop, **kwargs))
+    except Exception as err:
+        _logger.exception(f"[Bench] {name} error: {err}")
+    finally:
+        rss_queue.put((name, peak_rss_mb()))
+
+
+async def run_press_reader(mp_stop, redis_con: dict):
+    from plc.simulator import use_simulator
+    from press import PressInfo
+
+    use_simulator()
+    stop_event = asyncio.Event()
+    async with await PressInfo.create(press_line=PRESS_LINE, executor=None, **redis_con) as press_info:
+        press_info.work()
+        await _wait_mp_event(mp_stop, stop_event)
+
+
+async def run_camera_ctrl(mp_stop, redis_con: dict, rabbitmq_url: str, parts_info_path: str):
+    from plc.simulator import use_simulator
+    from test.bench_stand_ins import BenchCameraCtrl
+
+    use_simulator()
+    # 没有 modbus 设备，关闭会话的重连日志
+    logging.getLogger("modbus").setLevel(logging.CRITICAL)
+    logging.getLogger("pymodbus").setLevel(logging.CRITICAL)
+
+    stop_event = asyncio.Event()
+    async with await BenchCameraCtrl.create(
+            stop_event=stop_event,
+            executor=None,
+            press_line=PRESS_LINE,
+            rabbitmq_url=rabbitmq_url,
+            parts_info_path=parts_info_path,
+            modbus_host="127.0.0.1", modbus_port=1, modbus_slave=1,
+            **redis_con,
+    ) as camera_ctrl:
+        waiter = asyncio.create_task(_wait_mp_event(mp_stop, stop_event))
+        await asyncio.gather(*camera_ctrl.tasks, stop_event.wait(), return_exceptions=True)
+        waiter.cancel()
+
+
+async def run_camera(mp_stop, redis_con: dict, rabbitmq_url: str, ip: str, camera_params_path: str):
+    from test.bench_stand_ins import BenchCamera
+
+    camera = await BenchCamera.create(
+        stop_event=None,
+        ip=ip,
+        press_line=PRESS_LINE,
+        rabbitmq_url=rabbitmq_url,
+        camera_params_path=camera_params_path,
+        **redis_con,
+    )
+    camera.prewarm()
+    worker = asyncio.create_task(camera.rabbitmq_worker())
+    await _wait_mp_event(mp_stop, asyncio.Event())
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+
+
+async def run_image_saver(mp_stop, redis_con: dict, saved_dir: str, image_format: str, orm_config: dict):
+    from imageSaver import ImageSaverForShuttle
+    from config import config
+
+    stop_event = asyncio.Event()
+    async with await ImageSaverForShuttle.create(
+            stop_event=stop_event,
+            executor=None,
+            press_line=PRESS_LINE,
+            saved_dir=saved_dir,
+            get_image_timeout=config.IMAGE_SAVER_FOR_SHUTTLE_GET_IMAGE_TIMEOUT_SEC,
+            image_overwrite=True,
+            image_format=image_format,
+            image_workers_number=config.IMAGE_SAVER_FOR_SHUTTLE_WORKERS_NUMBER,
+            orm_config=orm_config,
+            udp_multicast_ip=config.UDP_MULTICAST_IP,
+            udp_multicast_port=config.UDP_MULTICAST_PORT,
+            udp_multicast_interface_ip="127.0.0.1",
+            udp_ttl=0,
+            **redis_con,
+    ) as saver:
+        waiter = asyncio.create_task(_wait_mp_event(mp_stop, stop_event))
+        await asyncio.gather(*saver.tasks, stop_event.wait(), return_exceptions=True)
+        waiter.cancel()
+
+
+def sqlite_orm_config(db_path: str) -> dict:
+    return {
+        'connections': {'default': f"sqlite://{db_path}"},
+        'apps': {
+            'models': {
+                'models': ['imageSaver.imageSaverForShuttle.models'],
+                'default_connection': 'default',
+            }
+        },
+        'use_tz': False,
+        'timezone': 'Asia/Shanghai'
+    }
+
+
+async def prepare(redis_con: dict, orm_config: dict):
+    """清空 bench redis db，建 SQLite 表"""
+    from tortoise import Tortoise
+    from redisDb import AsyncRedisDB
+
+    redis = await AsyncRedisDB.create(host=redis_con["redis_host"], port=redis_con["redis_port"], db=redis_con["redis_db"], ping=True)
+    await redis.flushdb()
+    await redis.aclose()
+
+    await Tortoise.init(config=orm_config)
+    await Tortoise.generate_schemas(safe=True)
+    await Tortoise.close_connections()
+
+
+async def collect(redis_con: dict, strokes: int, cameras: list[str]) -> tuple[list, list]:
+    """读取零件链路，返回 (所有链路, 完整链路)"""
+    from redisDb import AsyncRedisDB, PartTraceStage
+
+    redis = await AsyncRedisDB.create(host=redis_con["redis_host"], port=redis_con["redis_port"], db=redis_con["redis_db"], ping=True)
+    try:
+        traces = await redis.get_recent_part_traces(press_line=PRESS_LINE, count=strokes * 2)
+    finally:
+        await redis.aclose()
+
+    complete = [
+        trace for trace in traces
+        if trace.get(PartTraceStage.UDP_NOTIFIED) is not None
+        and all(trace.get(PartTraceStage.DB_COMMITTED, ip) is not None for ip in cameras)
+    ]
+    return traces, complete
+
+
+def trace_span(traces: list, complete: list) -> typing.Optional[float]:
+    """第一个零件上升沿 -> 最后一个完整零件 udp 通知，秒，不包含排空等待"""
+    from redisDb import PartTraceStage
+
+    edges = [t for trace in traces if (t := trace.get(PartTraceStage.EDGE)) is not None]
+    notified = [trace.get(PartTraceStage.UDP_NOTIFIED) for trace in complete]
+    if not edges or not notified:
+        return None
+    return (max(notified) - min(edges)) / 1000
+
+
+def write_parts_info(path: str, cameras: list[str], trigger_delay: float):
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({
+            "registered_cameras": cameras,
+            "parts": {
+                BENCH_PROGRAM_ID: {
+                    "car_type": "bench",
+                    "Part_num": "bench",
+                    "cameras": cameras,
+                    "trigger_delay": trigger_delay,
+                }
+            }
+        }, f)
+
+
+def write_camera_params(path: str, args):
+    """所有相机使用模拟相机"""
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({
+            "global": {
+                "custom": {"grab_method": 3},
+                "simulation": {
+                    "enable": True,
+                    "width": args.width,
+                    "height": args.height,
+                    "pixel_type": args.pixel_type,
+                    "exposure_delay_ms": args.exposure_delay_ms,
+                    "jitter_ms": args.jitter_ms,
+                    "drop_rate": args.drop_rate,
+                },
+            }
+        }, f)
+
+
+def spawn_redis(port: int) -> subprocess.Popen:
+    if shutil.which("redis-server") is None:
+        raise FileNotFoundError("redis-server not found in PATH")
+    process = subprocess.Popen(
+        ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+    )
+    time.sleep(0.5)
+    return process
+
+
+def report(args, traces: list, complete: list, rss: dict, elapsed: float):
+    from redisDb import summarize_part_traces
+
+    summary = summarize_part_traces(complete)
+    dropped = args.strokes - len(complete)
+    span = trace_span(traces, complete)
+    print(f"\n===== pipeline bench: cameras={args.cameras} frame={args.width}x{args.height} {args.pixel_type} "
+          f"spm={args.spm} strokes={args.strokes} format={args.image_format} =====")
+    print(f"parts: traced={len(traces)} complete={len(complete)} dropped={dropped}")
+    if span:
+        print(f"throughput: {len(complete) / span:.2f} parts/s over {span:.1f}s trace span "
+              f"(press {args.spm / 60:.2f} parts/s, wall {elapsed:.1f}s)")
+    else:
+        print(f"throughput: n/a, no complete part (wall {elapsed:.1f}s)")
+    print(f"total ms: {json.dumps(summary['total'])}")
+    for stage, values in summary["stages"].items():
+        print(f"  {stage:>12}: {json.dumps(values)}")
+    print("peak RSS MB:")
+    for name, value in sorted(rss.items()):
+        print(f"  {name:>24}: {value:.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "elapsed": elapsed, "span": span, "dropped": dropped, "summary": summary, "rss_mb": rss}, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="shuttle camera pipeline end-to-end benchmark")
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--pixel-type", default="Mono8", choices=list(SIM_PIXEL_TYPES))
+    parser.add_argument("--exposure-delay-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--drop-rate", type=float, default=0, help="模拟相机丢帧概率")
+    parser.add_argument("--spm", type=float, default=15)
+    parser.add_argument("--strokes", type=int, default=30)
+    parser.add_argument("--trigger-delay", type=float, default=0.3)
+    parser.add_argument("--warmup", type=float, default=10, help="第一个冲次前的等待时间，秒，用于各进程启动")
+    parser.add_argument("--image-format", default="jpg")
+    parser.add_argument("--redis-host", default="127.0.0.1")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--redis-db", type=int, default=15, help="开始前会被清空")
+    parser.add_argument("--spawn-redis", action="store_true", help="在 --redis-port 启动临时 redis-server")
+    parser.add_argument("--json", default=None, help="结果另存为 json")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from plc.simulator import S7Simulator, Timeline
+
+    redis_server = spawn_redis(args.redis_port) if args.spawn_redis else None
+    work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    redis_con = {"redis_host": args.redis_host, "redis_port": args.redis_port, "redis_db": args.redis_db}
+    rabbitmq_url = f"redis://{args.redis_host}:{args.redis_port}/{args.redis_db}"
+    cameras = [BENCH_CAMERA_IP.format(k + 1) for k in range(args.cameras)]
+    parts_info_path = os.path.join(work_dir, "parts_info.yaml")
+    camera_params_path = os.path.join(work_dir, "camera_params.yml")
+    orm_config = sqlite_orm_config(os.path.join(work_dir, "bench.sqlite3"))
+    saved_dir = os.path.join(work_dir, "images")
+
+    write_parts_info(parts_info_path, cameras, args.trigger_delay)
+    write_camera_params(camera_params_path, args)
+    asyncio.run(prepare(redis_con, orm_config))
+
+    ctx = mp.get_context("spawn")
+    mp_stop = ctx.Event()
+    rss_queue = ctx.Queue()
+    children = {
+        "pressReader": (run_press_reader, {"redis_con": redis_con}),
+        "cameraCtrl": (run_camera_ctrl, {"redis_con": redis_con, "rabbitmq_url": rabbitmq_url, "parts_info_path": parts_info_path}),
+        "imageSaver": (run_image_saver, {"redis_con": redis_con, "saved_dir": saved_dir, "image_format": args.image_format, "orm_config": orm_config}),
+        **{
+            f"camera@{ip}": (run_camera, {
+                "redis_con": redis_con, "rabbitmq_url": rabbitmq_url, "ip": ip, "camera_params_path": camera_params_path,
+            })
+            for ip in cameras
+        },
+    }
+
+    processes: dict[str, mp.Process] = dict()
+    timeline = Timeline.stamping(spm=args.spm, strokes=args.strokes, program_id=BENCH_PROGRAM_ID, start_delay=args.warmup)
+    try:
+        with S7Simulator() as simulator:
+            for name, (target, kwargs) in children.items():
+                p = ctx.Process(target=_child_main, name=name, args=(name, target, mp_stop, rss_queue), kwargs=kwargs)
+                p.start()
+                processes[name] = p
+
+            start_t = time.time()
+            simulator.play(timeline)
+            simulator.wait_played(timeout=timeline.duration + 5)
+            time.sleep(DRAIN_SEC)
+            # 墙钟时间，包含排空等待，吞吐量按链路时间戳计算 (trace_span)
+            elapsed = time.time() - start_t - args.warmup
+    except KeyboardInterrupt:
+        elapsed = None
+        print("cancelled")
+    finally:
+        mp_stop.set()
+        rss = {"bench": peak_rss_mb()}
+        deadline = time.time() + WAIT_PROCESS_END_TIMEOUT_S
+        for name, p in processes.items():
+            p.join(max(0.0, deadline - time.time()))
+            if p.is_alive():
+                _logger.warning(f"[Bench] force {name} terminate")
+                p.terminate()
+        while not rss_queue.empty():
+            name, value = rss_queue.get()
+            rss[name] = value
+
+    try:
+        if elapsed is not None:
+            traces, complete = asyncio.run(collect(redis_con, args.strokes, cameras))
+            report(args, traces, complete, rss, elapsed)
+    finally:
+        if redis_server is not None:
+            redis_server.terminate()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
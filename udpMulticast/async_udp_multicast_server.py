@@ -2,7 +2,6 @@ import asyncio
 import socket
 import typing
 import logging
-import utils
 
 _logger = logging.getLogger(__name__)
 
@@ -30,11 +29,6 @@ class MyProtocol(asyncio.DatagramProtocol):
 
 
 class AsyncUdpMulticastServer:
-
-    # windows中，强制使用 SelectorEventLoop
-    if utils.is_win():
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-
     def __init__(
             self,
             multicast_ip, multicast_port,
@@ -69,6 +63,8 @@ class AsyncUdpMulticastServer:
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
             # 设置组播出口接口
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.interface_ip))
+            # 先绑定：Windows Proactor 循环创建 transport 后立即 recvfrom，未绑定的套接字报 WinError 10022
+            sock.bind((self.interface_ip, 0))
 
             # 创建 datagram endpoint
             self.transport, self.protocol = await self.loop.create_datagram_endpoint(
@@ -5,10 +5,14 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import functools
 import platform
-import numpy as np
-import cv2
+import signal
+import weakref
 import logging
 
+# numpy / cv2 只在图片编码时导入，避免所有进程在启动时加载
+if typing.TYPE_CHECKING:
+    import numpy as np
+
 # import subprocess
 # import shutil
 # import socket
@@ -28,6 +32,104 @@ def is_win() -> bool:
         return False
 
 
+# 事件循环实现
+#   auto:     非 Windows 优先 uvloop，未安装时回退 asyncio 默认循环；Windows 使用 asyncio 默认循环 (Proactor)
+#   uvloop:   必须使用 uvloop，未安装时报错
+#   asyncio:  asyncio 默认循环
+#   selector: asyncio.SelectorEventLoop，Windows 上部分库只支持 selector
+EVENT_LOOP_KINDS = ("auto", "uvloop", "asyncio", "selector")
+
+
+def event_loop_factory(kind: str = "auto") -> tuple[str, typing.Optional[typing.Callable[[], asyncio.AbstractEventLoop]]]:
+    """
+    按平台选择事件循环实现
+    :param kind: EVENT_LOOP_KINDS
+    :return: (实际使用的实现, loop_factory)，loop_factory 为 None 表示 asyncio 默认
+    :raises ValueError, ImportError
+    """
+    if kind not in EVENT_LOOP_KINDS:
+        raise ValueError(f"unknown event loop[{kind}], expected one of {EVENT_LOOP_KINDS}")
+
+    if kind == "selector":
+        return kind, asyncio.SelectorEventLoop
+    if kind == "asyncio" or (kind == "auto" and is_win()):
+        return "asyncio", None
+
+    try:
+        import uvloop
+    except ImportError:
+        if kind == "uvloop":
+            raise
+        return "asyncio", None
+    return "uvloop", uvloop.new_event_loop
+
+
+def install_stop_signals(stop_event: asyncio.Event):
+    """
+    注册信号处理器：Ctrl+C 或 kill 时触发 stop_event
+    Windows 不支持 loop.add_signal_handler，Ctrl+C 以 KeyboardInterrupt 退出；
+    supervisor 以 CTRL_BREAK_EVENT 请求退出，SIGBREAK 默认直接结束进程，不执行 finally / cleanup，因此改为触发 stop_event
+    """
+    loop = asyncio.get_running_loop()
+    if is_win():
+        # 信号处理函数在主线程执行，通过 call_soon_threadsafe 唤醒事件循环
+        signal.signal(signal.SIGBREAK, lambda signum, frame: loop.call_soon_threadsafe(stop_event.set))
+        return
+    loop.add_signal_handler(signal.SIGINT, stop_event.set)
+    loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+
+
+# set_default_executor 创建的默认线程池，loop -> executor
+# uvloop 没有 python 可见的 _default_executor，LoopMonitor 通过 default_executor() 读取
+_default_executors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ThreadPoolExecutor]" = weakref.WeakKeyDictionary()
+
+
+def set_default_executor(loop: asyncio.AbstractEventLoop, max_workers: typing.Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    创建并设置事件循环的默认线程池 (asyncio.to_thread / run_in_executor(None, ...))，保留引用供 default_executor() 读取
+    :param loop:
+    :param max_workers: None 为 ThreadPoolExecutor 默认大小，与 asyncio 一致
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asyncio_default")
+    loop.set_default_executor(executor)
+    _default_executors[loop] = executor
+    return executor
+
+
+def default_executor(loop: typing.Optional[asyncio.AbstractEventLoop] = None) -> typing.Optional[ThreadPoolExecutor]:
+    """
+    事件循环的默认线程池，未通过 set_default_executor 设置时读取 asyncio 内部属性 (uvloop 下为 None)
+    :param loop: None 为当前运行的事件循环
+    """
+    loop = loop or asyncio.get_running_loop()
+    executor = _default_executors.get(loop)
+    if executor is None:
+        executor = getattr(loop, "_default_executor", None)
+    return executor
+
+
+def run_async(
+        main: typing.Coroutine,
+        loop: str = "auto",
+        executor_workers: typing.Optional[int] = None,
+        debug: typing.Optional[bool] = None,
+):
+    """
+    进程入口，代替 asyncio.run：按平台选择事件循环，设置默认线程池大小，运行 main 直到结束
+    :param main: 协程
+    :param loop: EVENT_LOOP_KINDS
+    :param executor_workers: 默认线程池 (asyncio.to_thread / run_in_executor(None, ...)) 大小，None 为 asyncio 默认
+    :param debug: asyncio debug 模式
+    :return: main 的返回值
+    """
+    kind, loop_factory = event_loop_factory(loop)
+    with asyncio.Runner(debug=debug, loop_factory=loop_factory) as runner:
+        # 总是显式创建，LoopMonitor 才能在 uvloop 下读取默认线程池
+        set_default_executor(runner.get_loop(), executor_workers)
+        _logger.info(f"[run_async] event loop={kind}, default executor workers={executor_workers or 'default'}")
+        return runner.run(main)
+
+
 class CallContext(typing.NamedTuple):
     filename: str
     cls_name: typing.Optional[str]
@@ -219,25 +321,14 @@ def async_run_in_executor(func):
     return wrapper
 
 
-def save_image_by_cv(path: str, image: np.ndarray, **kwargs) -> int:
-    """
-    保存图片，使用opencv，支持 .jpg, .png, .bmp
-    :param path:
-    :param image:       图像 numpy数组
-    :param kwargs:      jpg_quality，JPEG图片质量[0,100]，默认100
-                        png_compression，PNG压缩等级[0,9]，默认0（0:无压缩，9:最大压缩, 数值越大，文件越小但压缩越慢）
-    :return:
-    """
-    # 文件格式
-    _, file_format = os.path.splitext(path)
-    file_format = file_format[1:].lower()
+def _cv_image_params(file_format: str, **kwargs) -> list:
+    """opencv 编码参数，支持 jpg, png, bmp"""
+    import cv2
+
+    file_format = file_format.lower().lstrip(".")
     if file_format not in ["jpg", "jpeg", "png", "bmp"]:
         raise TypeError(f"saved format[{file_format}] is not supported")
 
-    # 文件夹
-    saved_dir = os.path.dirname(path)
-    os.makedirs(saved_dir, exist_ok=True)
-
     if file_format in ["jpg", "jpeg"]:
         # 图片质量
         quality = kwargs.get("jpg_quality", 100)
@@ -249,6 +340,27 @@ def save_image_by_cv(path: str, image: np.ndarray, **kwargs) -> int:
         params = [cv2.IMWRITE_PNG_COMPRESSION, compression]
     else:
         params = list()
+    return params
+
+
+def save_image_by_cv(path: str, image: "np.ndarray", **kwargs) -> int:
+    """
+    保存图片，使用opencv，支持 .jpg, .png, .bmp
+    :param path:
+    :param image:       图像 numpy数组
+    :param kwargs:      jpg_quality，JPEG图片质量[0,100]，默认100
+                        png_compression，PNG压缩等级[0,9]，默认0（0:无压缩，9:最大压缩, 数值越大，文件越小但压缩越慢）
+    :return:
+    """
+    import cv2
+
+    # 文件格式
+    _, file_format = os.path.splitext(path)
+    params = _cv_image_params(file_format, **kwargs)
+
+    # 文件夹
+    saved_dir = os.path.dirname(path)
+    os.makedirs(saved_dir, exist_ok=True)
 
     # 保存
     success = cv2.imwrite(path, image, params)
@@ -256,3 +368,30 @@ def save_image_by_cv(path: str, image: np.ndarray, **kwargs) -> int:
         return True
     else:
         raise cv2.error(f"save image[{path}] by cv failed")
+
+
+def encode_image_by_cv(image: "np.ndarray", file_format: str, **kwargs) -> bytes:
+    """
+    编码图片，使用opencv，支持 jpg, png, bmp
+    与 write_bytes 配合使用，可分别统计编码和写文件的耗时
+    :param image:       图像 numpy数组
+    :param file_format: 图片格式
+    :param kwargs:      同 save_image_by_cv
+    :return:
+    """
+    import cv2
+
+    params = _cv_image_params(file_format, **kwargs)
+    success, buffer = cv2.imencode(f".{file_format.lower().lstrip('.')}", image, params)
+    if success:
+        return buffer.tobytes()
+    else:
+        raise cv2.error(f"encode image[{file_format}] by cv failed")
+
+
+def write_bytes(path: str, data: bytes) -> int:
+    """写入文件，自动创建文件夹"""
+    saved_dir = os.path.dirname(path)
+    os.makedirs(saved_dir, exist_ok=True)
+    with open(path, "wb") as f:
+        return f.write(data)
@@ -0,0 +1,54 @@
+import os
+import time
+from fastapi import APIRouter, Depends
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from web import dependencies
+from redisDb import AsyncRedisDB
+from metrics import render_prometheus
+from config import config
+
+TAG = "metrics"
+
+# 定位到 web目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # app/ 的上一级目录
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+# 超过该时间未更新的快照视为进程已停止，不输出到 /metrics
+METRICS_STALE_SEC = 30
+
+router = APIRouter()
+
+
+async def _snapshots(redis: AsyncRedisDB, press_line: str) -> list[dict]:
+    now = int(time.time() * 1000)
+    snapshots = await redis.get_metrics_snapshots(press_line=press_line)
+    for snapshot in snapshots:
+        snapshot["age_sec"] = round((now - snapshot["t"]) / 1000, 1)
+        snapshot["stale"] = snapshot["age_sec"] > METRICS_STALE_SEC
+    return snapshots
+
+
+@router.get("", response_class=PlainTextResponse)
+async def prometheus_metrics(
+        press_line: str = config.PRESS_LINE,
+        redis: AsyncRedisDB = Depends(dependencies.get_redis)
+):
+    """所有进程的指标，prometheus 文本格式"""
+    snapshots = [snapshot for snapshot in await _snapshots(redis, press_line) if not snapshot["stale"]]
+    return PlainTextResponse(render_prometheus(snapshots), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/json")
+async def metrics_json(
+        press_line: str = config.PRESS_LINE,
+        redis: AsyncRedisDB = Depends(dependencies.get_redis)
+) -> dict:
+    """所有进程的指标快照，包含已停止的进程，用于实时看板"""
+    return {"press_line": press_line, "snapshots": await _snapshots(redis, press_line)}
+
+
+@router.get("/viewer")
+async def metrics_viewer():
+    file_path = os.path.join(STATIC_DIR, "metrics_viewer.html")
+    return FileResponse(file_path, media_type="text/html")
@@ -5,7 +5,7 @@ import asyncio
 
 from web.websocket_manager import ws_manager
 from web import dependencies
-from redisDb import AsyncRedisDB
+from redisDb import AsyncRedisDB, summarize_part_traces
 
 TAG = "pressInfo"
 
@@ -44,6 +44,17 @@ async def websocket_endpoint(
         ws_manager.disconnect(tag=press_line_tag(press_line), ws=ws)
 
 
+@router.get("/{press_line}/trace")
+async def part_trace_summary(
+        press_line: str,
+        count: int = 200,
+        redis: AsyncRedisDB = Depends(dependencies.get_redis)
+) -> dict:
+    """最近 count 个零件的链路耗时百分位，按阶段和相机汇总"""
+    traces = await redis.get_recent_part_traces(press_line=press_line, count=count)
+    return summarize_part_traces(traces)
+
+
 async def subscribe_program_id(
         press_line: str
 ):
@@ -124,6 +135,33 @@ async def subscribe_part_counter(
         await ws_manager.broadcast(tag=press_line_tag(press_line), message=data)
 
 
+async def subscribe_cycle_stats(
+        press_line: str
+):
+    redis = await dependencies.get_redis()
+    data = None
+    async for timestamp, stats in redis.get_shuttle_cycle_stats(
+            press_line=press_line,
+            block=1000,             # 阻塞1秒等待新消息
+            include_last=True       # 先返回最后一条历史消息
+    ):
+        if stats is not None:
+            data = {
+                "cycle_stats": {
+                    "value": stats,
+                    "timestamp": timestamp,
+                }
+            }
+        if data is None:
+            continue
+        # 检查是否有活跃客户端
+        if not ws_manager.survival(tag=press_line_tag(press_line)):
+            continue
+
+        # 发送消息
+        await ws_manager.broadcast(tag=press_line_tag(press_line), message=data)
+
+
 async def get_light_enable(
         press_line: str
 ):
@@ -0,0 +1,82 @@
+import os
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from web import dependencies
+from redisDb import AsyncRedisDB
+from metrics import PROFILE_KINDS
+from config import config
+
+TAG = "profiles"
+
+# 定位到 web目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # app/ 的上一级目录
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+router = APIRouter()
+
+
+def _session_dir(session: str) -> str:
+    """剖析结果目录，禁止访问 PROFILE_DIR 之外的路径"""
+    root = os.path.realpath(config.PROFILE_DIR)
+    path = os.path.realpath(os.path.join(root, session))
+    if os.path.dirname(path) != root or not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail=f"profile[{session}] not found")
+    return path
+
+
+def _read_session(session: str) -> dict:
+    path = os.path.join(config.PROFILE_DIR, session)
+    meta = dict()
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.isfile(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    files = [
+        {"name": name, "size": os.path.getsize(os.path.join(path, name))}
+        for name in sorted(os.listdir(path))
+        if os.path.isfile(os.path.join(path, name))
+    ]
+    return {"session": session, **meta, "files": files}
+
+
+@router.get("")
+async def list_profiles() -> dict:
+    """所有剖析结果，按时间倒序"""
+    if not os.path.isdir(config.PROFILE_DIR):
+        return {"kinds": PROFILE_KINDS, "profiles": list()}
+    sessions = sorted(
+        (name for name in os.listdir(config.PROFILE_DIR) if os.path.isdir(os.path.join(config.PROFILE_DIR, name))),
+        reverse=True,
+    )
+    return {"kinds": PROFILE_KINDS, "profiles": [_read_session(session) for session in sessions]}
+
+
+@router.post("/command")
+async def profile_command(
+        process: str,
+        kind: str,
+        duration: float,
+        press_line: str = config.PRESS_LINE,
+        redis: AsyncRedisDB = Depends(dependencies.get_redis)
+) -> dict:
+    """发布剖析命令，process 支持通配符"""
+    if kind not in PROFILE_KINDS:
+        raise HTTPException(status_code=400, detail=f"unknown profile kind[{kind}], expected one of {PROFILE_KINDS}")
+    await redis.add_profile_command(press_line=press_line, process=process, kind=kind, duration=duration)
+    return {"process": process, "kind": kind, "duration": duration}
+
+
+@router.get("/viewer")
+async def profile_viewer():
+    file_path = os.path.join(STATIC_DIR, "profile_viewer.html")
+    return FileResponse(file_path, media_type="text/html")
+
+
+@router.get("/{session}/{filename}")
+async def download_profile(session: str, filename: str):
+    path = os.path.join(_session_dir(session), os.path.basename(filename))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"profile file[{session}/{filename}] not found")
+    return FileResponse(path, filename=f"{session}_{os.path.basename(filename)}")
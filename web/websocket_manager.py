@@ -1,6 +1,8 @@
 from fastapi import WebSocket
 import typing
 
+import metrics
+
 
 class Manager:
     def __init__(self):
@@ -62,7 +64,11 @@ class HybridManager:
         :param ws:
         :return:
         """
-        await self.hybrid.setdefault(tag, Manager()).connect(ws)
+        if tag not in self.hybrid:
+            self.hybrid[tag] = Manager()
+            # 每个 tag 的连接数量
+            metrics.gauge("websocket_clients", "alive websocket clients", tag=tag).set_function(lambda: self.quantity(tag))
+        await self.hybrid[tag].connect(ws)
 
     def disconnect(self, tag: str, ws: WebSocket):
         """从某个 tag 对应的组里移除连接"""